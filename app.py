@@ -1,24 +1,42 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
-from fastapi.staticfiles import StaticFiles
 import uvicorn
-from src.api.routes import upload, transcription, webhooks
+from src.api.routes import upload, transcription, webhooks, stats, media, stream
 from src.services.trigger_client import TriggerClient
-from src.database.connection import create_db_and_tables
+from src.services.eta_estimator import ETAEstimator
+from src.services.worker_router import WorkerRouter
+from src.services.job_reconciler import JobReconciler
+from src.services.storage_gc import StorageSweeper
+from src.services.idempotency import IdempotencyStore
+from src.services.express_transcriber import ExpressTranscriber
+from src.services.http_session import close_http_session
+from src.database.connection import create_db_and_tables, engine
+from src.api.middleware.metrics import MetricsMiddleware
+from src.utils.metrics import render_metrics
+from src.utils.tracing import setup_tracing, shutdown_tracing, instrument_engine
 import redis.asyncio as redis
 import os
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Inicializar banco de dados
-    create_db_and_tables()
-    print("✅ Database initialized")
+    # Tracing (amostrado) e spans das queries SQL
+    setup_tracing("echo-api")
+    instrument_engine(engine)
+
+    # Inicializar banco de dados (no gunicorn isso já rodou uma vez no master, antes do fork)
+    if os.getenv("ECHO_SCHEMA_READY") != "1":
+        create_db_and_tables()
+        print("✅ Database initialized")
 
     # Inicializar conexões
     trigger_client = TriggerClient()
     app.state.trigger_client = trigger_client
+    app.state.eta_estimator = ETAEstimator()
+    # Escolha da variante do worker (cpu, t4, a10g) por duração, tier e fila
+    app.state.worker_router = WorkerRouter(app.state.eta_estimator)
 
     # Inicializar Redis
     redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
@@ -31,23 +49,45 @@ async def lifespan(app: FastAPI):
         print(f"⚠️ Redis not available: {e}")
         app.state.redis_client = None
 
+    # Idempotency-Key nas rotas de criação de jobs (memória local se não houver Redis)
+    app.state.idempotency = IdempotencyStore(app.state.redis_client)
+
+    # Reconciliador de jobs parados (webhooks perdidos)
+    job_reconciler = JobReconciler(trigger_client, redis_client=app.state.redis_client)
+    job_reconciler.start()
+    app.state.job_reconciler = job_reconciler
+
+    # Coletor de uploads/downloads órfãos e cota de disco
+    storage_sweeper = StorageSweeper()
+    storage_sweeper.start()
+    app.state.storage_sweeper = storage_sweeper
+
+    # Via expressa: modelo pequeno residente para clipes curtos (carregado em background)
+    express_transcriber = ExpressTranscriber()
+    express_transcriber.start()
+    app.state.express_transcriber = express_transcriber
+
     yield
 
     # Cleanup
+    await job_reconciler.stop()
+    await storage_sweeper.stop()
+    await express_transcriber.stop()
     if hasattr(app.state, 'redis_client') and app.state.redis_client:
         await app.state.redis_client.aclose()
     await trigger_client.close()
+    await close_http_session()
+    shutdown_tracing()
 
 
 app = FastAPI(
     title="Echo - Transcription API",
     description="API para transcrição de áudio/vídeo usando WhisperX",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
-
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -55,11 +95,16 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 # Incluir rotas
 app.include_router(upload.router, prefix="/api/v1", tags=["upload"])
 app.include_router(transcription.router, prefix="/api/v1", tags=["transcription"])
 app.include_router(webhooks.router, prefix="/webhooks", tags=["webhooks"])
+app.include_router(stats.router, prefix="/api/v1", tags=["stats"])
+app.include_router(stream.router, prefix="/api/v1", tags=["stream"])
+# Arquivos enviados, servidos aos workers por URL assinada (Range, ETag)
+app.include_router(media.router, prefix="/media", tags=["media"])
 
 
 @app.get("/")
@@ -72,6 +117,12 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 if __name__ == "__main__":
     uvicorn.run(
         "app:app",
@@ -0,0 +1,93 @@
+"""Pico de memória (RSS) da decodificação de áudio: whisperx.load_audio vs PCM em memmap com janelas.
+
+Uso:
+    python benchmarks/bench_decode_memory.py --durations 10 60 180 360
+
+As durações são em minutos. Requer ffmpeg e numpy; cada medição roda num subprocesso
+separado para que o ru_maxrss reflita apenas aquele modo.
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+WINDOW_SECONDS = 1800
+
+
+def generate_audio(path: str, minutes: int):
+    """Gera ruído rosa codificado em Opus (arquivo pequeno, decodificação realista)"""
+    subprocess.run([
+        "ffmpeg", "-nostdin", "-y", "-v", "error",
+        "-f", "lavfi", "-i", f"anoisesrc=color=pink:sample_rate=48000:duration={minutes * 60}",
+        "-ac", "1", "-c:a", "libopus", "-b:a", "24k", path
+    ], check=True)
+
+
+def run_load_audio(path: str):
+    """Mesmo caminho do whisperx.load_audio: todo o PCM vai para a RAM"""
+    out = subprocess.run([
+        "ffmpeg", "-nostdin", "-threads", "0", "-i", path,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE), "-"
+    ], capture_output=True, check=True).stdout
+    audio = np.frombuffer(out, np.int16).flatten().astype(np.float32) / 32768.0
+    return float(np.abs(audio).mean())
+
+
+def run_memmap(path: str):
+    """Caminho do worker: ffmpeg grava PCM em disco e o modelo recebe janelas do memmap"""
+    with tempfile.TemporaryDirectory() as tmp:
+        pcm_path = os.path.join(tmp, "audio.f32")
+        subprocess.run([
+            "ffmpeg", "-nostdin", "-threads", "0", "-v", "error", "-y", "-i", path,
+            "-f", "f32le", "-ac", "1", "-acodec", "pcm_f32le", "-ar", str(SAMPLE_RATE), pcm_path
+        ], check=True)
+        audio = np.memmap(pcm_path, dtype=np.float32, mode="r")
+        window = WINDOW_SECONDS * SAMPLE_RATE
+        total = 0.0
+        for start in range(0, len(audio), window):
+            chunk = np.array(audio[start:start + window])
+            total += float(np.abs(chunk).sum())
+            del chunk
+        return total / len(audio)
+
+
+def child(mode: str, path: str):
+    {"load_audio": run_load_audio, "memmap": run_memmap}[mode](path)
+    # ru_maxrss em KB no Linux
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def measure(mode: str, path: str) -> float:
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", mode, path],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return int(out.strip().splitlines()[-1]) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--durations", type=int, nargs="+", default=[10, 60, 180, 360])
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PATH"))
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    print(f"{'minutos':>8} | {'load_audio (MB)':>16} | {'memmap (MB)':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for minutes in args.durations:
+            path = os.path.join(tmp, f"audio_{minutes}.ogg")
+            generate_audio(path, minutes)
+            print(f"{minutes:>8} | {measure('load_audio', path):>16.0f} | {measure('memmap', path):>12.0f}")
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
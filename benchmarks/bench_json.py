@@ -0,0 +1,103 @@
+"""Custo de CPU para servir o resultado de uma transcrição: caminho Pydantic + json vs orjson.
+
+Uso:
+    python benchmarks/bench_json.py --segments 10 100 1000 10000 100000
+
+Para cada tamanho compara, em ms por requisição:
+  - banco:  TranscriptionResult(**dados) + serialização (antes) vs orjson direto do dict (agora)
+  - redis:  json.loads + TranscriptionResult + serialização (antes) vs bytes em cache devolvidos sem parse
+  - cache:  json.dumps(default=str) (antes) vs orjson.dumps (agora) ao gravar no Redis
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from src.models.transcription import TranscriptionResult, TranscriptionStatus  # noqa: E402
+from src.services.result_cache import encode  # noqa: E402
+
+
+def make_result(segments: int) -> dict:
+    """Resultado no formato do WhisperX (segmentos com palavras alinhadas)"""
+    now = datetime.utcnow()
+    return {
+        "job_id": "6f1c5b8e-3f7a-4a51-9d55-0c2e1f0b9a11",
+        "status": TranscriptionStatus.COMPLETED,
+        "text": " ".join(f"segmento {i}" for i in range(segments)),
+        "segments": [
+            {
+                "start": i * 2.0,
+                "end": i * 2.0 + 1.8,
+                "text": f"segmento número {i} da transcrição",
+                "words": [
+                    {"word": word, "start": i * 2.0 + j * 0.3, "end": i * 2.0 + j * 0.3 + 0.25, "score": 0.93}
+                    for j, word in enumerate(["segmento", "número", str(i), "da", "transcrição"])
+                ],
+            }
+            for i in range(segments)
+        ],
+        "language": "pt",
+        "duration": segments * 2.0,
+        "created_at": now,
+        "completed_at": now,
+        "error_message": None,
+        "metadata": {"model": "large-v2"},
+    }
+
+
+def timed(fn, repeat: int) -> float:
+    """Mediana em ms de `repeat` execuções"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--segments", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'segmentos':>9} {'KB':>8} | {'banco antes':>11} {'agora':>8} | {'redis antes':>11} {'agora':>8} | "
+          f"{'cache antes':>11} {'agora':>8}")
+    for segments in args.segments:
+        data = make_result(segments)
+        repeat = max(3, min(100, 20_000 // max(segments, 1)))
+
+        old_cached = json.dumps(jsonable_encoder(TranscriptionResult(**data)), default=str, ensure_ascii=False)
+        new_cached = encode(data)
+
+        # Antes: validação do Pydantic + jsonable_encoder + json.dumps (JSONResponse)
+        db_old = timed(lambda: json.dumps(jsonable_encoder(TranscriptionResult(**data)), ensure_ascii=False).encode(), repeat)
+        db_new = timed(lambda: encode(data), repeat)
+
+        redis_old = timed(
+            lambda: json.dumps(
+                jsonable_encoder(TranscriptionResult(**json.loads(old_cached))), ensure_ascii=False
+            ).encode(),
+            repeat
+        )
+        # Agora: o valor do Redis já é o corpo da resposta (só a conversão str -> bytes da Response)
+        cached_str = new_cached.decode()
+        redis_new = timed(lambda: cached_str.encode(), repeat)
+
+        cache_old = timed(lambda: json.dumps(jsonable_encoder(data), default=str, ensure_ascii=False), repeat)
+        cache_new = timed(lambda: encode(data), repeat)
+
+        print(
+            f"{segments:>9} {len(new_cached) / 1024:>8.0f} | {db_old:>11.2f} {db_new:>8.2f} | "
+            f"{redis_old:>11.2f} {redis_new:>8.3f} | {cache_old:>11.2f} {cache_new:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Throughput de download dos uploads pelos workers: mount StaticFiles (antes) vs rota /media (agora).
+
+Uso:
+    python benchmarks/bench_media.py --size-mb 64 --downloads 8 --concurrency 1 4
+
+Sobe um uvicorn local com as duas formas de servir o mesmo arquivo e mede MB/s para:
+  - GET inteiro no /uploads (StaticFiles) e no /media (URL assinada)
+  - download em partes paralelas com Range (como o worker faz em arquivos grandes); o StaticFiles
+    desta versão do Starlette ignora Range, então só a rota /media é medida nesse modo
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(upload_dir: str, port: int):
+    os.environ["UPLOAD_DIR"] = upload_dir
+    os.environ.setdefault("APP_URL", f"http://127.0.0.1:{port}")
+
+    import uvicorn
+    from fastapi import FastAPI
+    from fastapi.staticfiles import StaticFiles
+    from src.api.routes import media
+
+    app = FastAPI()
+    app.mount("/uploads", StaticFiles(directory=upload_dir), name="uploads")
+    app.include_router(media.router, prefix="/media")
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def full_downloads(url: str, downloads: int, concurrency: int) -> float:
+    """MB/s agregados baixando o arquivo inteiro `downloads` vezes"""
+    semaphore = asyncio.Semaphore(concurrency)
+    total = 0
+
+    async with httpx.AsyncClient(timeout=120) as client:
+        async def one():
+            nonlocal total
+            async with semaphore:
+                async with client.stream("GET", url) as response:
+                    async for chunk in response.aiter_raw(1024 * 1024):
+                        total += len(chunk)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(downloads)))
+        return total / 2**20 / (time.perf_counter() - started)
+
+
+async def range_downloads(url: str, size: int, downloads: int, parts: int) -> float:
+    """MB/s baixando em `parts` requisições Range paralelas por arquivo"""
+    part_size = -(-size // parts)
+    total = 0
+
+    async with httpx.AsyncClient(timeout=120, limits=httpx.Limits(max_connections=parts)) as client:
+        async def part(start: int):
+            nonlocal total
+            end = min(start + part_size, size) - 1
+            response = await client.get(url, headers={"Range": f"bytes={start}-{end}"})
+            if response.status_code != 206:
+                raise RuntimeError(f"Range ignorado (status {response.status_code})")
+            total += len(response.content)
+
+        started = time.perf_counter()
+        for _ in range(downloads):
+            await asyncio.gather(*(part(start) for start in range(0, size, part_size)))
+        return total / 2**20 / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--downloads", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--parts", type=int, default=8)
+    args = parser.parse_args()
+
+    upload_dir = tempfile.mkdtemp(prefix="echo-media-")
+    size = args.size_mb * 2**20
+    with open(os.path.join(upload_dir, "audio.wav"), "wb") as f:
+        f.write(os.urandom(size))
+
+    port = free_port()
+    start_server(upload_dir, port)
+
+    from src.services.storage import get_storage
+
+    storage = get_storage()
+    static_url = f"http://127.0.0.1:{port}/uploads/audio.wav"
+    media_url = storage.presigned_get(storage.ref("audio.wav"))
+
+    print(f"{'modo':<28} {'concorrência':>12} {'MB/s':>9}")
+    for concurrency in args.concurrency:
+        static = asyncio.run(full_downloads(static_url, args.downloads, concurrency))
+        served = asyncio.run(full_downloads(media_url, args.downloads, concurrency))
+        print(f"{'GET /uploads (StaticFiles)':<28} {concurrency:>12} {static:>9.0f}")
+        print(f"{'GET /media':<28} {concurrency:>12} {served:>9.0f}")
+
+    ranged = asyncio.run(range_downloads(media_url, size, args.downloads, args.parts))
+    print(f"{f'Range x{args.parts} /media':<28} {args.parts:>12} {ranged:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
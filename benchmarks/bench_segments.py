@@ -0,0 +1,110 @@
+"""Memória e velocidade de conversão: lista de dicts (JSON) vs SegmentTable (colunar).
+
+Uso:
+    python benchmarks/bench_segments.py --segments 1000 10000 100000
+
+Para cada tamanho reporta:
+  - memória: tracemalloc da lista de dicts vs arrays + blobs da tabela
+  - tamanho: JSON (orjson) vs formato binário
+  - leitura: orjson.loads vs SegmentTable.from_bytes (e to_segments, na borda da API)
+  - legendas: SRT com formatação por segmento (antes) vs vetorizada (agora)
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import orjson
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.utils.segment_table import SegmentTable  # noqa: E402
+
+
+def make_segments(segments: int) -> list:
+    """Segmentos no formato do WhisperX com palavras alinhadas e falantes"""
+    return [
+        {
+            "start": i * 2.0,
+            "end": i * 2.0 + 1.8,
+            "text": f" segmento número {i} da transcrição",
+            "speaker": f"SPEAKER_{i % 3:02d}",
+            "words": [
+                {"word": word, "start": i * 2.0 + j * 0.3, "end": i * 2.0 + j * 0.3 + 0.25, "score": 0.93,
+                 "speaker": f"SPEAKER_{i % 3:02d}"}
+                for j, word in enumerate(["segmento", "número", str(i), "da", "transcrição"])
+            ],
+        }
+        for i in range(segments)
+    ]
+
+
+def old_srt(segments: list) -> str:
+    """Conversão anterior (um f-string por timestamp)"""
+    def fmt(seconds: float) -> str:
+        hours = int(seconds // 3600)
+        minutes = int((seconds % 3600) // 60)
+        secs = int(seconds % 60)
+        milliseconds = int((seconds % 1) * 1000)
+        return f"{hours:02d}:{minutes:02d}:{secs:02d},{milliseconds:03d}"
+
+    lines = []
+    for i, segment in enumerate(segments, 1):
+        lines += [f"{i}", f"{fmt(segment.get('start', 0))} --> {fmt(segment.get('end', 0))}",
+                  segment.get("text", "").strip(), ""]
+    return "\n".join(lines)
+
+
+def measure_memory(build) -> int:
+    tracemalloc.start()
+    value = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del value
+    return current
+
+
+def timed(fn, repeat: int) -> float:
+    """Mediana em ms de `repeat` execuções"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--segments", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'segmentos':>9} | {'mem dicts':>9} {'tabela':>8} | {'JSON KB':>8} {'bin KB':>8} | "
+          f"{'loads':>8} {'from_bytes':>10} {'to_segs':>8} | {'SRT antes':>9} {'agora':>8}")
+    for segments in args.segments:
+        data = make_segments(segments)
+        json_bytes = orjson.dumps(data)
+        table = SegmentTable.from_segments(data)
+        binary = table.to_bytes()
+        repeat = max(3, min(50, 200_000 // segments))
+
+        mem_dicts = measure_memory(lambda: orjson.loads(json_bytes))
+        mem_table = measure_memory(lambda: SegmentTable.from_segments(data))
+
+        loads = timed(lambda: orjson.loads(json_bytes), repeat)
+        from_bytes = timed(lambda: SegmentTable.from_bytes(binary), repeat)
+        to_segments = timed(lambda: SegmentTable.from_bytes(binary).to_segments(), repeat)
+        srt_old = timed(lambda: old_srt(orjson.loads(json_bytes)), repeat)
+        srt_new = timed(lambda: SegmentTable.from_bytes(binary).to_srt(), repeat)
+
+        print(
+            f"{segments:>9} | {mem_dicts / 2**20:>8.1f}M {mem_table / 2**20:>7.1f}M | "
+            f"{len(json_bytes) / 1024:>8.0f} {len(binary) / 1024:>8.0f} | "
+            f"{loads:>8.2f} {from_bytes:>10.3f} {to_segments:>8.2f} | {srt_old:>9.2f} {srt_new:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
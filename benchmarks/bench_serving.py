@@ -0,0 +1,118 @@
+"""Cold start e throughput da API em modo multiprocesso (gunicorn + workers uvicorn).
+
+Uso:
+    python benchmarks/bench_serving.py --workers 1 2 4 8 16 --duration 15 --concurrency 64
+
+Para cada número de workers o script sobe `gunicorn -c gunicorn.conf.py app:app` numa porta
+livre, mede o tempo até todos os workers completarem o startup (cold start) e então gera carga
+com httpx contra --path, reportando requisições/s e latência p50/p99. Rode a partir da raiz do
+repositório (o app monta ./uploads) com as variáveis de ambiente da API configuradas.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int, port: int, log_path: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "WEB_CONCURRENCY": str(workers),
+        "PORT": str(port),
+        "ECHO_RUN_DIR": tempfile.mkdtemp(prefix="echo-bench-"),
+        # O reconciliador não deve competir com a carga durante a medição
+        "RECONCILER_INTERVAL": "0",
+    }
+    log = open(log_path, "w")
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+        env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+
+
+def wait_ready(process: subprocess.Popen, workers: int, log_path: str, timeout: float = 120) -> float:
+    """Segundos até todos os workers registrarem 'Application startup complete'"""
+    started = time.monotonic()
+    while time.monotonic() - started < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn saiu com código {process.returncode}; veja {log_path}")
+        with open(log_path) as f:
+            if f.read().count("Application startup complete") >= workers:
+                return time.monotonic() - started
+        time.sleep(0.02)
+    raise TimeoutError("workers não ficaram prontos a tempo")
+
+
+async def load(url: str, duration: float, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        async def worker():
+            nonlocal errors
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    if response.status_code >= 500:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / duration,
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else None,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else None,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--path", default="/health")
+    args = parser.parse_args()
+
+    print(f"{'workers':>7} {'cold start (s)':>15} {'req/s':>10} {'p50 (ms)':>9} {'p99 (ms)':>9} {'erros':>6}")
+    for workers in args.workers:
+        port = free_port()
+        log_path = os.path.join(tempfile.gettempdir(), f"echo-bench-{workers}.log")
+        process = start_server(workers, port, log_path)
+        try:
+            cold_start = wait_ready(process, workers, log_path)
+            # Aquecimento curto (conexões keep-alive, caches de rota)
+            asyncio.run(load(f"http://127.0.0.1:{port}{args.path}", 1, args.concurrency))
+            result = asyncio.run(load(f"http://127.0.0.1:{port}{args.path}", args.duration, args.concurrency))
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+        print(
+            f"{workers:>7} {cold_start:>15.2f} {result['rps']:>10.0f} "
+            f"{result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f} {result['errors']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
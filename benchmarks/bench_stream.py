@@ -0,0 +1,122 @@
+"""Teste de carga do streaming em tempo real (WebSocket /api/v1/transcription/stream).
+
+Uso:
+    python benchmarks/bench_stream.py --audio fala.wav --streams 1 4 8 --url ws://localhost:8000
+
+Para cada número de streams simultâneos, abre N conexões que enviam o mesmo áudio (decodificado
+com ffmpeg para PCM 16kHz) em tempo real, em frames de --frame-ms, e mede a latência das legendas
+do lado do cliente: instante em que a legenda chegou menos o instante em que o áudio do fim da
+legenda foi enviado. Reporta p50/p95/p99 de parciais e finalizadas, streams recusados (capacidade)
+e quanto o `done` atrasou em relação ao fim do áudio.
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+
+import websockets
+
+SAMPLE_RATE = 16000
+
+
+def load_pcm(path: str) -> bytes:
+    """Áudio qualquer -> PCM s16le mono 16kHz via ffmpeg"""
+    return subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-i", path, "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"],
+        check=True, capture_output=True
+    ).stdout
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+async def one_stream(url: str, pcm: bytes, frame_ms: int, token: str, results: dict):
+    frame_bytes = SAMPLE_RATE * 2 * frame_ms // 1000
+    headers = {"Authorization": f"Bearer {token}"} if token else None
+    try:
+        ws = await websockets.connect(f"{url}/api/v1/transcription/stream?encoding=pcm_s16le", additional_headers=headers)
+    except Exception:
+        results["rejected"] += 1
+        return
+
+    async with ws:
+        ready = json.loads(await ws.recv())
+        if ready.get("type") != "ready":
+            results["rejected"] += 1
+            return
+        started = time.perf_counter()
+
+        async def sender():
+            # Frames no ritmo real: o byte N sai em started + N / taxa
+            for offset in range(0, len(pcm), frame_bytes):
+                delay = started + offset / (SAMPLE_RATE * 2) - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await ws.send(pcm[offset:offset + frame_bytes])
+            await ws.send(json.dumps({"type": "end"}))
+
+        send_task = asyncio.create_task(sender())
+        try:
+            async for raw in ws:
+                message = json.loads(raw)
+                now = time.perf_counter() - started
+                if message["type"] == "partial":
+                    results["partial"].append(now - message["end"])
+                elif message["type"] == "final":
+                    results["final"].append(now - message["segment"]["end"])
+                elif message["type"] == "done":
+                    results["done_delay"].append(now - len(pcm) / (SAMPLE_RATE * 2))
+                    results["completed"] += 1
+                    break
+                elif message["type"] == "error":
+                    results["errors"] += 1
+                    break
+        except websockets.ConnectionClosed:
+            results["errors"] += 1
+        finally:
+            send_task.cancel()
+
+
+async def run(url: str, pcm: bytes, streams: int, frame_ms: int, token: str) -> dict:
+    results = {"partial": [], "final": [], "done_delay": [], "completed": 0, "rejected": 0, "errors": 0}
+    await asyncio.gather(*(one_stream(url, pcm, frame_ms, token, results) for _ in range(streams)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--audio", required=True, help="Arquivo de áudio com fala (qualquer formato lido pelo ffmpeg)")
+    parser.add_argument("--url", default="ws://localhost:8000")
+    parser.add_argument("--streams", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--frame-ms", type=int, default=100)
+    parser.add_argument("--token", default=None)
+    args = parser.parse_args()
+
+    pcm = load_pcm(args.audio)
+    print(f"áudio: {len(pcm) / (SAMPLE_RATE * 2):.1f}s, frames de {args.frame_ms}ms", file=sys.stderr)
+
+    header = f"{'streams':>7} {'ok':>4} {'recus.':>6} {'erros':>5} {'parcial p50/p95/p99 (s)':>26} {'final p50/p95/p99 (s)':>24} {'done +s':>8}"
+    print(header)
+    for streams in args.streams:
+        r = asyncio.run(run(args.url, pcm, streams, args.frame_ms, args.token))
+
+        def fmt(values):
+            if not values:
+                return "-"
+            return "/".join(f"{percentile(values, pct):.2f}" for pct in (50, 95, 99))
+
+        done = percentile(r["done_delay"], 50)
+        print(
+            f"{streams:>7} {r['completed']:>4} {r['rejected']:>6} {r['errors']:>5} "
+            f"{fmt(r['partial']):>26} {fmt(r['final']):>24} {done if done is None else round(done, 2):>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Corte de silêncio no worker: segundos de GPU economizados e diferença de precisão num conjunto de referência.
+
+Uso:
+    python benchmarks/bench_vad_trim.py --refs ./referencias --model small --device cuda
+
+--refs é um diretório com pares `nome.<áudio>` + `nome.txt` (transcrição de referência). Para cada
+arquivo o script transcreve com faster-whisper o áudio inteiro e o áudio compactado por
+`trim_silence` (mesmo código e variáveis WORKER_VAD_* do worker), remapeia os timestamps com
+`remap_segments` e reporta: fração cortada, tempo de ASR nos dois casos, WER de cada um e o desvio
+médio do início das palavras em comum (compactado remapeado vs inteiro).
+Requer as dependências do worker (modal, whisperx, faster-whisper) e ffmpeg.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from difflib import SequenceMatcher
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.modal_functions.whisperx_transcriber import SAMPLE_RATE, trim_silence, remap_segments  # noqa: E402
+
+
+def load_audio(path: str, workdir: str) -> np.ndarray:
+    pcm_path = os.path.join(workdir, "audio.f32")
+    subprocess.run(
+        ["ffmpeg", "-nostdin", "-v", "error", "-y", "-i", path, "-f", "f32le", "-ac", "1", "-ar", str(SAMPLE_RATE), pcm_path],
+        check=True
+    )
+    return np.memmap(pcm_path, dtype=np.float32, mode="r")
+
+
+def normalize(text: str) -> list:
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def wer(reference: list, hypothesis: list) -> float:
+    """Distância de edição em palavras / palavras da referência"""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1] / max(len(reference), 1)
+
+
+def transcribe(model, audio: np.ndarray, language: str):
+    started = time.perf_counter()
+    segments, _ = model.transcribe(np.array(audio), language=language, word_timestamps=True, beam_size=5)
+    result = [
+        {"start": s.start, "end": s.end, "text": s.text.strip(),
+         "words": [{"word": w.word.strip(), "start": w.start, "end": w.end} for w in s.words or []]}
+        for s in segments
+    ]
+    return result, time.perf_counter() - started
+
+
+def word_drift(full: list, trimmed: list) -> float:
+    """Desvio médio (s) do início das palavras iguais, pareadas por alinhamento de sequência"""
+    full_words = [w for s in full for w in s["words"]]
+    trimmed_words = [w for s in trimmed for w in s["words"]]
+    matcher = SequenceMatcher(a=[w["word"].lower() for w in full_words], b=[w["word"].lower() for w in trimmed_words], autojunk=False)
+    drifts = [
+        abs(full_words[block.a + k]["start"] - trimmed_words[block.b + k]["start"])
+        for block in matcher.get_matching_blocks() for k in range(block.size)
+    ]
+    return float(np.mean(drifts)) if drifts else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--refs", required=True)
+    parser.add_argument("--model", default="small")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--language", default=None)
+    args = parser.parse_args()
+
+    from faster_whisper import WhisperModel
+
+    model = WhisperModel(args.model, device=args.device, compute_type="float16" if args.device == "cuda" else "int8")
+    references = sorted(f for f in os.listdir(args.refs) if not f.endswith(".txt"))
+
+    print(f"{'arquivo':<28} {'dur(s)':>7} {'cortado':>8} {'asr inteiro':>11} {'asr cortado':>11} "
+          f"{'WER inteiro':>11} {'WER cortado':>11} {'desvio(s)':>9}")
+    totals = {"full": 0.0, "trimmed": 0.0, "wer_full": [], "wer_trimmed": []}
+    for name in references:
+        ref_path = os.path.join(args.refs, os.path.splitext(name)[0] + ".txt")
+        if not os.path.exists(ref_path):
+            continue
+        reference = normalize(open(ref_path, encoding="utf-8").read())
+        workdir = tempfile.mkdtemp(prefix="echo-vad-")
+        audio = load_audio(os.path.join(args.refs, name), workdir)
+
+        full, full_seconds = transcribe(model, audio, args.language)
+        compact, offset_map, metrics = trim_silence(audio, workdir, name)
+        trimmed, trimmed_seconds = transcribe(model, compact, args.language)
+        if offset_map is not None:
+            trimmed = remap_segments(trimmed, offset_map)
+
+        wer_full = wer(reference, normalize(" ".join(s["text"] for s in full)))
+        wer_trimmed = wer(reference, normalize(" ".join(s["text"] for s in trimmed)))
+        totals["full"] += full_seconds
+        totals["trimmed"] += trimmed_seconds
+        totals["wer_full"].append(wer_full)
+        totals["wer_trimmed"].append(wer_trimmed)
+        print(
+            f"{name[:28]:<28} {metrics['original_seconds']:>7.0f} {metrics['trimmed_ratio']:>8.1%} "
+            f"{full_seconds:>11.1f} {trimmed_seconds:>11.1f} {wer_full:>11.3f} {wer_trimmed:>11.3f} "
+            f"{word_drift(full, trimmed):>9.3f}"
+        )
+
+    if totals["wer_full"]:
+        print(
+            f"\nASR: {totals['full']:.1f}s -> {totals['trimmed']:.1f}s "
+            f"({1 - totals['trimmed'] / totals['full']:.1%} economizado); "
+            f"WER médio {np.mean(totals['wer_full']):.3f} -> {np.mean(totals['wer_trimmed']):.3f} "
+            f"(delta {np.mean(totals['wer_trimmed']) - np.mean(totals['wer_full']):+.3f})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""Simulação local de custo x latência do roteamento entre variantes do worker (cpu, t4, a10g).
+
+Uso:
+    python benchmarks/simulate_routing.py --trace jobs.csv --policies router t4 --warm t4=0 --warm t4=1,cpu=1
+    python benchmarks/simulate_routing.py --from-db --hours 168
+    python benchmarks/simulate_routing.py --synthetic 2000 --rate 120
+
+O trace (CSV com cabeçalho ou JSONL) tem uma linha por job: `arrival` (segundos desde o início ou
+timestamp ISO), `duration` (segundos de áudio) e, opcionalmente, `tier` e `diarize`. `--from-db` reproduz
+os jobs reais do banco (DATABASE_URL) nas últimas --hours; `--synthetic` gera chegadas Poisson com mistura
+de notas de voz curtas e reuniões longas.
+
+Cada política (`router` = WorkerRouter com a fila simulada; ou o nome de uma variante, que recebe todos os
+jobs) é reproduzida por eventos discretos com os perfis de src/services/worker_router.py: cold start ao
+subir container, até max_containers por variante, pool mínimo aquecido (--warm) sempre ligado, containers
+ociosos desligados após WORKER_SCALEDOWN_WINDOW e timeouts repetidos como nos retries do Modal. Reporta o
+custo total (tempo de container ligado, inclusive ocioso), US$ por hora de áudio, timeouts, cold starts e
+p50/p95/p99 da latência (chegada até o fim) no geral e por tier.
+"""
+import argparse
+import csv
+import heapq
+import json
+import os
+import random
+import sys
+from collections import deque
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.services.worker_router import WorkerRouter, load_variants  # noqa: E402
+from src.utils.helpers import percentile  # noqa: E402
+
+TIERS = ("economy", "standard", "priority")
+
+
+def load_trace(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()] if path.endswith(".jsonl") else list(csv.DictReader(f))
+
+    jobs = []
+    for row in rows:
+        arrival = row["arrival"]
+        try:
+            arrival = float(arrival)
+        except (TypeError, ValueError):
+            arrival = datetime.fromisoformat(str(arrival)).timestamp()
+        jobs.append({
+            "arrival": arrival,
+            "duration": float(row["duration"]),
+            "tier": row.get("tier") or "standard",
+            "diarize": str(row.get("diarize", "")).lower() in ("1", "true", "yes")
+        })
+    return normalize(jobs)
+
+
+def load_from_db(hours: float) -> list:
+    """Jobs reais (exceto via expressa e streams, que não passam pelo worker) com duração conhecida"""
+    from src.database.connection import SessionLocal
+    from src.database.models import Job
+
+    db = SessionLocal()
+    try:
+        rows = db.query(Job.created_at, Job.duration, Job.job_data).filter(
+            Job.created_at >= datetime.utcnow() - timedelta(hours=hours)
+        ).all()
+    finally:
+        db.close()
+
+    jobs = []
+    for created_at, duration, job_data in rows:
+        job_data = job_data or {}
+        if job_data.get("upload") in ("express", "stream") or job_data.get("cached_from"):
+            continue
+        duration = duration or (job_data.get("media") or {}).get("duration")
+        if not duration:
+            continue
+        jobs.append({
+            "arrival": created_at.timestamp(),
+            "duration": float(duration),
+            "tier": job_data.get("tier") or "standard",
+            "diarize": bool(job_data.get("diarize"))
+        })
+    return normalize(jobs)
+
+
+def synthetic_trace(count: int, rate_per_hour: float, seed: int) -> list:
+    rng = random.Random(seed)
+    jobs, now = [], 0.0
+    for _ in range(count):
+        now += rng.expovariate(rate_per_hour / 3600)
+        kind = rng.random()
+        if kind < 0.6:
+            duration = rng.lognormvariate(3.5, 0.8)  # notas de voz, ~30s
+        elif kind < 0.9:
+            duration = rng.lognormvariate(6.4, 0.6)  # ~10min
+        else:
+            duration = rng.lognormvariate(8.2, 0.5)  # reuniões/aulas, ~1h
+        jobs.append({
+            "arrival": now,
+            "duration": min(duration, 6 * 3600),
+            "tier": rng.choices(TIERS, weights=(3, 6, 1))[0],
+            "diarize": rng.random() < 0.15
+        })
+    return jobs
+
+
+def normalize(jobs: list) -> list:
+    jobs.sort(key=lambda job: job["arrival"])
+    start = jobs[0]["arrival"] if jobs else 0.0
+    for job in jobs:
+        job["arrival"] -= start
+    return jobs
+
+
+def parse_warm(spec: str) -> dict:
+    """"t4=1,cpu=2" -> {"t4": 1, "cpu": 2}"""
+    warm = {}
+    for part in filter(None, spec.split(",")):
+        name, _, count = part.partition("=")
+        warm[name.strip()] = int(count)
+    return warm
+
+
+class Pool:
+    """Containers e fila de uma variante"""
+
+    def __init__(self, name: str, variant: dict):
+        self.name = name
+        self.variant = variant
+        self.queue = deque()
+        self.containers = []
+        self.cold_starts = 0
+
+    def alive(self) -> list:
+        return [c for c in self.containers if c["stopped"] is None]
+
+    def depth(self) -> int:
+        return len(self.queue) + sum(1 for c in self.alive() if c["job"] is not None)
+
+
+def simulate(jobs: list, variants: dict, policy: str, scaledown: float, retries: int, jitter: float, seed: int) -> dict:
+    rng = random.Random(seed)
+    router = WorkerRouter(variants=variants)
+    pools = {name: Pool(name, variant) for name, variant in variants.items()}
+    events, sequence = [], 0
+
+    def push(when, kind, *data):
+        nonlocal sequence
+        sequence += 1
+        heapq.heappush(events, (when, sequence, kind, data))
+
+    def launch(pool, now, ready_at):
+        container = {"started": now, "ready_at": ready_at, "job": None, "idle_since": ready_at, "stopped": None}
+        pool.containers.append(container)
+        push(ready_at, "ready", pool, container)
+
+    def dispatch(pool, now):
+        for container in pool.alive():
+            if not pool.queue:
+                break
+            if container["job"] is None and container["ready_at"] <= now:
+                start(pool, container, pool.queue.popleft(), now)
+
+        starting = sum(1 for c in pool.alive() if c["ready_at"] > now)
+        missing = min(len(pool.queue) - starting, pool.variant["max_containers"] - len(pool.alive()))
+        for _ in range(max(0, missing)):
+            pool.cold_starts += 1
+            launch(pool, now, now + pool.variant["cold_start"])
+
+    def start(pool, container, job, now):
+        variant = pool.variant
+        service = (variant["overhead"] + variant["rtf"] * job["duration"]) * (rng.lognormvariate(0, jitter) if jitter else 1)
+        timed_out = service > variant["timeout"]
+        container["job"] = job
+        job.setdefault("started", now)
+        push(now + min(service, variant["timeout"]), "done", pool, container, job, timed_out)
+
+    # Pool aquecido já ligado no início do trace
+    for pool in pools.values():
+        for _ in range(pool.variant["min_containers"]):
+            launch(pool, 0.0, 0.0)
+
+    for job in jobs:
+        push(job["arrival"], "arrival", {**job, "attempts": 0})
+
+    finished, timeouts, end = [], 0, 0.0
+    while events:
+        now, _, kind, data = heapq.heappop(events)
+        end = max(end, now)
+
+        if kind == "arrival":
+            job = data[0]
+            if policy == "router":
+                depths = {name: pool.depth() for name, pool in pools.items()}
+                job["worker"] = router.choose(job["duration"], job["tier"], job["diarize"], depths)["worker"]
+            else:
+                job["worker"] = policy
+            pool = pools[job["worker"]]
+            pool.queue.append(job)
+            dispatch(pool, now)
+
+        elif kind == "ready":
+            dispatch(data[0], now)
+
+        elif kind == "done":
+            pool, container, job, timed_out = data
+            container["job"] = None
+            container["idle_since"] = now
+            job["attempts"] += 1
+            if not timed_out:
+                finished.append({**job, "latency": now - job["arrival"]})
+            elif job["attempts"] <= retries:
+                pool.queue.append(job)
+            else:
+                timeouts += 1
+            dispatch(pool, now)
+            if container["job"] is None:
+                push(now + scaledown, "scaledown", pool, container, now)
+
+        elif kind == "scaledown":
+            pool, container, idle_since = data
+            if (container["stopped"] is None and container["job"] is None and container["idle_since"] == idle_since
+                    and len(pool.alive()) > pool.variant["min_containers"]):
+                container["stopped"] = now
+
+    cost, jobs_by_worker = 0.0, {}
+    for pool in pools.values():
+        seconds = sum((c["stopped"] if c["stopped"] is not None else end) - c["started"] for c in pool.containers)
+        cost += seconds * pool.variant["cost_per_hour"] / 3600
+    for job in finished:
+        jobs_by_worker[job["worker"]] = jobs_by_worker.get(job["worker"], 0) + 1
+
+    latencies = sorted(job["latency"] for job in finished)
+    by_tier = {
+        tier: sorted(job["latency"] for job in finished if job["tier"] == tier)
+        for tier in TIERS
+    }
+    audio_hours = sum(job["duration"] for job in jobs) / 3600
+    return {
+        "cost": cost,
+        "cost_per_audio_hour": cost / audio_hours if audio_hours else 0.0,
+        "timeouts": timeouts,
+        "cold_starts": sum(pool.cold_starts for pool in pools.values()),
+        "latency": latencies,
+        "by_tier": by_tier,
+        "jobs_by_worker": jobs_by_worker
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--trace", help="CSV ou JSONL com arrival, duration[, tier, diarize]")
+    source.add_argument("--from-db", action="store_true", help="Reproduz os jobs do banco (DATABASE_URL)")
+    source.add_argument("--synthetic", type=int, metavar="N", help="Gera N jobs sintéticos")
+    parser.add_argument("--hours", type=float, default=168, help="Janela dos jobs com --from-db")
+    parser.add_argument("--rate", type=float, default=60, help="Jobs por hora com --synthetic")
+    parser.add_argument("--policies", nargs="+", default=["router", "t4"])
+    parser.add_argument("--warm", action="append", default=None, help="Pool aquecido, ex.: t4=1,cpu=1 (repita para comparar)")
+    parser.add_argument("--scaledown", type=float, default=float(os.getenv("WORKER_SCALEDOWN_WINDOW", 60)))
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--jitter", type=float, default=0.15, help="Desvio (lognormal) do tempo de serviço")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.trace:
+        jobs = load_trace(args.trace)
+    elif args.from_db:
+        jobs = load_from_db(args.hours)
+    else:
+        jobs = synthetic_trace(args.synthetic, args.rate, args.seed)
+    if not jobs:
+        sys.exit("Trace vazio")
+
+    variants = load_variants()
+    span = jobs[-1]["arrival"] / 3600
+    print(
+        f"{len(jobs)} jobs em {span:.1f}h, {sum(j['duration'] for j in jobs) / 3600:.1f}h de áudio; "
+        f"variantes: {', '.join(variants)}", file=sys.stderr
+    )
+
+    print(
+        f"{'política':<10} {'pool aquecido':<16} {'custo US$':>10} {'US$/h áudio':>11} {'timeouts':>8} {'cold':>6} "
+        f"{'p50/p95/p99 (s)':>22} {'priority p95':>12} {'jobs por variante'}"
+    )
+    for warm_spec in args.warm or [""]:
+        warm = parse_warm(warm_spec)
+        configured = {
+            name: {**variant, "min_containers": warm.get(name, variant["min_containers"])}
+            for name, variant in variants.items()
+        }
+        for policy in args.policies:
+            if policy != "router" and policy not in configured:
+                print(f"{policy:<10} variante não habilitada em WORKER_VARIANTS")
+                continue
+            r = simulate(jobs, configured, policy, args.scaledown, args.retries, args.jitter, args.seed)
+            latency = "/".join(f"{percentile(r['latency'], pct) or 0:.0f}" for pct in (50, 95, 99))
+            priority = percentile(r["by_tier"]["priority"], 95)
+            pool = ",".join(f"{n}={v['min_containers']}" for n, v in configured.items() if v["min_containers"]) or "-"
+            print(
+                f"{policy:<10} {pool:<16} {r['cost']:>10.2f} {r['cost_per_audio_hour']:>11.3f} {r['timeouts']:>8} "
+                f"{r['cold_starts']:>6} {latency:>22} {'-' if priority is None else f'{priority:.0f}':>12} "
+                f"{', '.join(f'{n}={c}' for n, c in sorted(r['jobs_by_worker'].items()))}"
+            )
+
+
+if __name__ == "__main__":
+    main()
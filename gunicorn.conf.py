@@ -0,0 +1,58 @@
+# Configuração de produção: gunicorn (master) + workers uvicorn
+#   gunicorn -c gunicorn.conf.py app:app
+# Para desenvolvimento continue usando `python app.py` (um processo com reload).
+import os
+import shutil
+
+
+def _available_cores() -> int:
+    # Respeita cpuset/affinity do container, não só o número de CPUs do host
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', 8000)}"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", _available_cores()))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+# Reinício periódico dos workers limita crescimento de memória (0 desativa)
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+accesslog = os.getenv("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+
+# Cada worker importa a aplicação depois do fork (sem estado de event loop herdado do master)
+preload_app = False
+
+# Métricas por worker agregadas no /metrics e locks de líder do reconciliador e do coletor de arquivos
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(os.getenv("ECHO_RUN_DIR", "/tmp/echo"), "metrics"))
+os.environ.setdefault("RECONCILER_LOCK_FILE", os.path.join(os.getenv("ECHO_RUN_DIR", "/tmp/echo"), "reconciler.lock"))
+os.environ.setdefault("STORAGE_GC_LOCK_FILE", os.path.join(os.getenv("ECHO_RUN_DIR", "/tmp/echo"), "storage_gc.lock"))
+
+
+def on_starting(server):
+    """Trabalho único antes do fork: diretórios de runtime e criação do schema"""
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    # Arquivos de métricas de uma execução anterior distorceriam os contadores
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+    os.makedirs(os.path.dirname(os.environ["RECONCILER_LOCK_FILE"]), exist_ok=True)
+
+    from src.database.connection import create_db_and_tables, engine
+
+    create_db_and_tables()
+    # Conexões abertas no master não podem ser compartilhadas com os workers
+    engine.dispose()
+    os.environ["ECHO_SCHEMA_READY"] = "1"
+    server.log.info(f"Schema do banco pronto; iniciando {server.cfg.workers} workers")
+
+
+def child_exit(server, worker):
+    """Remove as métricas 'live' (gauges) do worker que saiu"""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,40 @@
+from logging.config import fileConfig
+from alembic import context
+from src.database.connection import Base, engine, DATABASE_URL
+from src.database import models  # noqa: F401  (registra as tabelas no metadata)
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline():
+    """Gera o SQL sem conectar ao banco (alembic upgrade head --sql)"""
+    context.configure(url=DATABASE_URL, target_metadata=target_metadata, literal_binds=True, render_as_batch=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    # Conexão da aplicação quando chamado por create_db_and_tables; senão o engine de DATABASE_URL
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run(connection)
+        return
+    with engine.connect() as connection:
+        _run(connection)
+
+
+def _run(connection):
+    # render_as_batch: o SQLite só altera tabelas recriando-as
+    context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,50 @@
+"""Tabela jobs original
+
+Bancos criados antes das migrações já têm a tabela: a revisão só a cria quando não existe.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table("jobs"):
+        return
+
+    op.create_table(
+        "jobs",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("trigger_job_id", sa.String(), nullable=True),
+        sa.Column(
+            "status",
+            sa.Enum("PENDING", "PROCESSING", "COMPLETED", "FAILED", name="transcriptionstatus"),
+            nullable=False
+        ),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("file_path", sa.String(), nullable=True),
+        sa.Column("file_url", sa.String(), nullable=True),
+        sa.Column("language", sa.String(), nullable=False),
+        sa.Column("webhook_url", sa.String(), nullable=True),
+        sa.Column("result_text", sa.Text(), nullable=True),
+        sa.Column("result_segments", sa.JSON(), nullable=True),
+        sa.Column("result_language", sa.String(), nullable=True),
+        sa.Column("duration", sa.String(), nullable=True),
+        sa.Column("error_message", sa.Text(), nullable=True),
+        sa.Column("metadata", sa.JSON(), nullable=True)
+    )
+    op.create_index("ix_jobs_trigger_job_id", "jobs", ["trigger_job_id"])
+
+
+def downgrade():
+    op.drop_index("ix_jobs_trigger_job_id", table_name="jobs")
+    op.drop_table("jobs")
@@ -0,0 +1,28 @@
+"""jobs.batch_id (POST /upload/batch)
+
+Revision ID: 0002_jobs_batch_id
+Revises: 0001_baseline
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_jobs_batch_id"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Bancos criados por create_all depois da mudança no modelo já têm a coluna
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("jobs")}
+    if "batch_id" not in columns:
+        with op.batch_alter_table("jobs") as batch_op:
+            batch_op.add_column(sa.Column("batch_id", sa.String(), nullable=True))
+    op.create_index("ix_jobs_batch_id", "jobs", ["batch_id"], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index("ix_jobs_batch_id", table_name="jobs", if_exists=True)
+    with op.batch_alter_table("jobs") as batch_op:
+        batch_op.drop_column("batch_id")
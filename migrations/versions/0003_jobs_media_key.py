@@ -0,0 +1,28 @@
+"""jobs.media_key (reaproveitamento de resultados da mesma mídia)
+
+Revision ID: 0003_jobs_media_key
+Revises: 0002_jobs_batch_id
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_jobs_media_key"
+down_revision = "0002_jobs_batch_id"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Bancos criados por create_all depois da mudança no modelo já têm a coluna
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("jobs")}
+    if "media_key" not in columns:
+        with op.batch_alter_table("jobs") as batch_op:
+            batch_op.add_column(sa.Column("media_key", sa.String(), nullable=True))
+    op.create_index("ix_jobs_media_key", "jobs", ["media_key"], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index("ix_jobs_media_key", table_name="jobs", if_exists=True)
+    with op.batch_alter_table("jobs") as batch_op:
+        batch_op.drop_column("media_key")
@@ -0,0 +1,26 @@
+"""jobs.result_segments_bin (segmentos em formato colunar)
+
+Revision ID: 0004_jobs_result_segments_bin
+Revises: 0003_jobs_media_key
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_jobs_result_segments_bin"
+down_revision = "0003_jobs_media_key"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Bancos criados por create_all depois da mudança no modelo já têm a coluna
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("jobs")}
+    if "result_segments_bin" not in columns:
+        with op.batch_alter_table("jobs") as batch_op:
+            batch_op.add_column(sa.Column("result_segments_bin", sa.LargeBinary(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("jobs") as batch_op:
+        batch_op.drop_column("result_segments_bin")
@@ -1,4 +1,4 @@
-from fastapi import HTTPException, Depends
+from fastapi import HTTPException, Depends, WebSocket
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import os
 import jwt
@@ -29,4 +29,20 @@ async def optional_auth(credentials: Optional[HTTPAuthorizationCredentials] = De
     """Autenticação opcional"""
     if not credentials:
         return {"user": "anonymous"}
-    return await verify_token(credentials)
\ No newline at end of file
+    return await verify_token(credentials)
+
+
+def authenticate_websocket(websocket: WebSocket) -> Optional[dict]:
+    """Autenticação de WebSocket (navegadores não enviam headers): token no header ou em ?token="""
+    jwt_secret = os.getenv("JWT_SECRET")
+    if not jwt_secret:
+        return {"user": "anonymous"}
+
+    authorization = websocket.headers.get("authorization", "")
+    token = authorization[7:] if authorization.lower().startswith("bearer ") else websocket.query_params.get("token")
+    if not token:
+        return None
+    try:
+        return jwt.decode(token, jwt_secret, algorithms=["HS256"])
+    except jwt.PyJWTError:
+        return None
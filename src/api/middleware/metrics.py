@@ -0,0 +1,63 @@
+import time
+from typing import Dict
+from ...utils.metrics import HTTP_REQUEST_LATENCY, HTTP_IN_FLIGHT, UPLOAD_BYTES
+
+UPLOAD_PATH_PREFIX = "/api/v1/upload"
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que mede latência por rota, requisições em andamento e bytes de upload"""
+
+    def __init__(self, app):
+        self.app = app
+        # endpoint -> template da rota (ex.: /api/v1/transcription/{job_id}), resolvido uma vez
+        self._route_templates: Dict[int, str] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = self._route_template(scope)
+            HTTP_REQUEST_LATENCY.labels(scope["method"], route, str(status_code)).observe(
+                time.perf_counter() - started
+            )
+            if scope["path"].startswith(UPLOAD_PATH_PREFIX):
+                self._count_upload_bytes(scope, route)
+
+    def _route_template(self, scope) -> str:
+        """Template da rota em vez do path, para não criar uma série por job_id"""
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+
+        template = self._route_templates.get(id(endpoint))
+        if template is None:
+            template = next(
+                (route.path for route in scope["app"].routes if getattr(route, "endpoint", None) is endpoint),
+                getattr(endpoint, "__name__", "unknown")
+            )
+            self._route_templates[id(endpoint)] = template
+        return template
+
+    def _count_upload_bytes(self, scope, route: str):
+        # Content-Length evita envolver o receive (custo por chunk) só para contar bytes
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if value.isdigit():
+                    UPLOAD_BYTES.labels(route).inc(int(value))
+                return
@@ -0,0 +1,213 @@
+from fastapi import APIRouter, HTTPException, Request, Query
+from fastapi.responses import Response
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, List, Tuple
+import mimetypes
+import secrets
+import logging
+import os
+import anyio
+from ...services.storage import get_storage, LocalStorage
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Leituras de 1MB por chamada quando o servidor não oferece zero-copy
+READ_CHUNK_SIZE = int(os.getenv("MEDIA_READ_CHUNK_SIZE", 1024 * 1024))
+# Acima disso o Range é ignorado e o arquivo vai inteiro (como o max_ranges do nginx)
+MAX_RANGES = int(os.getenv("MEDIA_MAX_RANGES", 16))
+# Com nginx na frente: o nginx serve o arquivo (sendfile) a partir deste prefixo interno
+ACCEL_REDIRECT_PREFIX = os.getenv("MEDIA_ACCEL_REDIRECT_PREFIX")
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[List[Tuple[int, int]]]:
+    """Intervalos [início, fim] pedidos; None para servir tudo, [] se nenhum é satisfazível"""
+    if not header or not header.startswith("bytes="):
+        return None
+
+    ranges = []
+    for part in header[6:].split(","):
+        start, sep, end = part.strip().partition("-")
+        if not sep:
+            return None
+        try:
+            if start:
+                first, last = int(start), int(end) if end else size - 1
+                if end and first > last:
+                    return None
+            elif end:
+                # Sufixo: os últimos N bytes
+                first, last = max(size - int(end), 0), size - 1
+                if int(end) == 0:
+                    continue
+            else:
+                return None
+        except ValueError:
+            return None
+        if first < size:
+            ranges.append((first, min(last, size - 1)))
+
+    if len(ranges) > MAX_RANGES:
+        return None
+    return _merge(ranges)
+
+
+def _merge(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    # Intervalos sobrepostos/adjacentes viram um só (evita servir o mesmo byte várias vezes)
+    if len(ranges) < 2:
+        return ranges
+    merged = []
+    for first, last in sorted(ranges):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return merged
+
+
+class MediaFileResponse(Response):
+    """Arquivo com Range (inclusive multipart/byteranges), usando zero-copy quando o servidor ASGI oferece"""
+
+    def __init__(self, path: str, stat: os.stat_result, ranges: Optional[List[Tuple[int, int]]],
+                 headers: dict, media_type: str, send_body: bool = True):
+        super().__init__(status_code=200, headers=headers, media_type=media_type)
+        self.path = path
+        self.size = stat.st_size
+        self.send_body = send_body
+        self.parts: List[Tuple[bytes, int, int]] = []
+
+        if ranges is None:
+            self.parts = [(b"", 0, self.size)]
+            self.headers["content-length"] = str(self.size)
+        elif len(ranges) == 1:
+            first, last = ranges[0]
+            self.status_code = 206
+            self.parts = [(b"", first, last - first + 1)]
+            self.headers["content-range"] = f"bytes {first}-{last}/{self.size}"
+            self.headers["content-length"] = str(last - first + 1)
+        else:
+            boundary = secrets.token_hex(12)
+            self.status_code = 206
+            for first, last in ranges:
+                part_header = (
+                    f"\r\n--{boundary}\r\nContent-Type: {media_type}\r\n"
+                    f"Content-Range: bytes {first}-{last}/{self.size}\r\n\r\n"
+                ).encode()
+                self.parts.append((part_header, first, last - first + 1))
+            self.trailer = f"\r\n--{boundary}--\r\n".encode()
+            self.headers["content-type"] = f"multipart/byteranges; boundary={boundary}"
+            self.headers["content-length"] = str(
+                sum(len(header) + count for header, _, count in self.parts) + len(self.trailer)
+            )
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if not self.send_body:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        zerocopy = "http.response.zerocopy" in scope.get("extensions", {})
+        fd = await anyio.to_thread.run_sync(os.open, self.path, os.O_RDONLY)
+        try:
+            for header, offset, count in self.parts:
+                if header:
+                    await send({"type": "http.response.body", "body": header, "more_body": True})
+                if zerocopy:
+                    # O servidor faz sendfile() direto do descritor para o socket
+                    await send({
+                        "type": "http.response.zerocopy", "file": fd,
+                        "offset": offset, "count": count, "more_body": True
+                    })
+                    continue
+                end = offset + count
+                while offset < end:
+                    chunk = await anyio.to_thread.run_sync(os.pread, fd, min(READ_CHUNK_SIZE, end - offset), offset)
+                    if not chunk:
+                        raise RuntimeError(f"Arquivo truncado durante o envio: {self.path}")
+                    offset += len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": getattr(self, "trailer", b"")})
+        finally:
+            os.close(fd)
+
+
+def _etag(stat: os.stat_result) -> str:
+    # Mesmo esquema do nginx: mtime e tamanho em hexadecimal
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def _not_modified(request: Request, etag: str, stat: os.stat_result) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+    return _unchanged_since(request.headers.get("if-modified-since"), stat)
+
+
+def _unchanged_since(value: Optional[str], stat: os.stat_result) -> bool:
+    if not value:
+        return False
+    try:
+        return int(stat.st_mtime) <= parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+def _range_applies(request: Request, etag: str, stat: os.stat_result) -> bool:
+    """If-Range: só aplica o Range se o arquivo ainda for a versão que o cliente já tem"""
+    if_range = request.headers.get("if-range")
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return if_range == etag
+    return _unchanged_since(if_range, stat)
+
+
+@router.api_route("/{key}", methods=["GET", "HEAD"], include_in_schema=False)
+async def serve_media(
+        key: str,
+        request: Request,
+        expires: int = Query(...),
+        signature: str = Query(...)
+):
+    """Entrega os arquivos enviados aos workers por URL assinada de curta duração"""
+
+    storage = get_storage()
+    if not isinstance(storage, LocalStorage):
+        raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+
+    path = storage.path_for_key(key)
+    if path is None or not storage.verify_signed("GET", key, expires, signature):
+        raise HTTPException(status_code=403, detail="URL inválida ou expirada")
+
+    try:
+        stat = await anyio.to_thread.run_sync(os.stat, path)
+    except OSError:
+        raise HTTPException(status_code=404, detail="Arquivo não encontrado")
+
+    etag = _etag(stat)
+    media_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+    headers = {
+        "etag": etag,
+        "last-modified": formatdate(stat.st_mtime, usegmt=True),
+        "accept-ranges": "bytes",
+        # A URL já expira; não deixar proxies guardarem cópias
+        "cache-control": "private, no-transform",
+    }
+
+    if _not_modified(request, etag, stat):
+        return Response(status_code=304, headers=headers)
+
+    if ACCEL_REDIRECT_PREFIX:
+        # nginx trata Range/condicionais e envia com sendfile a partir do location interno
+        headers["x-accel-redirect"] = f"{ACCEL_REDIRECT_PREFIX.rstrip('/')}/{key}"
+        return Response(status_code=200, headers=headers, media_type=media_type)
+
+    ranges = parse_range(request.headers.get("range"), stat.st_size)
+    if ranges is not None and not _range_applies(request, etag, stat):
+        ranges = None
+    if ranges == []:
+        return Response(status_code=416, headers={**headers, "content-range": f"bytes */{stat.st_size}"})
+
+    return MediaFileResponse(
+        str(path), stat, ranges, headers, media_type, send_body=request.method == "GET"
+    )
@@ -0,0 +1,115 @@
+from fastapi import APIRouter, HTTPException, Request, Depends, Query
+from sqlalchemy.orm import Session
+import os
+import logging
+from ...api.middleware.auth import optional_auth, verify_token
+from ...database.connection import get_db
+from ...services.stage_stats import stage_report
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get("/stats/eta")
+async def eta_calibration_report(
+    request: Request,
+    limit: int = Query(default=1000, ge=10, le=10000),
+    db: Session = Depends(get_db),
+    user: dict = Depends(optional_auth)
+):
+    """Relatório de calibração do estimador de ETA (percentis de erro)"""
+
+    try:
+        return request.app.state.eta_estimator.calibration_report(db, limit=limit)
+    except Exception as e:
+        logger.error(f"Erro ao gerar relatório de calibração: {str(e)}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
+
+
+@router.get("/stats/stages")
+async def stage_timing_report(
+    hours: float = Query(default=24, gt=0, le=720, description="Janela de tempo em horas"),
+    limit: int = Query(default=5000, ge=10, le=50000),
+    db: Session = Depends(get_db),
+    user: dict = Depends(optional_auth)
+):
+    """Percentis do tempo gasto em cada etapa (fila, Trigger, download, modelos, transcrição, alinhamento)"""
+
+    try:
+        return stage_report(db, hours=hours, limit=limit)
+    except Exception as e:
+        logger.error(f"Erro ao gerar relatório de etapas: {str(e)}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
+
+
+@router.get("/stats/reconciler")
+async def reconciler_report(
+    request: Request,
+    run: bool = Query(default=False, description="Executa uma varredura imediatamente"),
+    user: dict = Depends(optional_auth)
+):
+    """Relatório da última varredura do reconciliador de jobs parados"""
+
+    try:
+        job_reconciler = request.app.state.job_reconciler
+        if run:
+            return await job_reconciler.sweep()
+        return job_reconciler.last_report or {"message": "Nenhuma varredura executada ainda"}
+    except Exception as e:
+        logger.error(f"Erro no relatório do reconciliador: {str(e)}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
+
+
+@router.get("/stats/storage")
+async def storage_report(
+    request: Request,
+    run: bool = Query(default=False, description="Executa uma varredura imediatamente"),
+    user: dict = Depends(verify_token)
+):
+    """Relatório da última varredura do coletor de arquivos (removidos por motivo, bytes em disco)"""
+
+    try:
+        storage_sweeper = request.app.state.storage_sweeper
+        if run:
+            # A varredura apaga arquivos: exige token válido (sem JWT_SECRET não há autenticação)
+            if not os.getenv("JWT_SECRET"):
+                raise HTTPException(status_code=403, detail="Varredura manual exige autenticação (JWT_SECRET)")
+            report = await storage_sweeper.run_now()
+            if report is None:
+                raise HTTPException(status_code=409, detail="Coletor de arquivos em execução em outro processo")
+            return report
+        return storage_sweeper.last_report or {"message": "Nenhuma varredura executada ainda"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro no relatório do coletor de arquivos: {str(e)}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
+
+
+@router.get("/stats/express")
+async def express_report(
+    request: Request,
+    user: dict = Depends(optional_auth)
+):
+    """Estado da via expressa, desfechos (atendidas/desviadas) e latência p50/p99"""
+
+    try:
+        return request.app.state.express_transcriber.report()
+    except Exception as e:
+        logger.error(f"Erro no relatório da via expressa: {str(e)}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
+
+
+@router.get("/stats/routing")
+async def routing_report(
+    request: Request,
+    db: Session = Depends(get_db),
+    user: dict = Depends(optional_auth)
+):
+    """Variantes do worker habilitadas, fila atual e perfil de custo/RTF usado no roteamento"""
+
+    try:
+        return request.app.state.worker_router.report(db)
+    except Exception as e:
+        logger.error(f"Erro no relatório de roteamento: {str(e)}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
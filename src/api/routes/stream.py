@@ -0,0 +1,176 @@
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from datetime import datetime
+import asyncio
+import logging
+import uuid
+import json
+import os
+from ...api.middleware.auth import authenticate_websocket
+from ...database.connection import SessionLocal
+from ...database.models import Job
+from ...models.transcription import TranscriptionStatus
+from ...services.stream_transcriber import StreamSession, AudioDecoder, ENCODINGS
+from ...utils.helpers import with_timestamp
+from ...utils.metrics import STREAM_SESSIONS
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Streams simultâneos por worker (cada um retranscreve o buffer a cada STREAM_STEP segundos); 0 desativa (padrão)
+MAX_SESSIONS = int(os.getenv("STREAM_MAX_SESSIONS", 0))
+# Encerrar streams mais longos que isso (segundos de áudio)
+MAX_DURATION = float(os.getenv("STREAM_MAX_DURATION", 4 * 3600))
+
+_active_sessions = 0
+
+
+@router.websocket("/transcription/stream")
+async def transcription_stream(
+        websocket: WebSocket,
+        language: str = "auto",
+        encoding: str = "pcm_s16le",
+        sample_rate: int = 16000
+):
+    """Transcrição em tempo real: recebe frames de áudio e devolve legendas parciais e finalizadas
+
+    Protocolo: frames binários com o áudio (pcm_s16le/pcm_f32le mono em `sample_rate`, ou Opus em
+    WebM/Ogg) e `{"type": "end"}` em texto para encerrar. O servidor envia `ready`, `partial`, `final`
+    e, no fim, `done` com o job_id do resultado gravado.
+    """
+    global _active_sessions
+
+    if authenticate_websocket(websocket) is None:
+        await websocket.close(code=1008, reason="Token inválido")
+        return
+    if encoding not in ENCODINGS or not 8000 <= sample_rate <= 48000:
+        await websocket.close(code=1003, reason=f"Use encoding em {', '.join(ENCODINGS)} e sample_rate entre 8000 e 48000")
+        return
+
+    express = websocket.app.state.express_transcriber
+    if not express.ready:
+        await websocket.close(code=1013, reason="Modelo de transcrição em tempo real indisponível")
+        return
+    if _active_sessions >= MAX_SESSIONS:
+        await websocket.close(code=1013, reason="Capacidade de streams esgotada, tente novamente")
+        return
+
+    await websocket.accept()
+    _active_sessions += 1
+    STREAM_SESSIONS.inc()
+
+    job_id = str(uuid.uuid4())
+    created_at = datetime.utcnow()
+    session = StreamSession(express, language)
+    due = asyncio.Event()
+    closing = False
+    connected = True
+
+    def on_audio(audio):
+        if session.feed(audio):
+            due.set()
+
+    async def send(message: dict):
+        nonlocal connected
+        if not connected:
+            return
+        try:
+            await websocket.send_json(message)
+        except Exception:
+            connected = False
+
+    async def asr_loop():
+        # Um passo por vez: frames que chegam durante a transcrição só acumulam no buffer
+        while True:
+            await due.wait()
+            due.clear()
+            if closing:
+                return
+            for message in await session.step():
+                await send(message)
+
+    decoder = AudioDecoder(encoding, sample_rate, on_audio)
+    asr_task = None
+    logger.info(f"[{job_id}] Stream iniciado ({encoding}, {sample_rate}Hz, idioma {language})")
+
+    try:
+        await decoder.start()
+        asr_task = asyncio.create_task(asr_loop())
+        await send({"type": "ready", "job_id": job_id, "sample_rate": 16000})
+
+        while session.duration < MAX_DURATION:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                connected = False
+                break
+            if message.get("bytes"):
+                await decoder.write(message["bytes"])
+            elif message.get("text") and json.loads(message["text"]).get("type") == "end":
+                break
+
+        await decoder.close()
+        closing = True
+        due.set()
+        await asr_task
+        for message in await session.step(final=True):
+            await send(message)
+
+        result = session.result()
+        _save_stream_job(job_id, created_at, language, encoding, express.model_name, result)
+        logger.info(
+            f"[{job_id}] Stream finalizado: {result['duration']}s de áudio, "
+            f"{len(result['segments'])} segmentos, latência final p50 {result['stream']['caption_latency']['final']['p50']}s"
+        )
+        await send({
+            "type": "done",
+            "job_id": job_id,
+            "text": result["text"],
+            "duration": result["duration"],
+            "caption_latency": result["stream"]["caption_latency"]
+        })
+        if connected:
+            await websocket.close()
+
+    except WebSocketDisconnect:
+        logger.info(f"[{job_id}] Cliente desconectou antes do fim do stream")
+    except Exception as e:
+        logger.error(f"[{job_id}] Erro no stream: {str(e)}", exc_info=True)
+        await send({"type": "error", "message": "Erro interno"})
+        if connected:
+            await websocket.close(code=1011)
+    finally:
+        if asr_task and not asr_task.done():
+            asr_task.cancel()
+        _active_sessions -= 1
+        STREAM_SESSIONS.dec()
+
+
+def _save_stream_job(job_id: str, created_at: datetime, language: str, encoding: str, model: str, result: dict):
+    """Grava o stream encerrado como um Job concluído, consultável pelas rotas normais"""
+    db = SessionLocal()
+    try:
+        db_job = Job(
+            id=job_id,
+            status=TranscriptionStatus.COMPLETED,
+            created_at=created_at,
+            language=language,
+            result_text=result["text"],
+            result_language=result["language"],
+            duration=str(result["duration"]),
+            completed_at=datetime.utcnow(),
+            job_data=with_timestamp({
+                "model": model,
+                "diarize": False,
+                "upload": "stream",
+                "encoding": encoding,
+                "timings": result["timings"],
+                "stream": result["stream"]
+            }, "queued", created_at)
+        )
+        db_job.set_segments(result["segments"])
+        db.add(db_job)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
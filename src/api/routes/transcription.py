@@ -1,15 +1,16 @@
 from fastapi import APIRouter, HTTPException, Request, Depends, Query
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from typing import Optional, List
+from typing import Optional
 import logging
-import json
+import orjson
 from datetime import datetime
 from ...models.transcription import TranscriptionResult, TranscriptionStatus
-from ...services.trigger_client import TriggerClient
 from ...api.middleware.auth import optional_auth
-from ...database.connection import get_db
+from ...database.connection import get_db, SessionLocal
 from ...database.models import Job
+from ...services.result_cache import job_result, encode, get_cached, set_cached, invalidate
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -24,11 +25,11 @@ async def get_transcription_status(
     """Consulta o status e resultado de uma transcrição"""
     
     try:
-        # Primeiro verificar Redis se disponível
+        # Primeiro verificar Redis se disponível (o JSON em cache é devolvido como está)
         if hasattr(request.app.state, 'redis_client') and request.app.state.redis_client:
-            cached_result = await get_from_redis_cache(request.app.state.redis_client, job_id)
-            if cached_result:
-                return cached_result
+            cached_body = await get_cached(request.app.state.redis_client, job_id)
+            if cached_body:
+                return Response(content=cached_body, media_type="application/json")
         
         # Consultar banco de dados (fonte da verdade)
         db_job = db.query(Job).filter(Job.id == job_id).first()
@@ -36,26 +37,15 @@ async def get_transcription_status(
         if not db_job:
             raise HTTPException(status_code=404, detail="Job não encontrado")
         
-        # Mapear para modelo Pydantic
-        result = TranscriptionResult(
-            job_id=db_job.id,
-            status=db_job.status,
-            text=db_job.result_text,
-            segments=db_job.result_segments,
-            language=db_job.result_language,
-            duration=float(db_job.duration) if db_job.duration else None,
-            created_at=db_job.created_at,
-            completed_at=db_job.completed_at,
-            error_message=db_job.error_message,
-            metadata=db_job.metadata or {}
-        )
+        # Serializar uma vez com orjson (os segmentos vêm do banco e dispensam validação do Pydantic)
+        body = encode(job_result(db_job))
         
         # Salvar no Redis se concluído/falhou (resultado final)
         if db_job.status in [TranscriptionStatus.COMPLETED, TranscriptionStatus.FAILED]:
             if hasattr(request.app.state, 'redis_client') and request.app.state.redis_client:
-                await save_to_redis_cache(request.app.state.redis_client, job_id, result.dict())
+                await set_cached(request.app.state.redis_client, job_id, body)
         
-        return result
+        return Response(content=body, media_type="application/json")
         
     except HTTPException:
         raise
@@ -90,7 +80,6 @@ async def download_transcription(
             raise HTTPException(status_code=404, detail="Resultado da transcrição não disponível")
         
         text = db_job.result_text
-        segments = db_job.result_segments or []
         
         if format == "txt":
             content = text
@@ -98,25 +87,25 @@ async def download_transcription(
             filename = f"transcription_{job_id}.txt"
             
         elif format == "json":
-            content = json.dumps({
+            content = orjson.dumps({
                 "job_id": job_id,
                 "text": text,
-                "segments": segments,
+                "segments": db_job.segments,
                 "language": db_job.result_language,
                 "duration": db_job.duration,
                 "created_at": db_job.created_at.isoformat() if db_job.created_at else None,
                 "completed_at": db_job.completed_at.isoformat() if db_job.completed_at else None,
-            }, indent=2, ensure_ascii=False)
+            }, option=orjson.OPT_INDENT_2)
             media_type = "application/json"
             filename = f"transcription_{job_id}.json"
             
         elif format == "srt":
-            content = _convert_to_srt(segments)
+            content = db_job.segment_table().to_srt()
             media_type = "text/plain"
             filename = f"transcription_{job_id}.srt"
             
         elif format == "vtt":
-            content = _convert_to_vtt(segments)
+            content = db_job.segment_table().to_vtt()
             media_type = "text/plain"
             filename = f"transcription_{job_id}.vtt"
             
@@ -172,6 +161,7 @@ async def cancel_transcription(
             db_job.completed_at = datetime.utcnow()
             db_job.updated_at = datetime.utcnow()
             db.commit()
+            await invalidate(getattr(request.app.state, 'redis_client', None), job_id)
             
             return {"message": "Job cancelado com sucesso", "job_id": job_id}
         else:
@@ -233,76 +223,79 @@ async def list_transcriptions(
         logger.error(f"Erro ao listar transcrições: {str(e)}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
-# Funções auxiliares para Redis
-async def get_from_redis_cache(redis_client, job_id: str) -> Optional[TranscriptionResult]:
-    """Recupera resultado do cache Redis"""
-    try:
-        cached_data = await redis_client.get(f"job:{job_id}")
-        if cached_data:
-            data = json.loads(cached_data)
-            return TranscriptionResult(**data)
-        return None
-    except Exception as e:
-        logger.warning(f"Erro ao buscar no Redis: {e}")
-        return None
+@router.get("/batch/{batch_id}")
+async def get_batch_status(
+    batch_id: str,
+    db: Session = Depends(get_db),
+    user: dict = Depends(optional_auth)
+):
+    """Status agregado de um batch de transcrições"""
 
-async def save_to_redis_cache(redis_client, job_id: str, data: dict):
-    """Salva resultado no cache Redis"""
     try:
-        await redis_client.setex(
-            f"job:{job_id}",
-            86400,  # 24 horas
-            json.dumps(data, default=str, ensure_ascii=False)
+        counts = dict(
+            db.query(Job.status, func.count(Job.id))
+            .filter(Job.batch_id == batch_id)
+            .group_by(Job.status)
+            .all()
         )
+
+        if not counts:
+            raise HTTPException(status_code=404, detail="Batch não encontrado")
+
+        total = sum(counts.values())
+        done = counts.get(TranscriptionStatus.COMPLETED, 0) + counts.get(TranscriptionStatus.FAILED, 0)
+
+        return {
+            "batch_id": batch_id,
+            "total": total,
+            "counts": {status.value: counts.get(status, 0) for status in TranscriptionStatus},
+            "finished": done == total,
+            "progress": round(done / total, 4)
+        }
+
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.warning(f"Erro ao salvar no Redis: {e}")
+        logger.error(f"Erro ao consultar batch {batch_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
-# Funções de conversão (mantidas iguais)
-def _convert_to_srt(segments: list) -> str:
-    """Converte segmentos para formato SRT"""
-    srt_content = []
-    
-    for i, segment in enumerate(segments, 1):
-        start_time = _format_timestamp_srt(segment.get("start", 0))
-        end_time = _format_timestamp_srt(segment.get("end", 0))
-        text = segment.get("text", "").strip()
-        
-        srt_content.append(f"{i}")
-        srt_content.append(f"{start_time} --> {end_time}")
-        srt_content.append(text)
-        srt_content.append("")  # Linha vazia entre segmentos
-    
-    return "\n".join(srt_content)
+@router.get("/batch/{batch_id}/results")
+async def stream_batch_results(
+    batch_id: str,
+    db: Session = Depends(get_db),
+    include_segments: bool = Query(default=False),
+    user: dict = Depends(optional_auth)
+):
+    """Resultados por job de um batch em NDJSON (uma linha JSON por job)"""
 
-def _convert_to_vtt(segments: list) -> str:
-    """Converte segmentos para formato WebVTT"""
-    vtt_content = ["WEBVTT", ""]
-    
-    for segment in segments:
-        start_time = _format_timestamp_vtt(segment.get("start", 0))
-        end_time = _format_timestamp_vtt(segment.get("end", 0))
-        text = segment.get("text", "").strip()
-        
-        vtt_content.append(f"{start_time} --> {end_time}")
-        vtt_content.append(text)
-        vtt_content.append("")  # Linha vazia entre segmentos
-    
-    return "\n".join(vtt_content)
+    if not db.query(Job.id).filter(Job.batch_id == batch_id).first():
+        raise HTTPException(status_code=404, detail="Batch não encontrado")
 
-def _format_timestamp_srt(seconds: float) -> str:
-    """Formata timestamp para formato SRT (HH:MM:SS,mmm)"""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-    milliseconds = int((seconds % 1) * 1000)
-    
-    return f"{hours:02d}:{minutes:02d}:{secs:02d},{milliseconds:03d}"
+    def generate():
+        # Sessão própria: o gerador é consumido depois que a dependência já pode ter sido encerrada
+        stream_db = SessionLocal()
+        try:
+            query = (
+                stream_db.query(Job)
+                .filter(Job.batch_id == batch_id)
+                .order_by(Job.created_at, Job.id)
+                .yield_per(200)
+            )
+            for job in query:
+                item = {
+                    "job_id": job.id,
+                    "url": job.file_url,
+                    "status": job.status.value,
+                    "text": job.result_text,
+                    "language": job.result_language,
+                    "duration": float(job.duration) if job.duration else None,
+                    "completed_at": job.completed_at.isoformat() if job.completed_at else None,
+                    "error_message": job.error_message
+                }
+                if include_segments:
+                    item["segments"] = job.segments
+                yield orjson.dumps(item, option=orjson.OPT_APPEND_NEWLINE)
+        finally:
+            stream_db.close()
 
-def _format_timestamp_vtt(seconds: float) -> str:
-    """Formata timestamp para formato WebVTT (HH:MM:SS.mmm)"""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-    milliseconds = int((seconds % 1) * 1000)
-    
-    return f"{hours:02d}:{minutes:02d}:{secs:02d}.{milliseconds:03d}"
\ No newline at end of file
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
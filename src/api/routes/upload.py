@@ -1,17 +1,35 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request, BackgroundTasks, Depends
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, UploadFile, File, Form, Header, HTTPException, Request, BackgroundTasks, Depends
+from fastapi.responses import JSONResponse, Response
 from sqlalchemy.orm import Session
+from sqlalchemy import update, or_
+from sqlalchemy.exc import IntegrityError
 from typing import Optional
+from pathlib import Path
+import asyncio
+import time
 import uuid
 import os
 from datetime import datetime
 import logging
+import aiofiles
+import httpx
 from ...services.file_handler import FileHandler
-from ...services.trigger_client import TriggerClient
-from ...models.transcription import TranscriptionRequest, TranscriptionResponse, TranscriptionStatus
-from ...utils.validators import validate_file, validate_url
-from ...utils.helpers import estimate_transcription_time
-from ...database.connection import get_db
+from ...services.storage import get_storage, LocalStorage, make_token, read_token, PRESIGN_PUT_TTL
+from ...services.trigger_client import TriggerUnavailableError
+from ...services.url_downloader import URLDownloader
+from ...services.idempotency import IdempotencyConflictError, IdempotencyInProgressError
+from ...services.result_cache import job_result, encode, set_cached, invalidate
+from ...models.transcription import (
+    TranscriptionRequest, TranscriptionResponse, TranscriptionResult, TranscriptionStatus, TranscriptionTier,
+    BatchTranscriptionRequest, BatchTranscriptionResponse,
+    DirectUploadRequest, DirectUploadResponse, DirectUploadComplete
+)
+from ...utils.validators import validate_file, validate_content, validate_url, SUPPORTED_FORMATS
+from ...services.media_probe import MediaProbe
+from ...utils.helpers import with_timestamp
+from ...utils.tracing import job_span
+from ...utils.metrics import IDEMPOTENT_REQUESTS, DUPLICATE_JOBS_AVOIDED
+from ...database.connection import get_db, SessionLocal
 from ...database.models import Job
 
 router = APIRouter()
@@ -21,13 +39,36 @@ logger = logging.getLogger(__name__)
 @router.post("/upload/file", response_model=TranscriptionResponse)
 async def upload_file(
         request: Request,
+        response: Response,
         db: Session = Depends(get_db),
         file: UploadFile = File(...),
         language: str = Form(default="auto"),
-        webhook_url: Optional[str] = Form(default=None)
+        webhook_url: Optional[str] = Form(default=None),
+        diarize: bool = Form(default=False),
+        tier: TranscriptionTier = Form(default=TranscriptionTier.STANDARD),
+        idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key")
 ):
     """Upload de arquivo de áudio/vídeo para transcrição"""
 
+    return await _run_idempotent(
+        request, response, "upload_file", idempotency_key,
+        fingerprint=[file.filename, file.size, language, webhook_url, diarize, tier.value],
+        handler=lambda: _upload_file(request, db, file, language, webhook_url, diarize, tier.value),
+        model=TranscriptionResponse
+    )
+
+
+async def _upload_file(
+        request: Request,
+        db: Session,
+        file: UploadFile,
+        language: str,
+        webhook_url: Optional[str],
+        diarize: bool,
+        tier: str
+) -> TranscriptionResponse:
+    """Valida, salva o arquivo e cria o job"""
+
     logger.info(f"Recebido upload: {file.filename}, tamanho: {file.size}")
 
     # Validar arquivo
@@ -38,58 +79,29 @@ async def upload_file(
 
     job_id = str(uuid.uuid4())
     file_path = None
+    file_handler = FileHandler()
 
     try:
         logger.info(f"[{job_id}] Processando upload do arquivo: {file.filename}")
 
         # Salvar arquivo PRIMEIRO
-        file_handler = FileHandler()
         file_path = await file_handler.save_upload(file, job_id)
         logger.info(f"[{job_id}] Arquivo salvo em: {file_path}")
 
         # Verificar se arquivo foi realmente salvo
-        if not os.path.exists(file_path):
+        if not await file_handler.exists(file_path):
             raise Exception(f"Falha ao salvar arquivo em: {file_path}")
 
-        # Criar registro no banco de dados
-        db_job = Job(
-            id=job_id,
-            status=TranscriptionStatus.PENDING,
-            file_path=file_path,  # Arquivo local
+        return await _register_upload(
+            request, db, job_id, file_path,
+            original_filename=file.filename,
+            file_size=validation_result.get("size", 0),
+            mime_type=validation_result.get("mime_type", "unknown"),
             language=language,
             webhook_url=webhook_url,
-            job_data={
-                "original_filename": file.filename,
-                "file_size": validation_result.get("size", 0),
-                "mime_type": validation_result.get("mime_type", "unknown")
-            }
-        )
-
-        db.add(db_job)
-        db.commit()
-        db.refresh(db_job)
-        logger.info(f"[{job_id}] Job criado no banco de dados")
-
-        # Criar job no Trigger - PASSAR O CAMINHO DO ARQUIVO
-        trigger_client = request.app.state.trigger_client
-        trigger_job_id = await trigger_client.create_transcription_job(
-            job_id=job_id,
-            file_path=file_path,  # Passar caminho do arquivo local
-            language=language,
-            webhook_url=webhook_url or f"{os.getenv('APP_URL', 'http://localhost:8000')}/webhooks/transcription"
-        )
-
-        logger.info(f"[{job_id}] Job criado no Trigger com ID: {trigger_job_id}")
-
-        # Atualizar registro com trigger_job_id
-        db_job.trigger_job_id = trigger_job_id
-        db.commit()
-
-        return TranscriptionResponse(
-            job_id=job_id,
-            status=TranscriptionStatus.PENDING,
-            message="Arquivo recebido e job de transcrição criado",
-            estimated_time=estimate_transcription_time(validation_result.get("size", 0))
+            diarize=diarize,
+            tier=tier,
+            content_hash=validation_result.get("sha256")
         )
 
     except Exception as e:
@@ -99,9 +111,8 @@ async def upload_file(
         db.rollback()
 
         # Limpar arquivo se foi salvo
-        if file_path and os.path.exists(file_path):
+        if file_path:
             try:
-                file_handler = FileHandler()
                 await file_handler.delete_file(file_path)
                 logger.info(f"[{job_id}] Arquivo removido após erro: {file_path}")
             except Exception as cleanup_error:
@@ -110,14 +121,397 @@ async def upload_file(
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
 
+@router.post(
+    "/upload/express",
+    response_model=TranscriptionResult,
+    responses={202: {"model": TranscriptionResponse, "description": "Desviado para o fluxo assíncrono"}}
+)
+async def upload_express(
+        request: Request,
+        db: Session = Depends(get_db),
+        file: UploadFile = File(...),
+        language: str = Form(default="auto"),
+        webhook_url: Optional[str] = Form(default=None),
+        diarize: bool = Form(default=False),
+        tier: TranscriptionTier = Form(default=TranscriptionTier.STANDARD)
+):
+    """Transcrição síncrona de clipes curtos; os demais (ou sem vaga) seguem pelo fluxo assíncrono com 202"""
+
+    started = time.perf_counter()
+    express = request.app.state.express_transcriber
+
+    validation_result = await validate_file(file)
+    if not validation_result["valid"]:
+        raise HTTPException(status_code=400, detail=validation_result["message"])
+
+    job_id = str(uuid.uuid4())
+    file_path = None
+    file_handler = FileHandler()
+
+    try:
+        file_path = await file_handler.save_upload(file, job_id)
+        source = file_handler.probe_source(file_path)
+        media_info = await MediaProbe().probe(source)
+
+        reason = express.reject_reason(media_info["duration"] if media_info else None, diarize)
+        if reason is None and not await express.acquire():
+            reason = "saturated"
+
+        if reason is None:
+            try:
+                with job_span("api.express", job_id):
+                    result = await express.transcribe(source, language)
+            except Exception as e:
+                logger.warning(f"[{job_id}] Falha na via expressa, seguindo pelo fluxo assíncrono: {e}")
+                reason = "error"
+            finally:
+                express.release()
+
+        if reason is None:
+            db_job = Job(
+                id=job_id,
+                status=TranscriptionStatus.COMPLETED,
+                language=language,
+                webhook_url=webhook_url,
+                result_text=result["text"],
+                result_language=result["language"],
+                duration=str(result["duration"]),
+                completed_at=datetime.utcnow(),
+                # Fora do estimador de ETA: o RTF do modelo pequeno não representa os jobs da GPU
+                job_data=with_timestamp({
+                    "original_filename": file.filename,
+                    "file_size": validation_result.get("size", 0),
+                    "mime_type": validation_result.get("mime_type", "unknown"),
+                    "media": media_info,
+                    "model": express.model_name,
+                    "diarize": False,
+                    "upload": "express",
+                    "language_detection": result["language_detection"],
+                    "timings": result["timings"]
+                }, "queued")
+            )
+            db_job.set_segments(result["segments"])
+            db.add(db_job)
+            db.commit()
+
+            # O resultado já foi entregue; o arquivo não é mais necessário
+            await file_handler.delete_file(file_path)
+
+            body = encode(job_result(db_job))
+            if request.app.state.redis_client:
+                await set_cached(request.app.state.redis_client, job_id, body)
+
+            elapsed = time.perf_counter() - started
+            express.record("served", elapsed)
+            logger.info(f"[{job_id}] Transcrito pela via expressa em {elapsed:.2f}s")
+            return Response(content=body, media_type="application/json")
+
+        express.record(reason)
+        logger.info(f"[{job_id}] Via expressa recusada ({reason}), seguindo pelo fluxo assíncrono")
+        queued = await _register_upload(
+            request, db, job_id, file_path,
+            original_filename=file.filename,
+            file_size=validation_result.get("size", 0),
+            mime_type=validation_result.get("mime_type", "unknown"),
+            language=language,
+            webhook_url=webhook_url,
+            diarize=diarize,
+            source="express_fallback",
+            tier=tier.value,
+            content_hash=validation_result.get("sha256")
+        )
+        return JSONResponse(
+            status_code=202,
+            content=queued.model_dump(mode="json"),
+            headers={"X-Express-Fallback": reason}
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"[{job_id}] Erro na via expressa: {str(e)}")
+        db.rollback()
+        if file_path:
+            try:
+                await file_handler.delete_file(file_path)
+            except Exception as cleanup_error:
+                logger.warning(f"[{job_id}] Erro ao limpar arquivo: {cleanup_error}")
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+
+@router.post("/upload/presign", response_model=DirectUploadResponse)
+async def presign_upload(upload_request: DirectUploadRequest):
+    """URL assinada para o cliente enviar o arquivo direto ao armazenamento, sem passar pela API"""
+
+    max_size = int(os.getenv("MAX_FILE_SIZE", 500 * 1024 * 1024))
+    if upload_request.size is not None and upload_request.size > max_size:
+        raise HTTPException(status_code=400, detail=f"Arquivo muito grande. Máximo: {max_size // (1024 * 1024)}MB")
+    if upload_request.content_type and upload_request.content_type not in SUPPORTED_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Formato não suportado: {upload_request.content_type}")
+
+    try:
+        job_id = str(uuid.uuid4())
+        target = FileHandler().presign_upload(job_id, upload_request.filename, upload_request.content_type)
+
+        # As opções do job viajam no token assinado: nada é gravado até a confirmação do upload
+        upload_token = make_token({
+            "job_id": job_id,
+            "key": target["key"],
+            "filename": upload_request.filename,
+            "language": upload_request.language,
+            "webhook_url": str(upload_request.webhook_url) if upload_request.webhook_url else None,
+            "diarize": upload_request.diarize,
+            "tier": upload_request.tier.value
+        }, ttl=PRESIGN_PUT_TTL + 3600)
+
+        logger.info(f"[{job_id}] URL de upload direto gerada para {upload_request.filename}")
+        return DirectUploadResponse(
+            job_id=job_id,
+            upload_url=target["url"],
+            method=target["method"],
+            headers=target["headers"],
+            upload_token=upload_token,
+            expires_in=PRESIGN_PUT_TTL
+        )
+
+    except Exception as e:
+        logger.error(f"Erro ao gerar URL de upload: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+
+@router.put("/upload/direct/{key}", include_in_schema=False)
+async def direct_upload(
+        key: str,
+        request: Request,
+        expires: int,
+        signature: str,
+        db: Session = Depends(get_db)
+):
+    """Destino das URLs assinadas do armazenamento local (no object store o cliente envia direto ao bucket)"""
+
+    storage = get_storage()
+    if not isinstance(storage, LocalStorage):
+        raise HTTPException(status_code=404, detail="Upload direto não disponível neste armazenamento")
+    file_path = storage.path_for_key(key)
+    if file_path is None or not storage.verify_signed("PUT", key, expires, signature):
+        raise HTTPException(status_code=403, detail="URL de upload inválida ou expirada")
+    # A chave é {job_id}{extensão}: depois da confirmação o arquivo é do job e não pode ser sobrescrito
+    if db.query(Job.id).filter(Job.id == Path(key).stem).first():
+        raise HTTPException(status_code=409, detail="Upload já confirmado; envie o arquivo antes de confirmar")
+
+    max_size = int(os.getenv("MAX_FILE_SIZE", 500 * 1024 * 1024))
+    size = 0
+    try:
+        async with aiofiles.open(file_path, 'wb') as f:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > max_size:
+                    raise HTTPException(status_code=413, detail="Arquivo muito grande")
+                await f.write(chunk)
+    except HTTPException:
+        await storage.delete(str(file_path))
+        raise
+
+    return Response(status_code=200)
+
+
+@router.post("/upload/complete", response_model=TranscriptionResponse)
+async def complete_upload(
+        request: Request,
+        completion: DirectUploadComplete,
+        db: Session = Depends(get_db)
+):
+    """Confirma um upload direto: valida o arquivo no armazenamento e cria o job"""
+
+    upload = read_token(completion.upload_token)
+    if not upload:
+        raise HTTPException(status_code=400, detail="Token de upload inválido ou expirado")
+
+    job_id = upload["job_id"]
+    existing = db.query(Job).filter(Job.id == job_id).first()
+    if existing:
+        # Confirmação repetida (retry do cliente): devolver o job já criado
+        return _already_confirmed(existing)
+
+    file_handler = FileHandler()
+    file_path = file_handler.ref_for_key(upload["key"])
+
+    try:
+        info = await file_handler.get_file_info(file_path)
+        if not info:
+            raise HTTPException(status_code=400, detail="Arquivo não encontrado no armazenamento; envie antes de confirmar")
+
+        # Mesmas regras do upload pela API, lendo só o início do objeto
+        validation_result = validate_content(await file_handler.read_head(file_path), info["size"])
+        if not validation_result["valid"]:
+            await file_handler.delete_file(file_path)
+            raise HTTPException(status_code=400, detail=validation_result["message"])
+
+        return await _register_upload(
+            request, db, job_id, file_path,
+            original_filename=upload["filename"],
+            file_size=info["size"],
+            mime_type=validation_result["mime_type"],
+            language=upload["language"],
+            webhook_url=upload["webhook_url"],
+            diarize=upload["diarize"],
+            tier=upload.get("tier", TranscriptionTier.STANDARD.value),
+            source="direct"
+        )
+
+    except IntegrityError:
+        # Confirmação concorrente criou o job entre a consulta e o insert
+        db.rollback()
+        existing = db.query(Job).filter(Job.id == job_id).first()
+        if not existing:
+            raise HTTPException(status_code=500, detail="Erro interno ao confirmar upload")
+        logger.info(f"[{job_id}] Confirmação concorrente; devolvendo o job já criado")
+        return _already_confirmed(existing)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"[{job_id}] Erro ao confirmar upload: {str(e)}")
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+
+def _already_confirmed(job: Job) -> TranscriptionResponse:
+    return TranscriptionResponse(
+        job_id=job.id,
+        status=job.status,
+        message="Upload já confirmado",
+        estimated_time=(job.job_data or {}).get("estimated_time")
+    )
+
+
+async def _register_upload(
+        request: Request,
+        db: Session,
+        job_id: str,
+        file_path: str,
+        original_filename: str,
+        file_size: int,
+        mime_type: str,
+        language: str,
+        webhook_url: Optional[str],
+        diarize: bool,
+        source: str = "file",
+        tier: str = TranscriptionTier.STANDARD.value,
+        content_hash: Optional[str] = None
+) -> TranscriptionResponse:
+    """Cria o job de um arquivo já salvo no armazenamento e despacha para o Trigger"""
+
+    # Ler duração real dos cabeçalhos do container para a estimativa e o roteamento
+    media_info = await MediaProbe().probe(FileHandler().probe_source(file_path))
+    duration = media_info["duration"] if media_info else None
+    routing = request.app.state.worker_router.route(db, duration, tier, diarize)
+    estimated_time = request.app.state.eta_estimator.estimate(
+        db,
+        duration_seconds=duration,
+        model=routing["stats_key"],
+        file_size_bytes=file_size
+    )
+
+    # Criar registro no banco de dados
+    db_job = Job(
+        id=job_id,
+        status=TranscriptionStatus.PENDING,
+        file_path=file_path,  # Referência no armazenamento
+        language=language,
+        webhook_url=webhook_url,
+        job_data=with_timestamp({
+            "original_filename": original_filename,
+            "file_size": file_size,
+            "mime_type": mime_type,
+            "media": media_info,
+            "model": routing["model"],
+            "worker": routing["worker"],
+            "tier": tier,
+            "estimated_time": estimated_time,
+            "diarize": diarize,
+            "upload": source,
+            "content_hash": content_hash
+        }, "queued")
+    )
+
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    logger.info(f"[{job_id}] Job criado no banco de dados (worker {routing['worker']}, {routing['reason']})")
+
+    try:
+        # Criar job no Trigger - o worker baixa o arquivo pela URL do armazenamento
+        trigger_client = request.app.state.trigger_client
+        with job_span("api.dispatch", job_id, source=source):
+            trigger_job_id = await trigger_client.create_transcription_job(
+                job_id=job_id,
+                file_path=file_path,
+                language=language,
+                webhook_url=webhook_url or f"{os.getenv('APP_URL', 'http://localhost:8000')}/webhooks/transcription",
+                diarize=diarize,
+                content_hash=content_hash,
+                worker=routing["worker"],
+                model=routing["model"]
+            )
+
+    except TriggerUnavailableError as e:
+        # Trigger.dev fora do ar: o job fica no outbox e o reconciliador despacha depois
+        logger.warning(f"[{job_id}] Trigger.dev indisponível, despacho adiado: {str(e)}")
+        _defer_dispatch(db, db_job)
+
+        return TranscriptionResponse(
+            job_id=job_id,
+            status=TranscriptionStatus.PENDING,
+            message="Arquivo recebido; o job será despachado assim que o serviço de filas estiver disponível",
+            estimated_time=estimated_time
+        )
+    except Exception as e:
+        # O job já foi gravado: sem isso ficaria PENDING para sempre após o 500
+        _fail_dispatch(db, job_id, e)
+        raise
+
+    logger.info(f"[{job_id}] Job criado no Trigger com ID: {trigger_job_id}")
+
+    # Atualizar registro com trigger_job_id
+    db_job.trigger_job_id = trigger_job_id
+    db_job.job_data = with_timestamp(db_job.job_data, "dispatched")
+    db.commit()
+
+    return TranscriptionResponse(
+        job_id=job_id,
+        status=TranscriptionStatus.PENDING,
+        message="Arquivo recebido e job de transcrição criado",
+        estimated_time=estimated_time
+    )
+
+
 @router.post("/upload/url", response_model=TranscriptionResponse)
 async def upload_from_url(
         request: Request,
+        response: Response,
         transcription_request: TranscriptionRequest,
-        db: Session = Depends(get_db)
+        background_tasks: BackgroundTasks,
+        db: Session = Depends(get_db),
+        idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key")
 ):
     """Transcrição a partir de URL de áudio/vídeo"""
 
+    return await _run_idempotent(
+        request, response, "upload_url", idempotency_key,
+        fingerprint=transcription_request.model_dump(mode="json"),
+        handler=lambda: _upload_from_url(request, transcription_request, background_tasks, db),
+        model=TranscriptionResponse
+    )
+
+
+async def _upload_from_url(
+        request: Request,
+        transcription_request: TranscriptionRequest,
+        background_tasks: BackgroundTasks,
+        db: Session
+) -> TranscriptionResponse:
+    """Resolve a mídia, reaproveita resultados e cria o job"""
+
     if not transcription_request.url:
         raise HTTPException(status_code=400, detail="URL é obrigatória")
 
@@ -129,19 +523,79 @@ async def upload_from_url(
         logger.error(f"URL inválida ou inacessível: {url_str}")
         raise HTTPException(status_code=400, detail="URL inválida ou inacessível")
 
+    # Identificar a mídia (URL direta ou página suportada pelo yt-dlp) e sua chave de cache
+    downloader = URLDownloader()
+    try:
+        media = await downloader.resolve_media(url_str)
+    except Exception as e:
+        logger.error(f"URL não suportada: {url_str} ({str(e)})")
+        raise HTTPException(status_code=400, detail="URL não suportada: não foi possível extrair o áudio")
+
     job_id = str(uuid.uuid4())
+    webhook_url = str(transcription_request.webhook_url) if transcription_request.webhook_url else None
+    db_job = None
 
     try:
         logger.info(f"[{job_id}] Criando job para URL: {url_str}")
 
+        # Mesma mídia já transcrita: reaproveitar o resultado sem baixar nem transcrever
+        if media["media_key"]:
+            cached_job = _find_cached_result(
+                db, media["media_key"], transcription_request.language, transcription_request.diarize
+            )
+            if cached_job:
+                db.add(_clone_completed_job(
+                    cached_job, job_id, url_str, webhook_url, transcription_request.metadata or {}
+                ))
+                db.commit()
+                logger.info(f"[{job_id}] Resultado reaproveitado do job {cached_job.id}")
+
+                if webhook_url:
+                    # Sem worker para notificar: o cliente recebe o resultado clonado no mesmo formato
+                    background_tasks.add_task(
+                        _notify_webhook, webhook_url, _cloned_result_payload(cached_job, job_id)
+                    )
+
+                return TranscriptionResponse(
+                    job_id=job_id,
+                    status=TranscriptionStatus.COMPLETED,
+                    message="Resultado reaproveitado de uma transcrição anterior da mesma mídia",
+                    estimated_time=0
+                )
+
+        if media["direct"]:
+            # ffprobe lê só os cabeçalhos remotos
+            media_info = await MediaProbe().probe(url_str)
+            duration = media_info["duration"] if media_info else None
+        else:
+            media_info = {"duration": media["duration"], "title": media["title"]}
+            duration = media["duration"]
+
+        routing = request.app.state.worker_router.route(
+            db, duration, transcription_request.tier.value, transcription_request.diarize
+        )
+        estimated_time = request.app.state.eta_estimator.estimate(
+            db, duration_seconds=duration, model=routing["stats_key"]
+        )
+
         # Criar registro no banco de dados
         db_job = Job(
             id=job_id,
             status=TranscriptionStatus.PENDING,
             file_url=url_str,  # URL externa
             language=transcription_request.language,
-            webhook_url=str(transcription_request.webhook_url) if transcription_request.webhook_url else None,
-            job_data=transcription_request.metadata or {}
+            webhook_url=webhook_url,
+            media_key=media["media_key"],
+            job_data=with_timestamp({
+                **(transcription_request.metadata or {}),
+                "media": media_info,
+                "model": routing["model"],
+                "worker": routing["worker"],
+                "tier": transcription_request.tier.value,
+                "estimated_time": estimated_time,
+                "diarize": transcription_request.diarize,
+                **({} if media["direct"] else {"fetch": "pending"})
+            }, "queued")
         )
 
         db.add(db_job)
@@ -149,37 +603,405 @@ async def upload_from_url(
         db.refresh(db_job)
         logger.info(f"[{job_id}] Job criado no banco de dados para URL")
 
+        if not media["direct"]:
+            # Páginas (YouTube etc.): baixar só o áudio na API e despachar o arquivo normalizado
+            background_tasks.add_task(
+                _fetch_and_dispatch, request.app, job_id, url_str, media["media_key"],
+                transcription_request.language, webhook_url, transcription_request.diarize
+            )
+
+            return TranscriptionResponse(
+                job_id=job_id,
+                status=TranscriptionStatus.PENDING,
+                message="Job criado; o áudio está sendo extraído da URL",
+                estimated_time=estimated_time
+            )
+
         # Criar job no Trigger - PASSAR A URL
         trigger_client = request.app.state.trigger_client
-        trigger_job_id = await trigger_client.create_transcription_job(
-            job_id=job_id,
-            file_url=url_str,  # Passar URL
-            language=transcription_request.language,
-            webhook_url=str(
-                transcription_request.webhook_url) if transcription_request.webhook_url else f"{os.getenv('APP_URL', 'http://localhost:8000')}/webhooks/transcription"
-        )
+        with job_span("api.dispatch", job_id, source="url"):
+            trigger_job_id = await trigger_client.create_transcription_job(
+                job_id=job_id,
+                file_url=url_str,  # Passar URL
+                language=transcription_request.language,
+                webhook_url=webhook_url or f"{os.getenv('APP_URL', 'http://localhost:8000')}/webhooks/transcription",
+                diarize=transcription_request.diarize,
+                worker=routing["worker"],
+                model=routing["model"]
+            )
 
         logger.info(f"[{job_id}] Job criado no Trigger com ID: {trigger_job_id}")
 
         # Atualizar registro com trigger_job_id
         db_job.trigger_job_id = trigger_job_id
+        db_job.job_data = with_timestamp(db_job.job_data, "dispatched")
         db.commit()
 
         return TranscriptionResponse(
             job_id=job_id,
             status=TranscriptionStatus.PENDING,
             message="Job de transcrição criado a partir da URL",
-            estimated_time=None  # Não podemos estimar sem o arquivo local
+            estimated_time=estimated_time
+        )
+
+    except TriggerUnavailableError as e:
+        logger.warning(f"[{job_id}] Trigger.dev indisponível, despacho adiado: {str(e)}")
+        _defer_dispatch(db, db_job)
+
+        return TranscriptionResponse(
+            job_id=job_id,
+            status=TranscriptionStatus.PENDING,
+            message="Job criado; será despachado assim que o serviço de filas estiver disponível",
+            estimated_time=estimated_time
         )
 
     except Exception as e:
         logger.error(f"[{job_id}] Erro ao processar URL: {str(e)}")
+        if db_job is not None:
+            _fail_dispatch(db, job_id, e)
+        else:
+            db.rollback()
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+
+@router.post("/upload/batch", response_model=BatchTranscriptionResponse)
+async def upload_batch(
+        request: Request,
+        response: Response,
+        batch_request: BatchTranscriptionRequest,
+        db: Session = Depends(get_db),
+        idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key")
+):
+    """Transcrição em lote a partir de várias URLs numa única requisição"""
+
+    return await _run_idempotent(
+        request, response, "upload_batch", idempotency_key,
+        fingerprint=batch_request.model_dump(mode="json"),
+        handler=lambda: _upload_batch(request, batch_request, db),
+        model=BatchTranscriptionResponse
+    )
+
+
+async def _upload_batch(
+        request: Request,
+        batch_request: BatchTranscriptionRequest,
+        db: Session
+) -> BatchTranscriptionResponse:
+    """Valida as URLs, cria os jobs numa inserção única e despacha em blocos"""
+
+    max_batch_size = int(os.getenv("MAX_BATCH_SIZE", 1000))
+    if len(batch_request.urls) > max_batch_size:
+        raise HTTPException(status_code=400, detail=f"Máximo de {max_batch_size} URLs por batch")
+
+    batch_id = str(uuid.uuid4())
+    urls = [str(url) for url in batch_request.urls]
+    logger.info(f"[batch {batch_id}] Recebidas {len(urls)} URLs para transcrição")
+
+    # Validar URLs em paralelo, com concorrência limitada
+    semaphore = asyncio.Semaphore(int(os.getenv("BATCH_VALIDATION_CONCURRENCY", 20)))
+
+    async def check(url: str) -> bool:
+        async with semaphore:
+            return await validate_url(url)
+
+    validations = await asyncio.gather(*(check(url) for url in urls))
+
+    accepted = [url for url, valid in zip(urls, validations) if valid]
+    rejected = [
+        {"url": url, "reason": "URL inválida ou inacessível"}
+        for url, valid in zip(urls, validations) if not valid
+    ]
+
+    if not accepted:
+        raise HTTPException(status_code=400, detail={"message": "Nenhuma URL válida no batch", "rejected": rejected})
+
+    webhook_url = str(batch_request.webhook_url) if batch_request.webhook_url else None
+    # Sem sondar cada URL a duração é desconhecida: uma decisão para o batch inteiro
+    routing = request.app.state.worker_router.route(
+        db, None, batch_request.tier.value, batch_request.diarize, count=len(accepted)
+    )
+    jobs = [
+        {
+            "job_id": str(uuid.uuid4()), "file_url": url, "language": batch_request.language,
+            "webhook_url": webhook_url, "diarize": batch_request.diarize,
+            "worker": routing["worker"], "model": routing["model"]
+        }
+        for url in accepted
+    ]
+
+    queued_at = datetime.utcnow()
+    jobs_data = {
+        job["job_id"]: with_timestamp({
+            **(batch_request.metadata or {}), "model": routing["model"], "worker": routing["worker"],
+            "tier": batch_request.tier.value, "diarize": job["diarize"]
+        }, "queued", queued_at)
+        for job in jobs
+    }
+
+    try:
+        # Inserção única de todos os jobs
+        db.add_all([
+            Job(
+                id=job["job_id"],
+                status=TranscriptionStatus.PENDING,
+                file_url=job["file_url"],
+                language=job["language"],
+                webhook_url=webhook_url,
+                batch_id=batch_id,
+                job_data=jobs_data[job["job_id"]]
+            )
+            for job in jobs
+        ])
+        db.commit()
+        logger.info(f"[batch {batch_id}] {len(jobs)} jobs criados no banco de dados")
+    except Exception as e:
+        logger.error(f"[batch {batch_id}] Erro ao criar jobs: {str(e)}")
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
+    # Despachar em blocos pela API de batch do Trigger; o trigger_job_id é gravado por bloco
+    trigger_client = request.app.state.trigger_client
+    dispatched = 0
+    failed = False
+    for start in range(0, len(jobs), trigger_client.batch_limit):
+        chunk = jobs[start:start + trigger_client.batch_limit]
+        try:
+            run_ids = await trigger_client.create_transcription_jobs_batch(chunk)
+        except TriggerUnavailableError as e:
+            # Jobs restantes vão para o outbox e são despachados pelo reconciliador
+            logger.warning(f"[batch {batch_id}] Trigger.dev indisponível, despacho de {len(jobs) - start} jobs adiado: {str(e)}")
+            db.execute(update(Job), [
+                {"id": job["job_id"], "job_data": {**jobs_data[job["job_id"]], "dispatch_deferred": True}}
+                for job in jobs[start:]
+            ])
+            db.commit()
+            break
+        except Exception as e:
+            # Erro não transitório: os jobs restantes não seriam despachados por ninguém
+            logger.error(f"[batch {batch_id}] Erro ao despachar bloco de {len(chunk)} jobs: {str(e)}")
+            completed_at = datetime.utcnow()
+            db.execute(update(Job), [
+                {
+                    "id": job["job_id"],
+                    "status": TranscriptionStatus.FAILED,
+                    "error_message": f"Falha ao despachar job para o Trigger.dev: {str(e)}",
+                    "completed_at": completed_at
+                }
+                for job in jobs[start:]
+            ])
+            db.commit()
+            failed = True
+            break
+
+        dispatched_at = datetime.utcnow()
+        db.execute(update(Job), [
+            {
+                "id": job["job_id"],
+                "trigger_job_id": run_id,
+                "job_data": with_timestamp(jobs_data[job["job_id"]], "dispatched", dispatched_at)
+            }
+            for job, run_id in zip(chunk, run_ids)
+        ])
+        db.commit()
+        dispatched += len(chunk)
+
+    logger.info(f"[batch {batch_id}] {dispatched}/{len(jobs)} jobs despachados para o Trigger")
+
+    message = "Batch de transcrição criado"
+    if failed:
+        message = f"Batch criado; {len(jobs) - dispatched} jobs falharam ao despachar"
+    elif dispatched < len(jobs):
+        message = f"Batch criado; {len(jobs) - dispatched} jobs aguardam novo despacho"
 
-def estimate_transcription_time(file_size_bytes: int) -> int:
-    """Estima tempo de transcrição baseado no tamanho do arquivo"""
-    # Estimativa: ~1 minuto de processamento para cada 10MB
-    estimated_minutes = max(1, file_size_bytes // (10 * 1024 * 1024))
-    return estimated_minutes * 60  # retorna em segundos
\ No newline at end of file
+    return BatchTranscriptionResponse(
+        batch_id=batch_id,
+        status=TranscriptionStatus.PENDING,
+        message=message,
+        total=len(urls),
+        accepted=len(jobs),
+        jobs=[{"job_id": job["job_id"], "url": job["file_url"]} for job in jobs],
+        rejected=rejected
+    )
+
+
+async def _run_idempotent(
+        request: Request,
+        response: Response,
+        route: str,
+        idempotency_key: Optional[str],
+        fingerprint,
+        handler,
+        model
+):
+    """Executa a criação uma vez por Idempotency-Key; repetições recebem a resposta original"""
+    if not idempotency_key:
+        return await handler()
+    if len(idempotency_key) > 255:
+        raise HTTPException(status_code=400, detail="Idempotency-Key muito longa (máximo 255 caracteres)")
+
+    async def run() -> dict:
+        return (await handler()).model_dump(mode="json")
+
+    try:
+        data, outcome = await request.app.state.idempotency.run(route, idempotency_key, fingerprint, run)
+    except IdempotencyConflictError as e:
+        IDEMPOTENT_REQUESTS.labels(route, "conflict").inc()
+        raise HTTPException(status_code=422, detail=str(e))
+    except IdempotencyInProgressError as e:
+        IDEMPOTENT_REQUESTS.labels(route, "in_progress").inc()
+        raise HTTPException(status_code=409, detail=str(e))
+
+    IDEMPOTENT_REQUESTS.labels(route, outcome).inc()
+    if outcome != "new":
+        response.headers["Idempotent-Replayed"] = "true"
+        # Resultado reaproveitado (cache de mídia) não teria ido para a GPU de qualquer forma
+        if data.get("status") == TranscriptionStatus.PENDING.value:
+            DUPLICATE_JOBS_AVOIDED.labels(route).inc(data.get("accepted", 1))
+        logger.info(f"Idempotency-Key repetida em {route}: resposta original devolvida ({outcome})")
+    return model(**data)
+
+
+def _defer_dispatch(db: Session, db_job: Job):
+    """Marca o job como pendente de despacho (outbox) sem desfazer o registro"""
+    db_job.job_data = {**(db_job.job_data or {}), "dispatch_deferred": True}
+    db.commit()
+
+
+def _fail_dispatch(db: Session, job_id: str, error: Exception):
+    """Marca como FAILED o job já gravado cujo despacho falhou sem ser por indisponibilidade"""
+    db.rollback()
+    db.query(Job).filter(Job.id == job_id, Job.status == TranscriptionStatus.PENDING).update({
+        Job.status: TranscriptionStatus.FAILED,
+        Job.error_message: f"Falha ao despachar job para o Trigger.dev: {str(error)}",
+        Job.completed_at: datetime.utcnow()
+    }, synchronize_session=False)
+    db.commit()
+
+
+def _find_cached_result(db: Session, media_key: str, language: str, diarize: bool = False) -> Optional[Job]:
+    """Job concluído com a mesma mídia e idioma compatível (com falantes, se pedido)"""
+    query = db.query(Job).filter(
+        Job.media_key == media_key,
+        Job.status == TranscriptionStatus.COMPLETED
+    )
+    if language == "auto":
+        query = query.filter(Job.language == "auto")
+    else:
+        query = query.filter(or_(Job.language == language, Job.result_language == language))
+
+    candidates = query.order_by(Job.completed_at.desc()).limit(10).all()
+    return next((job for job in candidates if not diarize or (job.job_data or {}).get("diarize")), None)
+
+
+def _clone_completed_job(source: Job, job_id: str, url: str, webhook_url: Optional[str], metadata: dict) -> Job:
+    """Novo job já concluído com o resultado de outro job da mesma mídia"""
+    now = datetime.utcnow()
+    return Job(
+        id=job_id,
+        status=TranscriptionStatus.COMPLETED,
+        file_url=url,
+        language=source.language,
+        webhook_url=webhook_url,
+        media_key=source.media_key,
+        result_text=source.result_text,
+        result_segments=source.result_segments,
+        result_segments_bin=source.result_segments_bin,
+        result_language=source.result_language,
+        duration=source.duration,
+        completed_at=now,
+        job_data={**metadata, "cached_from": source.id, "diarize": (source.job_data or {}).get("diarize", False)}
+    )
+
+
+def _cloned_result_payload(source: Job, job_id: str) -> dict:
+    """Payload "completed" no formato do webhook do worker, com o resultado do job de origem"""
+    return {
+        "job_id": job_id,
+        "status": "completed",
+        "message": "Resultado reaproveitado de uma transcrição anterior da mesma mídia",
+        "text": source.result_text,
+        "segments": source.segments,
+        "language": source.result_language,
+        "duration": float(source.duration) if source.duration else None,
+        "speakers": (source.job_data or {}).get("speakers"),
+        "cached_from": source.id
+    }
+
+
+async def _notify_webhook(webhook_url: str, payload: dict):
+    """POST do resultado para o webhook do cliente (falha só é registrada, como no worker)"""
+    try:
+        async with httpx.AsyncClient(timeout=30) as client:
+            response = await client.post(webhook_url, content=encode(payload), headers={"Content-Type": "application/json"})
+            response.raise_for_status()
+        logger.info(f"[{payload['job_id']}] Webhook notificado: {payload['status']}")
+    except Exception as e:
+        logger.error(f"[{payload['job_id']}] Erro ao notificar webhook: {e}")
+
+
+# Limita quantas extrações (download + ffmpeg) rodam ao mesmo tempo neste processo
+_fetch_semaphore = asyncio.Semaphore(int(os.getenv("MEDIA_FETCH_WORKERS", 2)))
+
+
+async def _fetch_and_dispatch(
+        app,
+        job_id: str,
+        url: str,
+        media_key: Optional[str],
+        language: str,
+        webhook_url: Optional[str],
+        diarize: bool = False
+):
+    """Baixa o áudio (yt-dlp bestaudio), normaliza, coloca em uploads/ e despacha o job"""
+    db = SessionLocal()
+    try:
+        db_job = db.query(Job).filter(Job.id == job_id).first()
+        if not db_job:
+            return
+
+        try:
+            with job_span("api.fetch_audio", job_id, url=url):
+                async with _fetch_semaphore:
+                    audio_path = await URLDownloader().fetch_audio(url, job_id, media_key)
+                file_path = await FileHandler().link_into_uploads(audio_path, job_id)
+        except Exception as e:
+            logger.error(f"[{job_id}] Erro ao extrair áudio da URL: {str(e)}")
+            db_job.status = TranscriptionStatus.FAILED
+            db_job.error_message = f"Falha ao extrair áudio da URL: {str(e)}"
+            db_job.completed_at = datetime.utcnow()
+            db_job.job_data = {**(db_job.job_data or {}), "fetch": "failed"}
+            db.commit()
+            await invalidate(getattr(app.state, 'redis_client', None), job_id)
+            return
+
+        db_job.file_path = file_path
+        db_job.job_data = {**(db_job.job_data or {}), "fetch": "done"}
+        db.commit()
+        logger.info(f"[{job_id}] Áudio extraído e normalizado: {file_path}")
+
+        try:
+            with job_span("api.dispatch", job_id, source="extracted"):
+                trigger_job_id = await app.state.trigger_client.create_transcription_job(
+                    job_id=job_id,
+                    file_path=file_path,
+                    language=language,
+                    webhook_url=webhook_url,
+                    diarize=diarize,
+                    worker=db_job.job_data.get("worker"),
+                    model=db_job.job_data.get("model")
+                )
+        except TriggerUnavailableError as e:
+            logger.warning(f"[{job_id}] Trigger.dev indisponível, despacho adiado: {str(e)}")
+            _defer_dispatch(db, db_job)
+            return
+
+        db_job.trigger_job_id = trigger_job_id
+        db_job.job_data = with_timestamp(db_job.job_data, "dispatched")
+        db.commit()
+        logger.info(f"[{job_id}] Job criado no Trigger com ID: {trigger_job_id}")
+
+    except Exception as e:
+        logger.error(f"[{job_id}] Erro ao despachar job após extração: {str(e)}")
+        _fail_dispatch(db, job_id, e)
+    finally:
+        db.close()
@@ -3,11 +3,15 @@ from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from datetime import datetime
 import logging
-import json
-import os
 from ...database.connection import get_db
 from ...database.models import Job
 from ...models.transcription import TranscriptionStatus
+from ...services.eta_estimator import record_eta_sample
+from ...services.file_handler import FileHandler
+from ...utils.helpers import with_timestamp
+from ...utils.metrics import WEBHOOKS_RECEIVED
+from ...utils.tracing import job_span
+from ...services.result_cache import job_result, encode, set_cached, invalidate
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -26,36 +30,50 @@ async def transcription_webhook(
         status = payload.get("status")
 
         logger.info(f"[{job_id}] Webhook recebido: {status}")
+        WEBHOOKS_RECEIVED.labels(status if status in ("processing", "completed", "failed") else "other").inc()
         logger.debug(f"[{job_id}] Payload completo: {payload}")
 
         if not job_id:
             raise HTTPException(status_code=400, detail="job_id é obrigatório")
 
-        # Buscar job no banco de dados
-        db_job = db.query(Job).filter(Job.id == job_id).first()
-        if not db_job:
-            logger.error(f"[{job_id}] Job não encontrado no banco de dados")
-            raise HTTPException(status_code=404, detail="Job não encontrado")
-
-        # Processar baseado no status
-        if status == "completed":
-            await save_transcription_result(db, db_job, payload)
-            logger.info(f"[{job_id}] Resultado salvo com sucesso")
-
-        elif status == "failed":
-            await save_transcription_error(db, db_job, payload)
-            logger.error(f"[{job_id}] Falha registrada: {payload.get('error_message', 'Erro desconhecido')}")
-
-        elif status == "processing":
-            # Atualizar status para processing
-            db_job.status = TranscriptionStatus.PROCESSING
-            db_job.updated_at = datetime.utcnow()
-            db.commit()
-            logger.info(f"[{job_id}] Status atualizado para: processing")
-
-        # Salvar no Redis se disponível
-        if hasattr(request.app.state, 'redis_client') and request.app.state.redis_client:
-            await save_to_redis_cache(request.app.state.redis_client, job_id, db_job.to_dict())
+        # Continua o trace do job a partir do traceparent enviado pelo worker/Trigger
+        with job_span(f"webhook.{status}", job_id, carrier=dict(request.headers)):
+            # Buscar job no banco de dados
+            db_job = db.query(Job).filter(Job.id == job_id).first()
+            if not db_job:
+                logger.error(f"[{job_id}] Job não encontrado no banco de dados")
+                raise HTTPException(status_code=404, detail="Job não encontrado")
+
+            # Primeiro sinal do worker: mede a espera no Trigger.dev/Modal após o despacho
+            db_job.job_data = with_timestamp(db_job.job_data, "first_webhook")
+
+            # Processar baseado no status
+            if status == "completed":
+                await save_transcription_result(db, db_job, payload)
+                logger.info(f"[{job_id}] Resultado salvo com sucesso")
+
+            elif status == "failed":
+                await save_transcription_error(db, db_job, payload)
+                logger.error(f"[{job_id}] Falha registrada: {payload.get('error_message', 'Erro desconhecido')}")
+
+            elif status == "processing":
+                # Atualizar status para processing
+                db_job.status = TranscriptionStatus.PROCESSING
+                db_job.updated_at = datetime.utcnow()
+                job_data = db_job.job_data or {}
+                if "processing_started_at" not in job_data:
+                    # Marca o fim da espera na fila (usado nas estatísticas de RTF)
+                    db_job.job_data = {**job_data, "processing_started_at": db_job.updated_at.isoformat()}
+                db.commit()
+                logger.info(f"[{job_id}] Status atualizado para: processing")
+
+            # Salvar no Redis só o resultado final (GET /transcription/{job_id} serve qualquer hit do cache)
+            if hasattr(request.app.state, 'redis_client') and request.app.state.redis_client:
+                if db_job.status in [TranscriptionStatus.COMPLETED, TranscriptionStatus.FAILED]:
+                    # Mesmo formato servido por GET /transcription/{job_id}
+                    await set_cached(request.app.state.redis_client, job_id, encode(job_result(db_job)))
+                else:
+                    await invalidate(request.app.state.redis_client, job_id)
 
         return JSONResponse(
             status_code=200,
@@ -77,29 +95,39 @@ async def save_transcription_result(db: Session, job: Job, payload: dict):
         # Atualizar status e resultados
         job.status = TranscriptionStatus.COMPLETED
         job.result_text = payload.get("text")
-        job.result_segments = payload.get("segments", [])
+        job.set_segments(payload.get("segments") or [])
         job.result_language = payload.get("language")
         job.duration = str(payload.get("duration")) if payload.get("duration") else None
         job.completed_at = datetime.utcnow()
         job.updated_at = datetime.utcnow()
 
+        # Registrar amostra de RTF para o estimador de ETA e métricas do worker
+        job.job_data = {
+            **(job.job_data or {}),
+            "eta": record_eta_sample(job, payload.get("duration"), job.completed_at),
+            "worker_metrics": payload.get("metrics") or {},
+            "language_detection": payload.get("language_detection"),
+            "speakers": payload.get("speakers"),
+            "timings": payload.get("timings")
+        }
+
         # Limpar mensagem de erro se existir
         job.error_message = None
 
         db.commit()
         logger.info(f"[{job.id}] Resultado salvo no banco de dados")
 
-        # Limpar arquivo temporário APENAS se for upload local (não URL)
-        if job.file_path and not job.file_url and os.path.exists(job.file_path):
+        # Limpar arquivo enviado (upload ou áudio extraído de URL) do armazenamento
+        if job.file_path:
             try:
                 # Aguardar um pouco antes de limpar para garantir que o processamento terminou
                 import asyncio
                 await asyncio.sleep(2)
 
-                os.remove(job.file_path)
-                logger.info(f"[{job.id}] Arquivo local removido: {job.file_path}")
+                if await FileHandler().delete_file(job.file_path):
+                    logger.info(f"[{job.id}] Arquivo removido: {job.file_path}")
             except Exception as e:
-                logger.warning(f"[{job.id}] Erro ao remover arquivo local: {e}")
+                logger.warning(f"[{job.id}] Erro ao remover arquivo: {e}")
 
     except Exception as e:
         db.rollback()
@@ -116,34 +144,21 @@ async def save_transcription_error(db: Session, job: Job, payload: dict):
         job.error_message = payload.get("error_message", "Erro desconhecido durante a transcrição")
         job.completed_at = datetime.utcnow()
         job.updated_at = datetime.utcnow()
+        if payload.get("timings"):
+            job.job_data = {**(job.job_data or {}), "timings": payload["timings"]}
 
         db.commit()
         logger.info(f"[{job.id}] Erro salvo no banco de dados")
 
-        # Limpar arquivo temporário em caso de erro também (apenas uploads locais)
-        if job.file_path and not job.file_url and os.path.exists(job.file_path):
+        # Limpar arquivo em caso de erro também
+        if job.file_path:
             try:
-                os.remove(job.file_path)
-                logger.info(f"[{job.id}] Arquivo local removido após erro: {job.file_path}")
+                if await FileHandler().delete_file(job.file_path):
+                    logger.info(f"[{job.id}] Arquivo removido após erro: {job.file_path}")
             except Exception as e:
-                logger.warning(f"[{job.id}] Erro ao remover arquivo local após falha: {e}")
+                logger.warning(f"[{job.id}] Erro ao remover arquivo após falha: {e}")
 
     except Exception as e:
         db.rollback()
         logger.error(f"[{job.id}] Erro ao salvar erro da transcrição: {e}")
         raise
-
-
-async def save_to_redis_cache(redis_client, job_id: str, job_data: dict):
-    """Salva resultado no cache Redis"""
-    try:
-        # Salvar por 24 horas (86400 segundos)
-        await redis_client.setex(
-            f"job:{job_id}",
-            86400,
-            json.dumps(job_data, default=str, ensure_ascii=False)
-        )
-        logger.debug(f"[{job_id}] Job salvo no cache Redis")
-    except Exception as e:
-        logger.warning(f"[{job_id}] Erro ao salvar no Redis: {e}")
-        # Não é crítico, então não propagar o erro
\ No newline at end of file
@@ -1,4 +1,6 @@
 import os
+import time
+import orjson
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
@@ -7,6 +9,12 @@ from sqlalchemy.pool import StaticPool
 # Configuração do banco de dados
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./transcriptions.db")
 
+# Colunas JSON (segmentos, job_data) serializadas com orjson
+JSON_OPTIONS = {
+    "json_serializer": lambda value: orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS).decode(),
+    "json_deserializer": orjson.loads
+}
+
 # Para SQLite, usar configurações especiais
 if DATABASE_URL.startswith("sqlite"):
     engine = create_engine(
@@ -16,23 +24,47 @@ if DATABASE_URL.startswith("sqlite"):
             "timeout": 20
         },
         poolclass=StaticPool,
-        echo=os.getenv("DEBUG", "false").lower() == "true"
+        echo=os.getenv("DEBUG", "false").lower() == "true",
+        **JSON_OPTIONS
     )
 else:
-    engine = create_engine(DATABASE_URL)
+    engine = create_engine(DATABASE_URL, **JSON_OPTIONS)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 def create_db_and_tables():
-    """Cria as tabelas no banco de dados"""
+    """Aplica as migrações pendentes (Alembic) e cria o que ainda faltar"""
     from .models import Job  # Import aqui para evitar circular imports
+
+    run_migrations()
     Base.metadata.create_all(bind=engine)
 
+    # create_all não adiciona índices novos a tabelas já existentes
+    for index in Job.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+def run_migrations():
+    """alembic upgrade head na conexão da aplicação (create_all não altera tabelas existentes)"""
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "alembic.ini"))
+    config.attributes["configure_logger"] = False
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
+
 def get_db():
     """Dependency para obter sessão do banco de dados"""
+    from ..utils.metrics import DB_SESSION_WAIT
+
+    started = time.perf_counter()
     db = SessionLocal()
     try:
+        # Obtém a conexão já aqui para medir a espera no pool (timeout do pool ainda fecha a sessão)
+        db.connection()
+        DB_SESSION_WAIT.observe(time.perf_counter() - started)
         yield db
     finally:
         db.close()
\ No newline at end of file
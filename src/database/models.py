@@ -1,15 +1,23 @@
-from sqlalchemy import Column, String, DateTime, Text, JSON, Enum as SQLEnum
+from sqlalchemy import Column, String, DateTime, Text, JSON, LargeBinary, Index, Enum as SQLEnum
 from sqlalchemy.sql import func
 from .connection import Base
 from ..models.transcription import TranscriptionStatus
+from ..utils.segment_table import SegmentTable
 import uuid
 
 class Job(Base):
     __tablename__ = "jobs"
+    __table_args__ = (
+        # Usado pelo reconciliador para encontrar jobs parados
+        Index("ix_jobs_status_updated_at", "status", "updated_at"),
+    )
 
     # Chaves primárias e identificadores
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     trigger_job_id = Column(String, nullable=True, index=True)
+    batch_id = Column(String, nullable=True, index=True)
+    # URL canônica + ETag/Last-Modified (ou id do extrator) para reaproveitar resultados
+    media_key = Column(String, nullable=True, index=True)
 
     # Status e timestamps
     status = Column(SQLEnum(TranscriptionStatus), nullable=False, default=TranscriptionStatus.PENDING)
@@ -25,7 +33,9 @@ class Job(Base):
 
     # Resultados da transcrição
     result_text = Column(Text, nullable=True)
+    # Legado: lista de dicts. Jobs novos guardam os segmentos em colunas (SegmentTable.to_bytes)
     result_segments = Column(JSON, nullable=True)
+    result_segments_bin = Column(LargeBinary, nullable=True)
     result_language = Column(String, nullable=True)
     duration = Column(String, nullable=True)  # Armazenar como string para flexibilidade
 
@@ -33,12 +43,32 @@ class Job(Base):
     error_message = Column(Text, nullable=True)
     job_data = Column("metadata", JSON, nullable=True, default=dict)
 
+    def segment_table(self) -> SegmentTable:
+        """Segmentos em formato colunar, lidos do binário ou convertidos da coluna JSON antiga"""
+        if self.result_segments_bin:
+            return SegmentTable.from_bytes(self.result_segments_bin)
+        return SegmentTable.from_segments(self.result_segments)
+
+    @property
+    def segments(self) -> list:
+        """Segmentos no formato da API (lista de dicts)"""
+        if self.result_segments_bin:
+            return SegmentTable.from_bytes(self.result_segments_bin).to_segments()
+        return self.result_segments or []
+
+    def set_segments(self, segments: list):
+        """Grava os segmentos no formato binário colunar"""
+        self.result_segments_bin = SegmentTable.from_segments(segments).to_bytes()
+        self.result_segments = None
+
     def to_dict(self):
         """Converte o modelo SQLAlchemy para dicionário"""
         return {
             "id": self.id,
             "status": self.status,
             "trigger_job_id": self.trigger_job_id,
+            "batch_id": self.batch_id,
+            "media_key": self.media_key,
             "created_at": self.created_at,
             "updated_at": self.updated_at,
             "completed_at": self.completed_at,
@@ -47,7 +77,7 @@ class Job(Base):
             "language": self.language,
             "webhook_url": self.webhook_url,
             "result_text": self.result_text,
-            "result_segments": self.result_segments,
+            "result_segments": self.segments,
             "result_language": self.result_language,
             "duration": self.duration,
             "error_message": self.error_message,
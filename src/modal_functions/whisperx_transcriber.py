@@ -1,18 +1,339 @@
 import modal
 import os
-from typing import Optional, Dict, Any
+import json
+import time
+import shutil
+import hashlib
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Tuple
 import whisperx
 import torch
+import numpy as np
 import tempfile
 import httpx
 from pathlib import Path
 import logging
 
+try:
+    from opentelemetry import trace as otel_trace
+    from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+except ImportError:  # tracing é opcional no worker
+    otel_trace = None
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = modal.App("whisperx-transcriber")
 
+SAMPLE_RATE = 16000
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# Download paralelo por HTTP Range
+RANGE_PART_SIZE = int(os.getenv("WORKER_RANGE_PART_SIZE", 16 * 1024 * 1024))
+RANGE_CONCURRENCY = int(os.getenv("WORKER_RANGE_CONCURRENCY", 8))
+# auto | range | stream | sequential
+DOWNLOAD_MODE = os.getenv("WORKER_DOWNLOAD_MODE", "auto")
+# Containers que precisam de seek (moov no fim) não podem ser decodificados a partir de um pipe
+NON_STREAMABLE_EXTENSIONS = {".mp4", ".m4a", ".mov", ".3gp"}
+# Janelas de inferência sobre o memmap (limita o pico de memória)
+WINDOW_SECONDS = int(os.getenv("WORKER_WINDOW_SECONDS", 1800))
+CUT_SEARCH_SECONDS = int(os.getenv("WORKER_CUT_SEARCH_SECONDS", 30))
+# Identificação de idioma: modelo pequeno sobre algumas janelas de 30s com fala
+LID_MODEL_NAME = os.getenv("WORKER_LID_MODEL", "small")
+LID_WINDOWS = int(os.getenv("WORKER_LID_WINDOWS", 3))
+LID_WINDOW_SECONDS = 30
+LID_MIN_CONFIDENCE = float(os.getenv("WORKER_LID_MIN_CONFIDENCE", 0.5))
+# Idiomas aceitos (vírgula); vazio = idiomas com modelo de alinhamento no WhisperX
+SUPPORTED_LANGUAGES = {lang.strip() for lang in os.getenv("WORKER_SUPPORTED_LANGUAGES", "").split(",") if lang.strip()}
+# reject | transcribe
+UNSUPPORTED_LANGUAGE_POLICY = os.getenv("WORKER_UNSUPPORTED_LANGUAGE_POLICY", "reject")
+
+# Corte de silêncio antes da GPU: só trechos de fala vão para ASR/alinhamento, timestamps remapeados depois
+VAD_TRIM = os.getenv("WORKER_VAD_TRIM", "true").lower() == "true"
+VAD_THRESHOLD = float(os.getenv("WORKER_VAD_THRESHOLD", 0.5))
+# Só pausas mais longas que isso são removidas; as curtas ficam (contexto para o modelo)
+VAD_MIN_SILENCE_SECONDS = float(os.getenv("WORKER_VAD_MIN_SILENCE", 1.0))
+VAD_PAD_SECONDS = float(os.getenv("WORKER_VAD_PAD", 0.25))
+# Abaixo dessa fração removida não compensa compactar
+VAD_MIN_SAVING = float(os.getenv("WORKER_VAD_MIN_SAVING", 0.05))
+VAD_BLOCK_SECONDS = 600
+
+# Diarização (pyannote via WhisperX); o token do Hugging Face vem de um Secret do Modal
+DIARIZATION_MODEL = os.getenv("WORKER_DIARIZATION_MODEL", "pyannote/speaker-diarization-3.1")
+HF_SECRET_NAME = os.getenv("WORKER_HF_SECRET")
+
+# Tracing: console (logs do Modal) ou none; a amostragem segue a decisão do traceparent recebido
+TRACING_EXPORTER = os.getenv("WORKER_TRACING_EXPORTER", "none").lower()
+TRACING_SAMPLE_RATIO = float(os.getenv("TRACING_SAMPLE_RATIO", 0.05))
+
+# Cache de artefatos intermediários (PCM decodificado, janelas de fala, idioma) num Volume do Modal
+CACHE_VOLUME_NAME = os.getenv("WORKER_CACHE_VOLUME", "echo-audio-cache")
+CACHE_DIR = os.getenv("WORKER_CACHE_DIR", "/cache")
+CACHE_MAX_BYTES = int(os.getenv("WORKER_CACHE_MAX_BYTES", 50 * 1024 ** 3))
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Variantes do worker escolhidas pela API (src/services/worker_router.py): modelo padrão de cada uma e
+# limites de containers lidos no deploy; min_containers > 0 mantém um pool aquecido (cobrado mesmo ocioso)
+WORKER_MODELS = {
+    "cpu": os.getenv("WORKER_CPU_MODEL", "small"),
+    "t4": os.getenv("WORKER_T4_MODEL", "large-v2"),
+    "a10g": os.getenv("WORKER_A10G_MODEL", "large-v2"),
+}
+MIN_CONTAINERS = {variant: int(os.getenv(f"WORKER_MIN_CONTAINERS_{variant.upper()}", 0)) for variant in WORKER_MODELS}
+MAX_CONTAINERS = {
+    variant: int(os.getenv(f"WORKER_MAX_CONTAINERS_{variant.upper()}", default))
+    for variant, default in (("cpu", 20), ("t4", 10), ("a10g", 10))
+}
+# Segundos ocioso antes de o container (acima do pool mínimo) ser desligado
+SCALEDOWN_WINDOW = int(os.getenv("WORKER_SCALEDOWN_WINDOW", 60))
+
+cache_volume = modal.Volume.from_name(CACHE_VOLUME_NAME, create_if_missing=True) if CACHE_VOLUME_NAME else None
+
+# Estado reaproveitado entre jobs no mesmo container
+_prefetch_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="prefetch")
+_lid_model = None
+_lid_lock = threading.Lock()
+_diarize_pipeline = None
+_diarize_lock = threading.Lock()
+_tracer = None
+_tracer_lock = threading.Lock()
+_cache_stats = {"lookups": 0, "hits": 0, "seconds_saved": 0.0}
+
+
+class UnsupportedLanguageError(Exception):
+    """Idioma detectado fora da lista suportada"""
+
+
+class StageTimer:
+    """Tempo por etapa do job: caminho crítico (stages) e cargas em paralelo (background)
+
+    Com tracing ativo, cada etapa também vira um span filho do span do worker.
+    """
+
+    def __init__(self, tracer=None, trace_context=None):
+        self.started_at = time.time()
+        self._started = time.monotonic()
+        self.stages: Dict[str, float] = {}
+        self.background: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.tracer = tracer
+        self.trace_context = trace_context
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.monotonic()
+        try:
+            with self._span(name):
+                yield
+        finally:
+            self._add(self.stages, name, time.monotonic() - started)
+
+    def call(self, name: str, fn, *args, **kwargs):
+        """Executa fn (em outra thread) registrando sua duração em background"""
+        started = time.monotonic()
+        try:
+            # Contexto explícito: o contextvars não atravessa o ThreadPoolExecutor
+            with self._span(name):
+                return fn(*args, **kwargs)
+        finally:
+            self._add(self.background, name, time.monotonic() - started)
+
+    def _span(self, name: str):
+        if self.tracer is None:
+            return _null_context()
+        return self.tracer.start_as_current_span(f"worker.{name}", context=self.trace_context)
+
+    def trace_headers(self) -> Dict[str, str]:
+        """traceparent do span do worker para os webhooks"""
+        headers: Dict[str, str] = {}
+        if self.trace_context is not None:
+            TraceContextTextMapPropagator().inject(headers, context=self.trace_context)
+        return headers
+
+    def _add(self, target: Dict[str, float], name: str, seconds: float):
+        with self._lock:
+            target[name] = target.get(name, 0.0) + seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "started_at": self.started_at,
+                "total": round(time.monotonic() - self._started, 3),
+                "stages": {name: round(value, 3) for name, value in self.stages.items()},
+                "background": {name: round(value, 3) for name, value in self.background.items()}
+            }
+
+
+class AudioCache:
+    """Artefatos intermediários de um áudio, chaveados pelo sha256 do arquivo original
+
+    Cada entrada guarda o PCM float32 a 16kHz (audio.f32) e um meta.json com os resultados baratos de
+    reaproveitar (janelas de fala, identificação de idioma) e quanto custou produzi-los. Reruns com outro
+    idioma/modelo e retries do mesmo arquivo abrem o PCM direto do volume, sem download nem ffmpeg.
+    Sem o hash no payload, um índice URL+ETag/Last-Modified -> hash evita baixar de novo o mesmo objeto.
+    Despejo LRU: o mtime da entrada é atualizado a cada acerto e as mais antigas saem acima de max_bytes.
+    """
+
+    def __init__(self, root: str, volume=None, max_bytes: int = CACHE_MAX_BYTES):
+        self.root = Path(root)
+        self.volume = volume
+        self.max_bytes = max_bytes
+        (self.root / "entries").mkdir(parents=True, exist_ok=True)
+        (self.root / "index").mkdir(parents=True, exist_ok=True)
+
+    def reload(self):
+        """Enxerga entradas gravadas por outros containers desde a montagem"""
+        if self.volume is not None:
+            try:
+                self.volume.reload()
+            except Exception as e:
+                logger.warning(f"Não foi possível recarregar o volume de cache: {e}")
+
+    def commit(self):
+        if self.volume is not None:
+            try:
+                self.volume.commit()
+            except Exception as e:
+                logger.warning(f"Não foi possível persistir o volume de cache: {e}")
+
+    def _entry_dir(self, content_hash: str) -> Path:
+        return self.root / "entries" / content_hash[:2] / content_hash
+
+    def _index_path(self, identity: str) -> Path:
+        return self.root / "index" / f"{hashlib.sha256(identity.encode()).hexdigest()}.json"
+
+    def resolve(self, identity: Optional[str]) -> Optional[str]:
+        """Hash do conteúdo já visto para essa URL+validador (None se desconhecido)"""
+        if not identity:
+            return None
+        try:
+            return json.loads(self._index_path(identity).read_text())["content_hash"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def lookup(self, content_hash: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Metadados da entrada (com o caminho do PCM) ou None; marca a entrada como usada"""
+        if not content_hash:
+            return None
+        entry_dir = self._entry_dir(content_hash)
+        try:
+            meta = json.loads((entry_dir / "meta.json").read_text())
+            if not (entry_dir / "audio.f32").exists():
+                return None
+            os.utime(entry_dir)
+        except (OSError, ValueError):
+            return None
+        meta["pcm_path"] = str(entry_dir / "audio.f32")
+        return meta
+
+    def store(self, content_hash: str, pcm_path: str, meta: Dict[str, Any], identity: Optional[str] = None) -> str:
+        """Move o PCM para o cache (rename atômico, vários containers podem gravar o mesmo hash)"""
+        entry_dir = self._entry_dir(content_hash)
+        entry_dir.mkdir(parents=True, exist_ok=True)
+        target = entry_dir / "audio.f32"
+        staging = entry_dir / f"audio.f32.{os.getpid()}.{threading.get_ident()}"
+        shutil.move(pcm_path, staging)
+        os.replace(staging, target)
+        self._write_json(entry_dir / "meta.json", {**meta, "content_hash": content_hash, "bytes": target.stat().st_size})
+        if identity:
+            self._write_json(self._index_path(identity), {"content_hash": content_hash})
+        self.evict()
+        return str(target)
+
+    def update(self, content_hash: str, **artifacts):
+        """Acrescenta resultados (idioma, janelas de fala) ao meta.json de uma entrada existente"""
+        meta_path = self._entry_dir(content_hash) / "meta.json"
+        try:
+            meta = json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            return
+        meta.setdefault("artifacts", {}).update(artifacts)
+        self._write_json(meta_path, meta)
+
+    def evict(self):
+        """Remove as entradas usadas há mais tempo até o cache caber em max_bytes"""
+        entries = []
+        total = 0
+        for entry_dir in (self.root / "entries").glob("*/*"):
+            try:
+                size = sum(f.stat().st_size for f in entry_dir.iterdir())
+                entries.append((entry_dir.stat().st_mtime, size, entry_dir))
+            except OSError:
+                continue
+            total += size
+
+        for _, size, entry_dir in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+            logger.info(f"Cache de áudio: entrada {entry_dir.name} removida (LRU)")
+
+    @staticmethod
+    def _write_json(path: Path, data: Dict[str, Any]):
+        staging = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}")
+        staging.write_text(json.dumps(data))
+        os.replace(staging, path)
+
+
+
+class CacheReport:
+    """Acertos do cache de áudio num job e o tempo que eles pouparam"""
+
+    def __init__(self, job_id: str, entry: Optional[Dict[str, Any]], download_metrics: Dict[str, Any]):
+        self.job_id = job_id
+        self.entry = entry
+        self.results: Dict[str, str] = {}
+        self.seconds_saved = 0.0
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        if entry is not None:
+            hit = download_metrics["download_mode"] == "cache"
+            self.results["audio"] = "hit" if hit else "miss"
+            if hit:
+                self.seconds_saved += max(0.0, entry.get("fetch_seconds", 0) - download_metrics["download_seconds"])
+
+    def get(self, key: str):
+        """Resultado guardado para esse artefato (None se não há cache ou ainda não foi calculado)"""
+        if self.entry is None:
+            return None
+        artifact = (self.entry.get("artifacts") or {}).get(key)
+        self.results[key] = "hit" if artifact else "miss"
+        if not artifact:
+            return None
+        self.seconds_saved += artifact.get("seconds", 0)
+        return artifact["value"]
+
+    def put(self, key: str, value, seconds: float):
+        if self.entry is not None:
+            self._pending[key] = {"value": value, "seconds": round(seconds, 3)}
+
+    def finish(self, cache: Optional[AudioCache]) -> Optional[Dict[str, Any]]:
+        """Grava os artefatos novos, persiste o volume e loga a taxa de acerto do job e do container"""
+        if cache is None or self.entry is None:
+            return None
+        if self._pending:
+            cache.update(self.entry["content_hash"], **self._pending)
+        # Persistir o volume fora do caminho crítico da inferência
+        _prefetch_pool.submit(cache.commit)
+
+        hits = sum(1 for result in self.results.values() if result == "hit")
+        _cache_stats["lookups"] += len(self.results)
+        _cache_stats["hits"] += hits
+        _cache_stats["seconds_saved"] += self.seconds_saved
+        report = {
+            "artifacts": self.results,
+            "hit_rate": round(hits / len(self.results), 3) if self.results else None,
+            "seconds_saved": round(self.seconds_saved, 3)
+        }
+        logger.info(
+            f"[{self.job_id}] Cache de áudio: {hits}/{len(self.results)} acertos {self.results}, "
+            f"{report['seconds_saved']}s economizados; no container: "
+            f"{_cache_stats['hits']}/{_cache_stats['lookups']} acertos, {_cache_stats['seconds_saved']:.1f}s economizados"
+        )
+        return report
+
 
 image = (
     modal.Image.from_registry("nvidia/cuda:12.1.1-cudnn8-runtime-ubuntu22.04")
@@ -33,55 +354,241 @@ image = (
         "ffmpeg-python",
         "httpx",
         "fastapi",
+        "opentelemetry-sdk==1.21.0",
     ])
 )
 
+WORKER_SECRETS = [modal.Secret.from_name(HF_SECRET_NAME)] if HF_SECRET_NAME else []
+WORKER_VOLUMES = {CACHE_DIR: cache_volume} if cache_volume else {}
+
+
 @app.function(
     image=image,
     gpu="T4",
     memory=8192,
+    secrets=WORKER_SECRETS,
     timeout=1800,
-    retries=3
+    retries=3,
+    volumes=WORKER_VOLUMES,
+    min_containers=MIN_CONTAINERS["t4"],
+    max_containers=MAX_CONTAINERS["t4"],
+    scaledown_window=SCALEDOWN_WINDOW
 )
 def transcribe_gpu_worker(
         job_id: str,
         file_url: Optional[str] = None,
         language: str = "auto",
-        webhook_url: Optional[str] = None
+        webhook_url: Optional[str] = None,
+        diarize: bool = False,
+        traceparent: Optional[str] = None,
+        content_hash: Optional[str] = None,
+        model_name: Optional[str] = None
+):
+    """Variante padrão (T4): jobs sem roteamento e áudios de duração média"""
+    return run_transcription(
+        job_id, file_url, language, webhook_url, diarize, traceparent, content_hash, "t4", model_name
+    )
+
+
+@app.function(
+    image=image,
+    cpu=8.0,
+    memory=8192,
+    secrets=WORKER_SECRETS,
+    timeout=1800,
+    retries=3,
+    volumes=WORKER_VOLUMES,
+    min_containers=MIN_CONTAINERS["cpu"],
+    max_containers=MAX_CONTAINERS["cpu"],
+    scaledown_window=SCALEDOWN_WINDOW
+)
+def transcribe_cpu_worker(
+        job_id: str,
+        file_url: Optional[str] = None,
+        language: str = "auto",
+        webhook_url: Optional[str] = None,
+        diarize: bool = False,
+        traceparent: Optional[str] = None,
+        content_hash: Optional[str] = None,
+        model_name: Optional[str] = None
+):
+    """Clipes curtos: modelo menor em CPU, sem o overhead de subir o large na GPU"""
+    return run_transcription(
+        job_id, file_url, language, webhook_url, diarize, traceparent, content_hash, "cpu", model_name
+    )
+
+
+@app.function(
+    image=image,
+    gpu="A10G",
+    memory=16384,
+    secrets=WORKER_SECRETS,
+    timeout=7200,
+    retries=3,
+    volumes=WORKER_VOLUMES,
+    min_containers=MIN_CONTAINERS["a10g"],
+    max_containers=MAX_CONTAINERS["a10g"],
+    scaledown_window=SCALEDOWN_WINDOW
+)
+def transcribe_a10g_worker(
+        job_id: str,
+        file_url: Optional[str] = None,
+        language: str = "auto",
+        webhook_url: Optional[str] = None,
+        diarize: bool = False,
+        traceparent: Optional[str] = None,
+        content_hash: Optional[str] = None,
+        model_name: Optional[str] = None
 ):
-    audio_file = None
+    """Áudios longos e tier priority: GPU mais rápida e timeout de 2h"""
+    return run_transcription(
+        job_id, file_url, language, webhook_url, diarize, traceparent, content_hash, "a10g", model_name
+    )
+
+
+def run_transcription(
+        job_id: str,
+        file_url: Optional[str],
+        language: str,
+        webhook_url: Optional[str],
+        diarize: bool,
+        traceparent: Optional[str],
+        content_hash: Optional[str],
+        variant: str,
+        model_name: Optional[str] = None
+):
+    model_name = model_name or WORKER_MODELS[variant]
+    workdir = tempfile.mkdtemp(prefix=f"{job_id}_")
+    job_started = time.monotonic()
+    tracer = get_tracer()
+    root_span = None
+    trace_context = None
+    if tracer is not None:
+        parent = TraceContextTextMapPropagator().extract({"traceparent": traceparent} if traceparent else {})
+        root_span = tracer.start_span(
+            "worker.transcribe", context=parent, attributes={"job.id": job_id, "worker.variant": variant}
+        )
+        trace_context = otel_trace.set_span_in_context(root_span)
+    timer = StageTimer(tracer, trace_context)
     try:
-        logger.info(f"[{job_id}] Iniciando worker GPU.")
+        logger.info(f"[{job_id}] Iniciando worker {variant} ({model_name}).")
         if webhook_url:
-            notify_webhook(webhook_url, job_id, "processing", "Iniciando transcrição na GPU")
+            notify_webhook(
+                webhook_url, job_id, "processing", f"Iniciando transcrição ({variant})", headers=timer.trace_headers()
+            )
 
         if not file_url:
             raise Exception("Nenhuma file_url foi fornecida para o worker")
 
-        audio_file = download_direct_url(file_url, job_id)
-
         device = "cuda" if torch.cuda.is_available() else "cpu"
-        compute_type = "float16" if device == "cuda" else "float32"
+        compute_type = "float16" if device == "cuda" else "int8"
+
+        # Carregar os modelos em paralelo com o download para a GPU não ficar ociosa
+        model_future = _prefetch_pool.submit(
+            timer.call, "model_load", whisperx.load_model, model_name, device, compute_type=compute_type,
+            language=None if language == "auto" else language
+        )
+        lid_future = _prefetch_pool.submit(timer.call, "lid_model_load", get_lid_model, device) if language == "auto" else None
+        diarize_pipeline_future = (
+            _prefetch_pool.submit(timer.call, "diarization_model_load", get_diarize_pipeline, device) if diarize else None
+        )
+
+        # PCM em arquivo mapeado em memória: o RSS não cresce com a duração do áudio
+        cache = AudioCache(CACHE_DIR, cache_volume) if cache_volume else None
+        audio, download_metrics, cache_entry = fetch_audio(file_url, job_id, workdir, timer, cache, content_hash)
+        cache_report = CacheReport(job_id, cache_entry, download_metrics)
+
+        # Pré-passo barato de identificação de idioma antes da transcrição pesada
+        language_detection = None
+        target_language = None if language == "auto" else language
+        if lid_future is not None:
+            lid_key = f"language_id:{LID_MODEL_NAME}:{LID_WINDOWS}"
+            language_detection = cache_report.get(lid_key)
+            if language_detection is None:
+                with timer.stage("language_id"):
+                    language_detection = detect_language(lid_future.result(), audio, job_id, cache_report)
+                cache_report.put(lid_key, language_detection, language_detection["seconds"])
+            if language_detection["confidence"] >= LID_MIN_CONFIDENCE:
+                target_language = language_detection["language"]
+
+        if target_language and not is_language_supported(target_language):
+            if UNSUPPORTED_LANGUAGE_POLICY == "reject":
+                raise UnsupportedLanguageError(f"Idioma não suportado: {target_language}")
+            logger.warning(f"[{job_id}] Idioma {target_language} sem suporte completo; transcrevendo sem alinhamento")
+
+        # O modelo de alinhamento carrega enquanto o ASR roda
+        align_future = None
+        if target_language and target_language in alignable_languages():
+            align_future = _prefetch_pool.submit(
+                timer.call, "align_model_load", whisperx.load_align_model, language_code=target_language, device=device
+            )
+
+        # A diarização usa o áudio inteiro (rótulos de falante consistentes) e roda junto com ASR/alinhamento
+        diarize_future = None
+        if diarize_pipeline_future is not None:
+            diarize_future = _prefetch_pool.submit(
+                timer.call, "diarization", run_diarization, diarize_pipeline_future, audio, job_id
+            )
 
-        model = whisperx.load_model("large-v2", device, compute_type=compute_type,
-                                    language=None if language == "auto" else language)
-        audio = whisperx.load_audio(audio_file)
-        result = model.transcribe(audio, batch_size=16)
-        detected_language = result.get("language", language)
+        # Fala compactada (sem silêncios/música longos) para a GPU, enquanto o modelo termina de carregar;
+        # o áudio original segue para a diarização
+        asr_audio, offset_map, vad_metrics = audio, None, None
+        if VAD_TRIM:
+            with timer.stage("vad_trim"):
+                asr_audio, offset_map, vad_metrics = trim_silence(audio, workdir, job_id, cache_report)
 
-        if detected_language and detected_language != "auto":
-            model_a, metadata = whisperx.load_align_model(language_code=detected_language, device=device)
-            result = whisperx.align(result["segments"], model_a, metadata, audio, device, return_char_alignments=False)
+        # Só conta no caminho crítico o tempo que o download não conseguiu esconder
+        with timer.stage("model_load_wait"):
+            model = model_future.result()
+
+        metrics = {
+            **download_metrics,
+            "worker": variant,
+            "model": model_name,
+            "time_to_first_inference": round(time.monotonic() - job_started, 3),
+            "cache": cache_report.finish(cache),
+            "vad": vad_metrics
+        }
+        logger.info(f"[{job_id}] Início da inferência após {metrics['time_to_first_inference']}s: {download_metrics}")
+
+        segments, detected_language = transcribe_windowed(
+            model, asr_audio, device, target_language, job_id, align_future, timer
+        )
+        if offset_map is not None:
+            segments = remap_segments(segments, offset_map)
+            # Estimativa: o ASR/alinhamento custa o mesmo por segundo de fala que teria custado no silêncio
+            gpu_seconds = timer.stages.get("transcribe", 0) + timer.stages.get("align", 0)
+            vad_metrics["gpu_seconds_saved_estimate"] = round(
+                gpu_seconds * vad_metrics["trimmed_seconds"] / max(vad_metrics["speech_seconds"], 1e-6), 3
+            )
+            logger.info(f"[{job_id}] Corte de silêncio: {vad_metrics}")
+
+        speakers = None
+        if diarize_future is not None:
+            with timer.stage("diarization_wait"):
+                segments, speakers, diarization_metrics = assign_speakers(
+                    diarize_future, segments, len(audio) / SAMPLE_RATE
+                )
+            metrics.update(diarization_metrics)
+            logger.info(f"[{job_id}] Diarização: {len(speakers)} falantes, {diarization_metrics}")
 
         transcription_result = {
             "job_id": job_id, "status": "completed",
-            "text": " ".join([segment["text"] for segment in result.get("segments", [])]),
-            "segments": result.get("segments"), "language": detected_language,
-            "duration": len(audio) / 16000 if audio is not None else 0,
+            "text": " ".join([segment["text"] for segment in segments]),
+            "segments": segments, "language": detected_language,
+            "duration": len(audio) / SAMPLE_RATE,
+            "metrics": metrics,
+            "language_detection": language_detection,
+            "speakers": speakers,
+            "timings": timer.to_dict(),
         }
 
         if webhook_url:
-            notify_webhook(webhook_url, job_id, "completed", "Transcrição concluída", transcription_result)
+            with timer.stage("webhook"):
+                notify_webhook(
+                    webhook_url, job_id, "completed", "Transcrição concluída", transcription_result,
+                    headers=timer.trace_headers()
+                )
 
         return transcription_result
 
@@ -89,11 +596,22 @@ def transcribe_gpu_worker(
         error_msg = str(e)
         logger.error(f"[{job_id}] Erro fatal na transcrição: {error_msg}", exc_info=True)
         if webhook_url:
-            notify_webhook(webhook_url, job_id, "failed", error_msg)
+            notify_webhook(
+                webhook_url, job_id, "failed", error_msg, {"timings": timer.to_dict()}, headers=timer.trace_headers()
+            )
+        if root_span is not None:
+            root_span.record_exception(e)
+            root_span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR))
+        if isinstance(e, UnsupportedLanguageError):
+            # Falha definitiva: repetir (retries=3) só refaria download/LID e mandaria o webhook de falha de novo
+            return {"job_id": job_id, "status": "failed", "error_message": error_msg}
         raise e
     finally:
-        if audio_file and os.path.exists(audio_file):
-            os.remove(audio_file)
+        shutil.rmtree(workdir, ignore_errors=True)
+        if root_span is not None:
+            root_span.end()
+            # O container pode ser desligado logo após o job
+            otel_trace.get_tracer_provider().force_flush()
 
 
 @app.function(image=image)
@@ -103,37 +621,616 @@ def web_accept_job(payload: dict):
     if not job_id:
         return {"error": "job_id é obrigatório no payload"}, 400
 
-    transcribe_gpu_worker.spawn(
+    # Variante escolhida pela API; payloads antigos (sem "worker") seguem para a T4
+    worker_function = {
+        "cpu": transcribe_cpu_worker,
+        "t4": transcribe_gpu_worker,
+        "a10g": transcribe_a10g_worker
+    }.get(payload.get("worker"), transcribe_gpu_worker)
+
+    worker_function.spawn(
         job_id=job_id,
         file_url=payload.get("file_url"),
         language=payload.get("language", "auto"),
-        webhook_url=payload.get("webhook_url")
+        webhook_url=payload.get("webhook_url"),
+        diarize=bool(payload.get("diarize", False)),
+        traceparent=payload.get("traceparent"),
+        content_hash=payload.get("content_hash"),
+        model_name=payload.get("model")
     )
 
     return {"status": "transcription_queued", "job_id": job_id}, 202
 
 
-def download_direct_url(url: str, job_id: str) -> str:
-    temp_dir = tempfile.mkdtemp()
+def fetch_audio(
+        url: str,
+        job_id: str,
+        workdir: str,
+        timer: StageTimer,
+        cache: Optional[AudioCache] = None,
+        content_hash: Optional[str] = None
+) -> Tuple[np.ndarray, Dict[str, Any], Optional[Dict[str, Any]]]:
+    """Obtém o áudio decodificado (16kHz mono, float32) num memmap, do cache ou com a estratégia de download mais rápida"""
+    started = time.monotonic()
+    size, accepts_ranges, final_url, validator = probe_remote(url)
+    pcm_path = os.path.join(workdir, "audio.f32")
+    # URLs assinadas mudam a cada job: a identidade do objeto é o caminho + ETag/Last-Modified
+    identity = f"{url.split('?')[0]}|{validator}|{size}" if validator else None
+
+    if cache is not None:
+        with timer.stage("cache_lookup"):
+            cache.reload()
+            entry = cache.lookup(content_hash or cache.resolve(identity))
+        if entry is not None:
+            logger.info(f"[{job_id}] Áudio decodificado encontrado no cache ({entry['content_hash'][:12]}); download e ffmpeg pulados")
+            return open_pcm(entry["pcm_path"]), {
+                "download_mode": "cache",
+                "download_bytes": 0,
+                "download_seconds": round(time.monotonic() - started, 3)
+            }, entry
+
+    mode = DOWNLOAD_MODE
+    if mode == "auto":
+        if accepts_ranges and size and size >= 2 * RANGE_PART_SIZE:
+            mode = "range"
+        elif Path(url.split("?")[0]).suffix.lower() in NON_STREAMABLE_EXTENSIONS:
+            mode = "sequential"
+        else:
+            mode = "stream"
+
+    hasher = hashlib.sha256() if cache is not None and not content_hash else None
+    if mode == "stream":
+        try:
+            with timer.stage("download_decode"):
+                downloaded = stream_decode_url(final_url, pcm_path, hasher)
+        except Exception as e:
+            logger.warning(f"[{job_id}] Decodificação em streaming falhou ({e}); baixando o arquivo")
+            mode = "sequential"
+
+    if mode != "stream":
+        with timer.stage("download"):
+            audio_file, downloaded = download_direct_url(final_url, job_id, workdir, size if mode == "range" else None)
+        with timer.stage("decode"):
+            decode_to_pcm(audio_file, pcm_path)
+        if hasher is not None:
+            hasher = _sha256_file(audio_file)
+        os.remove(audio_file)
+
+    elapsed = time.monotonic() - started
+    metrics = {
+        "download_mode": mode,
+        "download_bytes": downloaded,
+        "download_seconds": round(elapsed, 3),
+        "download_throughput_mbps": round(downloaded * 8 / 1e6 / elapsed, 2) if elapsed > 0 else None
+    }
+
+    entry = None
+    if cache is not None:
+        content_hash = content_hash or hasher.hexdigest()
+        try:
+            with timer.stage("cache_store"):
+                pcm_path = cache.store(content_hash, pcm_path, {"fetch_seconds": round(elapsed, 3)}, identity)
+            entry = cache.lookup(content_hash)
+        except Exception as e:
+            logger.warning(f"[{job_id}] Não foi possível gravar o áudio no cache: {e}")
+    return open_pcm(pcm_path), metrics, entry
+
+
+def _sha256_file(path: str):
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher
+
+
+def open_pcm(pcm_path: str) -> np.ndarray:
+    """Mapeia o PCM float32 do disco sem carregá-lo na RAM"""
+    if os.path.getsize(pcm_path) == 0:
+        raise Exception("Áudio vazio ou sem faixa de áudio decodificável")
+    return np.memmap(pcm_path, dtype=np.float32, mode="r")
+
+
+def decode_to_pcm(source: str, pcm_path: str):
+    """Decodifica com ffmpeg direto para um arquivo PCM float32 (mesmo formato do whisperx.load_audio)"""
+    result = subprocess.run(
+        _ffmpeg_pcm_cmd(source, pcm_path),
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    if result.returncode != 0:
+        raise Exception(f"ffmpeg falhou: {result.stderr.decode(errors='ignore').strip()}")
+
+
+def _ffmpeg_pcm_cmd(source: str, pcm_path: str) -> list:
+    return [
+        "ffmpeg", "-nostdin", "-threads", "0", "-v", "error", "-y",
+        "-i", source,
+        "-f", "f32le", "-ac", "1", "-acodec", "pcm_f32le", "-ar", str(SAMPLE_RATE),
+        pcm_path
+    ]
+
+
+def transcribe_windowed(
+        model,
+        audio: np.ndarray,
+        device: str,
+        language: Optional[str],
+        job_id: str,
+        align_future: Optional[Future] = None,
+        timer: Optional[StageTimer] = None
+):
+    """Transcreve e alinha janela a janela; só uma janela do áudio fica residente na RAM por vez"""
+    segments = []
+    detected_language = language
+    align_model, align_metadata = None, None
+    timer = timer or StageTimer()
+
+    for start, end in iter_windows(audio):
+        # Cópia limitada ao tamanho da janela; as páginas do memmap podem ser descartadas pelo kernel
+        window = np.array(audio[start:end])
+        with timer.stage("transcribe"):
+            result = model.transcribe(window, batch_size=16, language=detected_language)
+        detected_language = detected_language or result.get("language")
+        window_segments = result.get("segments", [])
+
+        if window_segments and detected_language in alignable_languages():
+            if align_model is None:
+                with timer.stage("align_model_wait"):
+                    if align_future is not None:
+                        align_model, align_metadata = align_future.result()
+                    else:
+                        align_model, align_metadata = whisperx.load_align_model(
+                            language_code=detected_language, device=device
+                        )
+            with timer.stage("align"):
+                aligned = whisperx.align(
+                    window_segments, align_model, align_metadata, window, device, return_char_alignments=False
+                )
+            window_segments = aligned.get("segments", [])
+
+        segments.extend(shift_segments(window_segments, start / SAMPLE_RATE))
+        logger.info(f"[{job_id}] Janela {start / SAMPLE_RATE:.0f}s-{end / SAMPLE_RATE:.0f}s transcrita")
+        del window
+
+    return segments, detected_language
+
+
+def get_tracer():
+    """Tracer do worker, configurado uma vez por container (None com WORKER_TRACING_EXPORTER=none)"""
+    global _tracer
+    if otel_trace is None or TRACING_EXPORTER == "none":
+        return None
+    with _tracer_lock:
+        if _tracer is None:
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+            from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+            provider = TracerProvider(
+                resource=Resource.create({"service.name": "echo-worker"}),
+                sampler=ParentBased(TraceIdRatioBased(TRACING_SAMPLE_RATIO))
+            )
+            provider.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter()))
+            otel_trace.set_tracer_provider(provider)
+            _tracer = otel_trace.get_tracer("echo-worker")
+    return _tracer
+
+
+@contextmanager
+def _null_context():
+    yield
+
+
+def get_diarize_pipeline(device: str):
+    """Pipeline do pyannote carregado uma vez por container"""
+    global _diarize_pipeline
+    with _diarize_lock:
+        if _diarize_pipeline is None:
+            from whisperx.diarize import DiarizationPipeline
+            hf_token = os.getenv("HF_TOKEN")
+            if not hf_token:
+                raise Exception("HF_TOKEN não configurado; diarização indisponível")
+            _diarize_pipeline = DiarizationPipeline(
+                model_name=DIARIZATION_MODEL, use_auth_token=hf_token, device=device
+            )
+    return _diarize_pipeline
+
+
+def run_diarization(pipeline_future: Future, audio: np.ndarray, job_id: str):
+    """Executa a diarização sobre o áudio inteiro e retorna os turnos de fala e o tempo gasto"""
+    pipeline = pipeline_future.result()
+    # O pipeline faz torch.from_numpy(audio[None, :]): com o memmap o tensor é uma view das páginas do arquivo,
+    # sem copiar o áudio inteiro para a RAM. Copy-on-write porque o torch não quer buffers somente leitura
+    if isinstance(audio, np.memmap):
+        audio = np.memmap(audio.filename, dtype=np.float32, mode="c")
+    started = time.monotonic()
+    diarize_segments = pipeline(audio)
+    elapsed = time.monotonic() - started
+    logger.info(f"[{job_id}] Diarização concluída em {elapsed:.1f}s")
+    return diarize_segments, elapsed
+
+
+def assign_speakers(diarize_future: Future, segments: list, duration: float):
+    """Atribui falantes a segmentos e palavras; mede quanto a diarização atrasou o job"""
+    waited = time.monotonic()
+    diarize_segments, diarization_seconds = diarize_future.result()
+    # Latência adicional: tempo que a diarização ainda levou depois do fim do ASR/alinhamento
+    added_seconds = time.monotonic() - waited
+
+    segments = whisperx.assign_word_speakers(diarize_segments, {"segments": segments})["segments"]
+    speakers = sorted({segment["speaker"] for segment in segments if segment.get("speaker")})
+
+    hours = duration / 3600 if duration else 0
+    metrics = {
+        "diarization_seconds": round(diarization_seconds, 3),
+        "diarization_added_seconds": round(added_seconds, 3),
+        "diarization_added_seconds_per_audio_hour": round(added_seconds / hours, 3) if hours else None
+    }
+    return segments, speakers, metrics
+
+
+def get_lid_model(device: str):
+    """Modelo pequeno de identificação de idioma, carregado uma vez por container"""
+    global _lid_model
+    with _lid_lock:
+        if _lid_model is None:
+            from faster_whisper import WhisperModel
+            _lid_model = WhisperModel(
+                LID_MODEL_NAME, device=device, compute_type="float16" if device == "cuda" else "int8"
+            )
+    return _lid_model
+
+
+def detect_language(lid_model, audio: np.ndarray, job_id: str, cache_report: Optional["CacheReport"] = None) -> Dict[str, Any]:
+    """Detecta o idioma em poucas janelas com fala e agrega as probabilidades"""
+    started = time.monotonic()
+    window = LID_WINDOW_SECONDS * SAMPLE_RATE
+    totals: Dict[str, float] = {}
+
+    windows_key = f"speech_windows:{LID_WINDOWS}:{LID_WINDOW_SECONDS}"
+    starts = cache_report.get(windows_key) if cache_report else None
+    if starts is None:
+        starts = select_speech_windows(audio, LID_WINDOWS, LID_WINDOW_SECONDS)
+        if cache_report:
+            cache_report.put(windows_key, starts, time.monotonic() - started)
+
+    for start in starts:
+        _, _, all_probs = lid_model.detect_language(np.array(audio[start:start + window]))
+        for lang, prob in all_probs:
+            totals[lang] = totals.get(lang, 0.0) + prob
+
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+    language, score = ranked[0]
+    detection = {
+        "language": language,
+        "confidence": round(score / len(starts), 4),
+        "windows": [round(start / SAMPLE_RATE, 1) for start in starts],
+        "candidates": {lang: round(total / len(starts), 4) for lang, total in ranked[:3]},
+        "seconds": round(time.monotonic() - started, 3)
+    }
+    logger.info(f"[{job_id}] Idioma detectado: {detection}")
+    return detection
+
+
+def select_speech_windows(audio: np.ndarray, count: int, window_seconds: int) -> list:
+    """VAD por energia: escolhe as janelas (sem sobreposição) com mais segundos de fala"""
+    seconds = len(audio) // SAMPLE_RATE
+    if seconds <= window_seconds:
+        return [0]
+
+    # Energia por segundo, lendo o memmap em blocos
+    energy_db = np.empty(seconds, dtype=np.float32)
+    block = 600
+    for first in range(0, seconds, block):
+        last = min(seconds, first + block)
+        chunk = np.array(audio[first * SAMPLE_RATE:last * SAMPLE_RATE]).reshape(last - first, SAMPLE_RATE)
+        energy_db[first:last] = 10 * np.log10(np.square(chunk).mean(axis=1) + 1e-10)
+
+    speech = (energy_db > np.percentile(energy_db, 20) + 10).astype(np.int32)
+    speech_per_window = np.convolve(speech, np.ones(window_seconds, dtype=np.int32), mode="valid")
+
+    starts = []
+    for index in np.argsort(speech_per_window)[::-1]:
+        if all(abs(int(index) - other) >= window_seconds for other in starts):
+            starts.append(int(index))
+        if len(starts) == count:
+            break
+    return [start * SAMPLE_RATE for start in sorted(starts)]
+
+
+def alignable_languages() -> set:
+    """Idiomas com modelo de alinhamento padrão no WhisperX"""
+    from whisperx import alignment
+    return set(getattr(alignment, "DEFAULT_ALIGN_MODELS_TORCH", {})) | set(getattr(alignment, "DEFAULT_ALIGN_MODELS_HF", {}))
+
+
+def is_language_supported(language: str) -> bool:
+    return language in (SUPPORTED_LANGUAGES or alignable_languages())
+
+
+def iter_windows(audio: np.ndarray):
+    """Divide o áudio em janelas de WINDOW_SECONDS, cortando no trecho mais silencioso perto do limite"""
+    total = len(audio)
+    window = WINDOW_SECONDS * SAMPLE_RATE
+    start = 0
+    while start < total:
+        end = total if total - start <= window else find_quiet_cut(audio, start + window)
+        yield start, end
+        start = end
+
+
+def find_quiet_cut(audio: np.ndarray, target: int) -> int:
+    """Posição de menor energia nos últimos CUT_SEARCH_SECONDS antes de target (evita cortar no meio de uma fala)"""
+    frame = SAMPLE_RATE // 10
+    search_start = max(0, target - CUT_SEARCH_SECONDS * SAMPLE_RATE)
+    region = np.array(audio[search_start:target])
+    frames = len(region) // frame
+    if frames == 0:
+        return target
+    energy = np.square(region[:frames * frame].reshape(frames, frame)).mean(axis=1)
+    return search_start + int(np.argmin(energy)) * frame + frame // 2
+
+
+def shift_segments(segments: list, offset: float) -> list:
+    """Converte timestamps relativos à janela para o tempo do arquivo original"""
+    if not offset:
+        return segments
+    for segment in segments:
+        for key in ("start", "end"):
+            if segment.get(key) is not None:
+                segment[key] = round(segment[key] + offset, 3)
+        for word in segment.get("words", []) or []:
+            for key in ("start", "end"):
+                if word.get(key) is not None:
+                    word[key] = round(word[key] + offset, 3)
+    return segments
+
+
+def trim_silence(audio: np.ndarray, workdir: str, job_id: str, cache_report: Optional["CacheReport"] = None):
+    """Concatena só os trechos com fala num PCM compactado; devolve (áudio, mapa de offsets, métricas)
+
+    O mapa tem, para cada trecho mantido, o início no áudio compactado e no original (em amostras),
+    usado por remap_segments para voltar os timestamps ao tempo do arquivo original.
+    """
+    started = time.monotonic()
+    total = len(audio)
+    regions_key = f"speech_regions:{VAD_THRESHOLD}:{VAD_MIN_SILENCE_SECONDS}:{VAD_PAD_SECONDS}"
+    regions = cache_report.get(regions_key) if cache_report else None
+    if regions is None:
+        regions = detect_speech_regions(audio)
+        if cache_report:
+            cache_report.put(regions_key, regions, time.monotonic() - started)
+
+    kept = sum(end - start for start, end in regions)
+    metrics = {
+        "original_seconds": round(total / SAMPLE_RATE, 3),
+        "speech_seconds": round(kept / SAMPLE_RATE, 3),
+        "trimmed_seconds": round((total - kept) / SAMPLE_RATE, 3),
+        "trimmed_ratio": round(1 - kept / total, 4) if total else 0.0,
+        "regions": len(regions),
+    }
+
+    if not regions or metrics["trimmed_ratio"] < VAD_MIN_SAVING:
+        # Sem fala detectada (melhor deixar o modelo decidir) ou economia pequena: áudio inteiro
+        metrics.update({"applied": False, "vad_seconds": round(time.monotonic() - started, 3)})
+        return audio, None, metrics
+
+    compact_path = os.path.join(workdir, "speech.f32")
+    offset_map = []
+    position = 0
+    with open(compact_path, "wb") as f:
+        for start, end in regions:
+            offset_map.append((position, start))
+            # Cópia em blocos: só um pedaço do memmap fica residente por vez
+            for first in range(start, end, VAD_BLOCK_SECONDS * SAMPLE_RATE):
+                last = min(end, first + VAD_BLOCK_SECONDS * SAMPLE_RATE)
+                np.asarray(audio[first:last], dtype=np.float32).tofile(f)
+            position += end - start
+
+    metrics.update({"applied": True, "vad_seconds": round(time.monotonic() - started, 3)})
+    return open_pcm(compact_path), offset_map, metrics
+
+
+def detect_speech_regions(audio: np.ndarray) -> list:
+    """Trechos [início, fim) em amostras com fala, já com margem e unindo pausas curtas
+
+    Usa o Silero VAD do faster-whisper (CPU, distingue fala de música de espera) em blocos sobre o
+    memmap; sem ele, cai para o VAD por energia.
+    """
+    try:
+        from faster_whisper.vad import VadOptions, get_speech_timestamps
+    except ImportError:
+        get_speech_timestamps = None
+
+    block = VAD_BLOCK_SECONDS * SAMPLE_RATE
+    raw = []
+    if get_speech_timestamps is not None:
+        # A margem é aplicada abaixo, igual para os dois VADs
+        options = VadOptions(
+            threshold=VAD_THRESHOLD, min_silence_duration_ms=int(VAD_MIN_SILENCE_SECONDS * 1000), speech_pad_ms=0
+        )
+    for first in range(0, len(audio), block):
+        chunk = np.array(audio[first:first + block])
+        if get_speech_timestamps is not None:
+            found = [(item["start"], item["end"]) for item in get_speech_timestamps(chunk, options)]
+        else:
+            found = _energy_speech(chunk)
+        raw.extend((first + start, first + end) for start, end in found)
+
+    pad = int(VAD_PAD_SECONDS * SAMPLE_RATE)
+    min_gap = int(VAD_MIN_SILENCE_SECONDS * SAMPLE_RATE)
+    regions = []
+    for start, end in raw:
+        start, end = max(0, start - pad), min(len(audio), end + pad)
+        if regions and start - regions[-1][1] < min_gap:
+            regions[-1][1] = max(regions[-1][1], end)
+        else:
+            regions.append([start, end])
+    return [(int(start), int(end)) for start, end in regions]
+
+
+def _energy_speech(chunk: np.ndarray) -> list:
+    """VAD por energia em frames de 30ms (limiar relativo ao ruído de fundo do bloco)"""
+    frame = SAMPLE_RATE * 30 // 1000
+    frames = len(chunk) // frame
+    if frames == 0:
+        return []
+    energy_db = 10 * np.log10(np.square(chunk[:frames * frame].reshape(frames, frame)).mean(axis=1) + 1e-10)
+    speech = energy_db > np.percentile(energy_db, 10) + 15
+    regions = []
+    for index in np.flatnonzero(speech):
+        start = int(index) * frame
+        if regions and start <= regions[-1][1]:
+            regions[-1][1] = start + frame
+        else:
+            regions.append([start, start + frame])
+    return [tuple(region) for region in regions]
+
+
+def remap_segments(segments: list, offset_map: list) -> list:
+    """Converte timestamps do áudio compactado para o tempo do arquivo original"""
+    compact_starts = np.array([compact for compact, _ in offset_map], dtype=np.float64) / SAMPLE_RATE
+    original_starts = np.array([original for _, original in offset_map], dtype=np.float64) / SAMPLE_RATE
+
+    def remap(value: Optional[float], is_end: bool) -> Optional[float]:
+        if value is None:
+            return None
+        # Um fim exatamente na emenda pertence ao trecho anterior; um início, ao seguinte
+        index = int(np.searchsorted(compact_starts, value, side="left" if is_end else "right")) - 1
+        index = min(max(index, 0), len(compact_starts) - 1)
+        return round(float(original_starts[index] + value - compact_starts[index]), 3)
+
+    for segment in segments:
+        segment["start"], segment["end"] = remap(segment.get("start"), False), remap(segment.get("end"), True)
+        for word in segment.get("words", []) or []:
+            if "start" in word:
+                word["start"] = remap(word["start"], False)
+            if "end" in word:
+                word["end"] = remap(word["end"], True)
+    return segments
+
+
+def probe_remote(url: str) -> Tuple[Optional[int], bool, str, Optional[str]]:
+    """HEAD para descobrir tamanho, suporte a Range e ETag/Last-Modified (segue redirecionamentos)"""
+    try:
+        response = httpx.head(url, follow_redirects=True, timeout=15)
+        response.raise_for_status()
+        length = response.headers.get("Content-Length")
+        return (
+            int(length) if length and length.isdigit() else None,
+            response.headers.get("Accept-Ranges", "").lower() == "bytes",
+            str(response.url),
+            response.headers.get("ETag") or response.headers.get("Last-Modified")
+        )
+    except Exception:
+        return None, False, url, None
+
+
+def download_direct_url(url: str, job_id: str, workdir: str, size: Optional[int] = None) -> Tuple[str, int]:
+    """Baixa o arquivo para disco; com size conhecido usa várias requisições Range em paralelo"""
+    ext = Path(url.split("?")[0]).suffix or ".tmp"
+    output_path = os.path.join(workdir, f"{job_id}{ext}")
     try:
+        if size:
+            _download_ranges(url, output_path, size)
+            return output_path, size
+
+        downloaded = 0
         with httpx.stream("GET", url, follow_redirects=True, timeout=60) as response:
             response.raise_for_status()
-            ext = Path(url).suffix or ".tmp"
-            output_path = os.path.join(temp_dir, f"{job_id}{ext}")
-            with open(output_path, "wb") as f:
-                for chunk in response.iter_bytes():
+            with open(output_path, "wb", buffering=DOWNLOAD_CHUNK_SIZE) as f:
+                for chunk in response.iter_bytes(DOWNLOAD_CHUNK_SIZE):
                     f.write(chunk)
-            return output_path
+                    downloaded += len(chunk)
+        return output_path, downloaded
     except Exception as e:
         raise Exception(f"Falha ao baixar ficheiro da URL {url}: {str(e)}")
 
 
-def notify_webhook(webhook_url: str, job_id: str, status: str, message: str, result: Optional[Dict[str, Any]] = None):
+def _download_ranges(url: str, output_path: str, size: int):
+    """Download paralelo em partes de RANGE_PART_SIZE, cada uma gravada no seu offset"""
+    with open(output_path, "wb") as f:
+        f.truncate(size)
+
+    ranges = [(start, min(start + RANGE_PART_SIZE, size) - 1) for start in range(0, size, RANGE_PART_SIZE)]
+    limits = httpx.Limits(max_connections=RANGE_CONCURRENCY, max_keepalive_connections=RANGE_CONCURRENCY)
+
+    with httpx.Client(follow_redirects=True, timeout=60, limits=limits) as client:
+        fd = os.open(output_path, os.O_WRONLY)
+        try:
+            def fetch_part(byte_range: Tuple[int, int]):
+                start, end = byte_range
+                with client.stream("GET", url, headers={"Range": f"bytes={start}-{end}"}) as response:
+                    if response.status_code != 206:
+                        raise Exception(f"Servidor ignorou o Range (status {response.status_code})")
+                    offset = start
+                    for chunk in response.iter_bytes(DOWNLOAD_CHUNK_SIZE):
+                        os.pwrite(fd, chunk, offset)
+                        offset += len(chunk)
+                if offset != end + 1:
+                    raise Exception(f"Parte {start}-{end} incompleta")
+
+            with ThreadPoolExecutor(max_workers=RANGE_CONCURRENCY) as pool:
+                list(pool.map(fetch_part, ranges))
+        finally:
+            os.close(fd)
+
+
+def stream_decode_url(url: str, pcm_path: str, hasher=None) -> int:
+    """Envia o download direto para o stdin do ffmpeg, sobrepondo download e decodificação"""
+    process = subprocess.Popen(
+        _ffmpeg_pcm_cmd("pipe:0", pcm_path),
+        stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    state = {"downloaded": 0, "error": None}
+
+    def feed():
+        try:
+            with httpx.stream("GET", url, follow_redirects=True, timeout=60) as response:
+                response.raise_for_status()
+                for chunk in response.iter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    process.stdin.write(chunk)
+                    state["downloaded"] += len(chunk)
+                    if hasher is not None:
+                        hasher.update(chunk)
+        except Exception as e:
+            state["error"] = e
+        finally:
+            try:
+                process.stdin.close()
+            except Exception:
+                pass
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    stderr = process.stderr.read()
+    process.wait()
+    feeder.join()
+
+    if state["error"]:
+        raise Exception(f"Falha ao baixar ficheiro da URL {url}: {state['error']}")
+    if process.returncode != 0:
+        raise Exception(f"ffmpeg falhou: {stderr.decode(errors='ignore').strip()}")
+
+    return state["downloaded"]
+
+
+def notify_webhook(
+        webhook_url: str,
+        job_id: str,
+        status: str,
+        message: str,
+        result: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None
+):
     try:
         payload = {"job_id": job_id, "status": status, "message": message}
+        if status == "failed":
+            payload["error_message"] = message
         if result:
             payload.update(result)
         with httpx.Client(timeout=30) as client:
-            client.post(webhook_url, json=payload)
+            client.post(webhook_url, json=payload, headers=headers)
     except Exception as e:
         logger.error(f"[{job_id}] Erro ao notificar webhook: {e}")
\ No newline at end of file
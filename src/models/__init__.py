@@ -1,4 +1,8 @@
-from .transcription import TranscriptionRequest, TranscriptionResponse, TranscriptionResult, TranscriptionStatus
+from .transcription import (
+    TranscriptionRequest, TranscriptionResponse, TranscriptionResult, TranscriptionStatus,
+    BatchTranscriptionRequest, BatchTranscriptionResponse,
+    DirectUploadRequest, DirectUploadResponse, DirectUploadComplete
+)
 from .job import Job
 
 __all__ = [
@@ -6,5 +10,10 @@ __all__ = [
     "TranscriptionResponse",
     "TranscriptionResult",
     "TranscriptionStatus",
+    "BatchTranscriptionRequest",
+    "BatchTranscriptionResponse",
+    "DirectUploadRequest",
+    "DirectUploadResponse",
+    "DirectUploadComplete",
     "Job"
 ]
\ No newline at end of file
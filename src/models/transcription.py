@@ -9,10 +9,17 @@ class TranscriptionStatus(str, Enum):
     COMPLETED = "completed"
     FAILED = "failed"
 
+class TranscriptionTier(str, Enum):
+    ECONOMY = "economy"
+    STANDARD = "standard"
+    PRIORITY = "priority"
+
 class TranscriptionRequest(BaseModel):
     url: Optional[HttpUrl] = None
     language: Optional[str] = Field(default="auto", description="Código do idioma ou 'auto' para detecção automática")
     webhook_url: Optional[HttpUrl] = None
+    diarize: bool = Field(default=False, description="Identificar falantes nos segmentos e palavras")
+    tier: TranscriptionTier = Field(default=TranscriptionTier.STANDARD, description="economy (menor custo), standard ou priority (menor espera)")
     metadata: Optional[Dict[str, Any]] = {}
 
 class TranscriptionResponse(BaseModel):
@@ -21,6 +28,26 @@ class TranscriptionResponse(BaseModel):
     message: str
     estimated_time: Optional[int] = None
 
+class DirectUploadRequest(BaseModel):
+    filename: str = Field(..., min_length=1, description="Nome original do arquivo (a extensão é preservada)")
+    content_type: Optional[str] = Field(default=None, description="Tipo MIME; se informado, o PUT deve enviar o mesmo Content-Type")
+    size: Optional[int] = Field(default=None, ge=0, description="Tamanho em bytes, para recusar arquivos grandes antes do envio")
+    language: Optional[str] = Field(default="auto", description="Código do idioma ou 'auto' para detecção automática")
+    webhook_url: Optional[HttpUrl] = None
+    diarize: bool = Field(default=False, description="Identificar falantes nos segmentos e palavras")
+    tier: TranscriptionTier = Field(default=TranscriptionTier.STANDARD, description="economy (menor custo), standard ou priority (menor espera)")
+
+class DirectUploadResponse(BaseModel):
+    job_id: str
+    upload_url: str
+    method: str = "PUT"
+    headers: Dict[str, str] = {}
+    upload_token: str
+    expires_in: int
+
+class DirectUploadComplete(BaseModel):
+    upload_token: str
+
 class TranscriptionResult(BaseModel):
     job_id: str
     status: TranscriptionStatus
@@ -31,4 +58,29 @@ class TranscriptionResult(BaseModel):
     created_at: datetime
     completed_at: Optional[datetime] = None
     error_message: Optional[str] = None
-    metadata: Optional[Dict[str, Any]] = {}
\ No newline at end of file
+    metadata: Optional[Dict[str, Any]] = {}
+
+class BatchTranscriptionRequest(BaseModel):
+    urls: List[HttpUrl] = Field(..., min_length=1, description="URLs de áudio/vídeo a transcrever")
+    language: Optional[str] = Field(default="auto", description="Código do idioma ou 'auto' para detecção automática")
+    webhook_url: Optional[HttpUrl] = None
+    diarize: bool = Field(default=False, description="Identificar falantes nos segmentos e palavras")
+    tier: TranscriptionTier = Field(default=TranscriptionTier.STANDARD, description="economy (menor custo), standard ou priority (menor espera)")
+    metadata: Optional[Dict[str, Any]] = {}
+
+class BatchJob(BaseModel):
+    job_id: str
+    url: str
+
+class BatchRejectedUrl(BaseModel):
+    url: str
+    reason: str
+
+class BatchTranscriptionResponse(BaseModel):
+    batch_id: str
+    status: TranscriptionStatus
+    message: str
+    total: int
+    accepted: int
+    jobs: List[BatchJob] = []
+    rejected: List[BatchRejectedUrl] = []
@@ -1,9 +1,15 @@
 from .file_handler import FileHandler
 from .trigger_client import TriggerClient
 from .url_downloader import URLDownloader
+from .media_probe import MediaProbe
+from .eta_estimator import ETAEstimator
+from .job_reconciler import JobReconciler
 
 __all__ = [
     "FileHandler",
     "TriggerClient",
-    "URLDownloader"
+    "URLDownloader",
+    "MediaProbe",
+    "ETAEstimator",
+    "JobReconciler"
 ]
\ No newline at end of file
@@ -0,0 +1,173 @@
+import os
+import time
+import logging
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+from sqlalchemy.orm import Session
+from ..database.models import Job
+from ..models.transcription import TranscriptionStatus
+from ..utils.helpers import estimate_transcription_time, percentile, naive, parse_iso
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "large-v2"
+# Variante do worker dos jobs anteriores ao roteamento (amostras sem "worker" são dela)
+DEFAULT_WORKER = "t4"
+
+
+class ETAEstimator:
+    """Estima o tempo de transcrição a partir da duração real do áudio, do RTF por modelo e da fila"""
+
+    def __init__(self):
+        self.window = int(os.getenv("ETA_RTF_WINDOW", 200))
+        self.min_samples = int(os.getenv("ETA_MIN_SAMPLES", 5))
+        self.stats_ttl = float(os.getenv("ETA_STATS_TTL", 60))
+        self.worker_concurrency = max(1, int(os.getenv("ETA_WORKER_CONCURRENCY", 4)))
+        # Valores iniciais enquanto não há jobs concluídos suficientes
+        self.default_rtf = float(os.getenv("ETA_DEFAULT_RTF", 0.15))
+        self.default_overhead = float(os.getenv("ETA_DEFAULT_OVERHEAD", 60))
+
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._loaded_at = 0.0
+
+    def estimate(
+            self,
+            db: Session,
+            duration_seconds: Optional[float],
+            model: str = DEFAULT_MODEL,
+            file_size_bytes: Optional[int] = None
+    ) -> Optional[int]:
+        """Retorna a estimativa em segundos (fila + overhead + duração * RTF)"""
+        if not duration_seconds:
+            # Sem duração conhecida, recorre à heurística por tamanho
+            return estimate_transcription_time(file_size_bytes) if file_size_bytes else None
+
+        stats = self.get_model_stats(db, model)
+        service_seconds = stats["overhead"] + stats["rtf"] * duration_seconds
+
+        queue_ahead = self.queue_position(db)
+        queue_wait = (queue_ahead / self.worker_concurrency) * stats["mean_service"]
+
+        return int(round(queue_wait + service_seconds))
+
+    def queue_position(self, db: Session) -> int:
+        """Número de jobs aguardando ou em processamento"""
+        return db.query(Job).filter(
+            Job.status.in_([TranscriptionStatus.PENDING, TranscriptionStatus.PROCESSING])
+        ).count()
+
+    def get_model_stats(self, db: Session, model: str = DEFAULT_MODEL) -> Dict[str, float]:
+        """Estatísticas móveis de RTF do modelo, recarregadas do banco a cada ETA_STATS_TTL segundos"""
+        if time.monotonic() - self._loaded_at > self.stats_ttl:
+            self._stats = self._load_stats(db)
+            self._loaded_at = time.monotonic()
+
+        return self._stats.get(model) or {
+            "rtf": self.default_rtf,
+            "overhead": self.default_overhead,
+            "mean_service": self.default_overhead + self.default_rtf * 600,
+            "samples": 0
+        }
+
+    def _load_stats(self, db: Session) -> Dict[str, Dict[str, float]]:
+        """Ajusta service_seconds = overhead + rtf * duração por modelo (mínimos quadrados)"""
+        samples_by_model: Dict[str, List[tuple]] = {}
+        for eta in self._recent_samples(db):
+            duration = eta.get("audio_duration")
+            service = eta.get("service_seconds")
+            if not duration or service is None or duration <= 0 or service < 0:
+                continue
+            model = eta.get("model") or DEFAULT_MODEL
+            samples_by_model.setdefault(model, []).append((float(duration), float(service)))
+
+        stats = {}
+        for model, samples in samples_by_model.items():
+            if len(samples) < self.min_samples:
+                continue
+            stats[model] = self._fit(samples)
+
+        return stats
+
+    def _recent_samples(self, db: Session) -> List[Dict[str, Any]]:
+        """Dados de ETA registrados nos últimos jobs concluídos"""
+        jobs = db.query(Job.job_data).filter(
+            Job.status == TranscriptionStatus.COMPLETED
+        ).order_by(Job.completed_at.desc()).limit(self.window).all()
+
+        return [row.job_data["eta"] for row in jobs if row.job_data and row.job_data.get("eta")]
+
+    def _fit(self, samples: List[tuple]) -> Dict[str, float]:
+        n = len(samples)
+        mean_x = sum(x for x, _ in samples) / n
+        mean_y = sum(y for _, y in samples) / n
+        var_x = sum((x - mean_x) ** 2 for x, _ in samples)
+
+        if var_x > 0:
+            rtf = sum((x - mean_x) * (y - mean_y) for x, y in samples) / var_x
+        else:
+            rtf = mean_y / mean_x
+
+        # Evitar coeficientes absurdos quando a amostra é pequena ou ruidosa
+        rtf = max(rtf, 0.01)
+        overhead = max(mean_y - rtf * mean_x, 0.0)
+
+        return {"rtf": rtf, "overhead": overhead, "mean_service": mean_y, "samples": n}
+
+    def calibration_report(self, db: Session, limit: int = 1000) -> Dict[str, Any]:
+        """Percentis do erro entre a estimativa e o tempo real dos jobs concluídos"""
+        jobs = db.query(Job.job_data).filter(
+            Job.status == TranscriptionStatus.COMPLETED
+        ).order_by(Job.completed_at.desc()).limit(limit).all()
+
+        errors = []
+        for row in jobs:
+            eta = (row.job_data or {}).get("eta") or {}
+            estimated = eta.get("estimated")
+            actual = eta.get("actual_seconds")
+            if estimated is None or not actual:
+                continue
+            errors.append((estimated - actual) / actual * 100)
+
+        abs_errors = sorted(abs(e) for e in errors)
+        signed_errors = sorted(errors)
+
+        return {
+            "samples": len(errors),
+            "abs_error_pct": {
+                "p50": percentile(abs_errors, 50),
+                "p90": percentile(abs_errors, 90),
+                "p95": percentile(abs_errors, 95),
+                "p99": percentile(abs_errors, 99)
+            },
+            "signed_error_pct": {
+                "p10": percentile(signed_errors, 10),
+                "p50": percentile(signed_errors, 50),
+                "p90": percentile(signed_errors, 90)
+            },
+            "models": {
+                model: {k: round(v, 4) for k, v in stats.items()}
+                for model, stats in self._load_stats(db).items()
+            }
+        }
+
+
+def record_eta_sample(job: Job, audio_duration: Optional[float], completed_at: datetime) -> Dict[str, Any]:
+    """Monta o registro de ETA de um job concluído para alimentar as estatísticas de RTF"""
+    job_data = job.job_data or {}
+    created_at = naive(job.created_at)
+    started_at = parse_iso(job_data.get("processing_started_at")) or created_at
+
+    return {
+        "model": stats_key(job_data.get("model", DEFAULT_MODEL), job_data.get("worker")),
+        "estimated": job_data.get("estimated_time"),
+        "audio_duration": audio_duration,
+        "actual_seconds": (completed_at - created_at).total_seconds() if created_at else None,
+        "service_seconds": (completed_at - started_at).total_seconds() if started_at else None
+    }
+
+
+def stats_key(model: str, worker: Optional[str] = None) -> str:
+    """Chave das estatísticas de RTF: o mesmo modelo tem RTF diferente em cada variante do worker"""
+    if not worker or worker == DEFAULT_WORKER:
+        return model
+    return f"{model}@{worker}"
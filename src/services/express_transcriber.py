@@ -0,0 +1,199 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Tuple
+from ..utils.helpers import percentile
+from ..utils.metrics import EXPRESS_REQUESTS, EXPRESS_LATENCY
+
+logger = logging.getLogger(__name__)
+
+
+class ExpressTranscriber:
+    """Transcrição síncrona de clipes curtos num modelo pequeno residente no processo da API
+
+    O modelo (faster-whisper, CPU por padrão) é carregado uma vez na subida e fica em memória, sem cold
+    start do Modal. A capacidade é limitada por EXPRESS_CONCURRENCY; quem não consegue vaga volta para o
+    fluxo assíncrono (Trigger.dev + GPU) em vez de esperar na fila.
+
+    Desativada por padrão: cada worker do gunicorn carrega sua própria cópia do modelo (~1 GB de RAM
+    com small/int8), então a memória da API cresce com WEB_CONCURRENCY.
+    """
+
+    def __init__(self):
+        # Clipes até essa duração (segundos) podem ir pela via expressa; 0 desativa (padrão)
+        self.max_duration = float(os.getenv("EXPRESS_MAX_DURATION", 0))
+        self.model_name = os.getenv("EXPRESS_MODEL", "small")
+        self.device = os.getenv("EXPRESS_DEVICE", "cpu")
+        self.compute_type = os.getenv("EXPRESS_COMPUTE_TYPE", "int8")
+        self.concurrency = max(1, int(os.getenv("EXPRESS_CONCURRENCY", 2)))
+        self.cpu_threads = int(os.getenv("EXPRESS_CPU_THREADS", 0))
+        self.beam_size = int(os.getenv("EXPRESS_BEAM_SIZE", 1))
+        # Espera máxima por uma vaga antes de desistir e usar o fluxo assíncrono
+        self.queue_timeout = float(os.getenv("EXPRESS_QUEUE_TIMEOUT", 0))
+
+        self.model = None
+        self.last_error: Optional[str] = None
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._load_task: Optional[asyncio.Task] = None
+        self._in_flight = 0
+        self._latencies = deque(maxlen=int(os.getenv("EXPRESS_LATENCY_WINDOW", 1000)))
+        self._outcomes: Dict[str, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_duration > 0
+
+    @property
+    def ready(self) -> bool:
+        return self.model is not None
+
+    def start(self):
+        """Carrega o modelo em background para não atrasar a subida da API"""
+        # O mesmo modelo atende o streaming em tempo real (STREAM_MAX_SESSIONS)
+        if not self.enabled and int(os.getenv("STREAM_MAX_SESSIONS", 0)) <= 0:
+            logger.info("Via expressa e streaming desativados; modelo residente não carregado")
+            return
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="express")
+        self._load_task = asyncio.create_task(self._load())
+
+    async def stop(self):
+        if self._load_task and not self._load_task.done():
+            self._load_task.cancel()
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self.model = None
+
+    async def _load(self):
+        started = time.perf_counter()
+        try:
+            self.model = await asyncio.get_running_loop().run_in_executor(self._executor, self._load_model)
+            logger.info(
+                f"Via expressa pronta: modelo {self.model_name} ({self.device}/{self.compute_type}) "
+                f"carregado em {time.perf_counter() - started:.1f}s"
+            )
+        except ImportError:
+            self.last_error = "faster-whisper não instalado"
+            logger.warning("faster-whisper não instalado; via expressa indisponível (tudo vai pelo fluxo assíncrono)")
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Erro ao carregar o modelo da via expressa: {e}", exc_info=True)
+
+    def _load_model(self):
+        from faster_whisper import WhisperModel  # import tardio: dependência opcional da via expressa
+
+        return WhisperModel(
+            self.model_name,
+            device=self.device,
+            compute_type=self.compute_type,
+            cpu_threads=self.cpu_threads,
+            # Uma instância do modelo atende EXPRESS_CONCURRENCY transcrições em paralelo
+            num_workers=self.concurrency
+        )
+
+    def reject_reason(self, duration: Optional[float], diarize: bool = False) -> Optional[str]:
+        """Motivo para não usar a via expressa (None se o clipe é elegível)"""
+        if not self.enabled:
+            return "disabled"
+        if not self.ready:
+            return "unavailable"
+        if diarize:
+            # Diarização precisa do pyannote na GPU
+            return "diarize"
+        if duration is None:
+            return "unknown_duration"
+        if duration > self.max_duration:
+            return "too_long"
+        return None
+
+    async def acquire(self) -> bool:
+        """Reserva uma vaga; False se a via expressa está saturada"""
+        if self.queue_timeout <= 0:
+            if self._semaphore.locked():
+                return False
+            await self._semaphore.acquire()
+        else:
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                return False
+        self._in_flight += 1
+        return True
+
+    def release(self):
+        self._in_flight -= 1
+        self._semaphore.release()
+
+    async def transcribe(self, source: str, language: Optional[str] = None) -> Dict[str, Any]:
+        """Transcreve um arquivo local ou URL (com a vaga já reservada) no formato do webhook do worker"""
+        started = time.perf_counter()
+        segments, info = await self.run(source, language)
+        elapsed = time.perf_counter() - started
+
+        return {
+            "text": " ".join(segment["text"] for segment in segments),
+            "segments": segments,
+            "language": info.language,
+            "duration": info.duration,
+            "language_detection": {"language": info.language, "probability": round(info.language_probability, 4)},
+            "timings": {"total": round(elapsed, 3), "stages": {"transcription": round(elapsed, 3)}}
+        }
+
+    async def run(self, audio, language: Optional[str] = None, initial_prompt: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Any]:
+        """Executa o modelo residente (arquivo, URL ou array float32 a 16kHz) e devolve (segmentos, info)"""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._run, audio, None if language in (None, "auto") else language, initial_prompt
+        )
+
+    def _run(self, audio, language: Optional[str], initial_prompt: Optional[str]) -> Tuple[List[Dict[str, Any]], Any]:
+        segments_iter, info = self.model.transcribe(
+            audio, language=language, beam_size=self.beam_size, word_timestamps=True, vad_filter=True,
+            initial_prompt=initial_prompt
+        )
+        return [_segment_dict(segment) for segment in segments_iter], info
+
+    def record(self, outcome: str, seconds: Optional[float] = None):
+        """Contabiliza o desfecho de uma requisição e a latência das atendidas pela via expressa"""
+        EXPRESS_REQUESTS.labels(outcome).inc()
+        self._outcomes[outcome] = self._outcomes.get(outcome, 0) + 1
+        if seconds is not None:
+            EXPRESS_LATENCY.observe(seconds)
+            self._latencies.append(seconds)
+
+    def report(self) -> Dict[str, Any]:
+        """Estado da via expressa e percentis de latência (últimas requisições deste processo)"""
+        latencies: List[float] = sorted(self._latencies)
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "model": self.model_name,
+            "device": self.device,
+            "max_duration": self.max_duration,
+            "concurrency": self.concurrency,
+            "in_flight": self._in_flight,
+            "last_error": self.last_error,
+            "outcomes": dict(self._outcomes),
+            "latency_seconds": {
+                "count": len(latencies),
+                "p50": percentile(latencies, 50),
+                "p99": percentile(latencies, 99)
+            }
+        }
+
+
+def _segment_dict(segment) -> Dict[str, Any]:
+    # Mesmo formato dos segmentos do whisperx (start/end/text/words com score)
+    return {
+        "start": round(segment.start, 3),
+        "end": round(segment.end, 3),
+        "text": segment.text.strip(),
+        "words": [
+            {"word": word.word.strip(), "start": round(word.start, 3), "end": round(word.end, 3),
+             "score": round(word.probability, 3)}
+            for word in segment.words or []
+        ]
+    }
@@ -1,49 +1,57 @@
 import os
-import aiofiles
 from fastapi import UploadFile
 from pathlib import Path
-import uuid
-from typing import Tuple
+from typing import Optional, Dict, Any
+from .storage import get_storage, PRESIGN_PUT_TTL
+from ..utils.validators import safe_extension
 
 class FileHandler:
     def __init__(self):
-        self.upload_dir = Path(os.getenv("UPLOAD_DIR", "./uploads"))
-        self.upload_dir.mkdir(exist_ok=True)
+        # Disco local ou object store (STORAGE_BACKEND); file_path dos jobs guarda a referência do backend
+        self.storage = get_storage()
         self.max_file_size = int(os.getenv("MAX_FILE_SIZE", 500 * 1024 * 1024))  # 500MB default
 
     async def save_upload(self, file: UploadFile, job_id: str) -> str:
-        """Salva arquivo de upload e retorna o caminho"""
+        """Salva arquivo de upload e retorna a referência no armazenamento"""
 
         # Gerar nome único do arquivo
-        file_extension = Path(file.filename).suffix
-        filename = f"{job_id}{file_extension}"
-        file_path = self.upload_dir / filename
+        filename = f"{job_id}{safe_extension(file.filename)}"
 
-        # Salvar arquivo
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
+        await file.seek(0)
+        return await self.storage.save(filename, file.file, file.content_type)
 
-        return str(file_path)
+    async def link_into_uploads(self, source_path: str, job_id: str) -> str:
+        """Disponibiliza um arquivo local existente (ex.: cache de mídia) no armazenamento de uploads"""
+        return await self.storage.save_path(source_path, f"{job_id}{Path(source_path).suffix}")
+
+    def presign_upload(self, job_id: str, filename: str, content_type: Optional[str] = None,
+                       expires_in: int = PRESIGN_PUT_TTL) -> Dict[str, Any]:
+        """URL para o cliente enviar o arquivo direto ao armazenamento (PUT)"""
+        # O nome vem do cliente: caracteres como "#", "?" ou "/" quebrariam a chave e a URL assinada
+        key = f"{job_id}{safe_extension(filename)}"
+        return {"key": key, **self.storage.presigned_put(key, content_type, expires_in)}
+
+    def ref_for_key(self, key: str) -> str:
+        return self.storage.ref(key)
+
+    def download_url(self, file_path: str) -> str:
+        """URL (assinada no object store) que o worker usa para baixar o arquivo"""
+        return self.storage.presigned_get(file_path)
+
+    def probe_source(self, file_path: str) -> str:
+        """Caminho local ou URL assinada para o ffprobe ler os cabeçalhos"""
+        return file_path if self.storage.name == "local" else self.storage.presigned_get(file_path, 300)
+
+    async def exists(self, file_path: str) -> bool:
+        return await self.storage.stat(file_path) is not None
+
+    async def read_head(self, file_path: str, size: int = 1024) -> bytes:
+        return await self.storage.read_head(file_path, size)
 
     async def delete_file(self, file_path: str) -> bool:
-        """Remove arquivo do sistema"""
-        try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                return True
-            return False
-        except Exception:
-            return False
-
-    def get_file_info(self, file_path: str) -> dict:
+        """Remove arquivo do armazenamento"""
+        return await self.storage.delete(file_path)
+
+    async def get_file_info(self, file_path: str) -> dict:
         """Obtém informações do arquivo"""
-        if not os.path.exists(file_path):
-            return {}
-
-        stat = os.stat(file_path)
-        return {
-            "size": stat.st_size,
-            "created": stat.st_ctime,
-            "modified": stat.st_mtime
-        }
\ No newline at end of file
+        return await self.storage.stat(file_path) or {}
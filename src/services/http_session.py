@@ -0,0 +1,115 @@
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Optional, Dict, Any, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Sessão HTTP compartilhada pelo processo (reaproveita conexões TCP/TLS e cache de DNS)
+_session: Optional["aiohttp.ClientSession"] = None
+_session_lock = asyncio.Lock()
+
+DOWNLOAD_CHUNK_SIZE = int(os.getenv("DOWNLOAD_CHUNK_SIZE", 1024 * 1024))
+
+
+class ProbeCache:
+    """Cache LRU com TTL para resultados de HEAD (status, content-type, tamanho, ETag)"""
+
+    def __init__(self, ttl: float = 300, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(url)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[url]
+            return None
+        self._entries.move_to_end(url)
+        return value
+
+    def set(self, url: str, value: Dict[str, Any], ttl: Optional[float] = None):
+        self._entries[url] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(url)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+probe_cache = ProbeCache(
+    ttl=float(os.getenv("URL_PROBE_TTL", 300)),
+    max_entries=int(os.getenv("URL_PROBE_CACHE_SIZE", 1024))
+)
+
+
+async def get_http_session() -> "aiohttp.ClientSession":
+    """Retorna a sessão compartilhada, criando-a no primeiro uso"""
+    # Import tardio: o aiohttp só é carregado no primeiro download/HEAD do processo
+    import aiohttp
+
+    global _session
+    if _session is None or _session.closed:
+        async with _session_lock:
+            if _session is None or _session.closed:
+                connector = aiohttp.TCPConnector(
+                    limit=int(os.getenv("HTTP_MAX_CONNECTIONS", 100)),
+                    limit_per_host=int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", 10)),
+                    ttl_dns_cache=int(os.getenv("HTTP_DNS_CACHE_TTL", 300)),
+                    use_dns_cache=True,
+                    keepalive_timeout=30
+                )
+                _session = aiohttp.ClientSession(
+                    connector=connector,
+                    timeout=aiohttp.ClientTimeout(total=None, connect=10, sock_read=60),
+                    read_bufsize=DOWNLOAD_CHUNK_SIZE,
+                    headers={"User-Agent": "Echo-Transcription/1.0"}
+                )
+    return _session
+
+
+async def close_http_session():
+    """Fecha a sessão compartilhada (shutdown da aplicação)"""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+async def probe_url(url: str) -> Optional[Dict[str, Any]]:
+    """Faz HEAD na URL (com cache) e retorna status, content-type, tamanho, ETag e Last-Modified"""
+    cached = probe_cache.get(url)
+    if cached is not None:
+        return cached
+
+    try:
+        import aiohttp
+
+        session = await get_http_session()
+        async with session.head(url, allow_redirects=True, timeout=aiohttp.ClientTimeout(total=10)) as response:
+            content_length = response.headers.get("Content-Length")
+            result = {
+                "status": response.status,
+                "final_url": str(response.url),
+                "content_type": response.headers.get("Content-Type", "").split(";")[0].strip().lower(),
+                "content_length": int(content_length) if content_length and content_length.isdigit() else None,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "accept_ranges": response.headers.get("Accept-Ranges", "").lower() == "bytes"
+            }
+    except Exception as e:
+        logger.debug(f"Falha no HEAD de {url}: {e}")
+        return None
+
+    # Respostas de erro ficam menos tempo em cache
+    probe_cache.set(url, result, ttl=None if result["status"] == 200 else 30)
+    return result
@@ -0,0 +1,155 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from typing import Optional, Dict, Any, Tuple, Callable, Awaitable
+import orjson
+
+logger = logging.getLogger(__name__)
+
+STATE_IN_FLIGHT = "in_flight"
+STATE_DONE = "done"
+
+# Limite do fallback em memória antes de descartar registros expirados
+MEMORY_MAX_KEYS = 10000
+
+
+class IdempotencyConflictError(Exception):
+    """Mesma Idempotency-Key reutilizada com outro conteúdo de requisição"""
+
+
+class IdempotencyInProgressError(Exception):
+    """A requisição original ainda não terminou dentro do tempo de espera"""
+
+
+class IdempotencyStore:
+    """Executa a criação de um job uma única vez por Idempotency-Key e guarda a resposta para replays
+
+    O registro fica no Redis (SET NX com TTL, compartilhado entre réplicas). Sem Redis, ou se ele falhar,
+    cai para um dicionário em memória, que só protege contra retries que cheguem ao mesmo processo.
+    """
+
+    def __init__(self, redis_client=None):
+        self.redis = redis_client
+        self.ttl = int(os.getenv("IDEMPOTENCY_TTL", 86400))
+        # Marca de "em andamento": expira se o processo morrer no meio da requisição
+        self.lock_ttl = int(os.getenv("IDEMPOTENCY_LOCK_TTL", 300))
+        self.wait_timeout = float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", 30))
+        self.poll_interval = float(os.getenv("IDEMPOTENCY_POLL_INTERVAL", 0.1))
+
+        self._memory: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._changed: Dict[str, asyncio.Event] = {}
+
+    async def run(
+            self,
+            scope: str,
+            key: str,
+            fingerprint: Any,
+            handler: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Tuple[Dict[str, Any], str]:
+        """Resposta e desfecho: 'new' (executou), 'replayed' (já concluída) ou 'waited' (aguardou a original)"""
+        record_key = f"idempotency:{scope}:{key}"
+        digest = hashlib.sha256(orjson.dumps(fingerprint, default=str)).hexdigest()
+        deadline = time.monotonic() + self.wait_timeout
+        waited = False
+
+        while True:
+            record = await self._claim(record_key, digest)
+            if record is None:
+                break
+
+            if record.get("fingerprint") != digest:
+                raise IdempotencyConflictError("Idempotency-Key já usada com parâmetros diferentes")
+            if record.get("state") == STATE_DONE:
+                return record["response"], "waited" if waited else "replayed"
+            if time.monotonic() >= deadline:
+                raise IdempotencyInProgressError("Requisição com a mesma Idempotency-Key ainda em andamento")
+
+            waited = True
+            await self._wait_for_change(record_key, deadline)
+
+        try:
+            response = await handler()
+        except Exception:
+            # Falhou: libera a chave para que o próximo retry (ou quem está esperando) execute de novo
+            await self._delete(record_key)
+            raise
+
+        await self._store(record_key, {"state": STATE_DONE, "fingerprint": digest, "response": response}, self.ttl)
+        return response, "new"
+
+    async def _claim(self, record_key: str, digest: str) -> Optional[Dict[str, Any]]:
+        """Reserva a chave (None) ou devolve o registro existente"""
+        marker = {"state": STATE_IN_FLIGHT, "fingerprint": digest}
+
+        if self.redis is not None:
+            try:
+                if await self.redis.set(record_key, orjson.dumps(marker).decode(), nx=True, ex=self.lock_ttl):
+                    return None
+                raw = await self.redis.get(record_key)
+                # Expirou/foi liberada entre o SET e o GET: tentar reservar de novo no próximo ciclo
+                return orjson.loads(raw) if raw else marker
+            except Exception as e:
+                logger.warning(f"Redis indisponível para idempotência, usando memória local: {e}")
+
+        existing = self._memory_get(record_key)
+        if existing is not None:
+            return existing
+        if len(self._memory) >= MEMORY_MAX_KEYS:
+            self._prune()
+        self._memory[record_key] = (time.monotonic() + self.lock_ttl, marker)
+        return None
+
+    async def _store(self, record_key: str, record: Dict[str, Any], ttl: int):
+        if self.redis is not None:
+            try:
+                await self.redis.set(record_key, orjson.dumps(record).decode(), ex=ttl)
+                self._memory.pop(record_key, None)
+                self._notify(record_key)
+                return
+            except Exception as e:
+                logger.warning(f"Erro ao gravar resposta idempotente no Redis: {e}")
+        self._memory[record_key] = (time.monotonic() + ttl, record)
+        self._notify(record_key)
+
+    async def _delete(self, record_key: str):
+        if self.redis is not None:
+            try:
+                await self.redis.delete(record_key)
+            except Exception as e:
+                logger.warning(f"Erro ao liberar Idempotency-Key no Redis: {e}")
+        self._memory.pop(record_key, None)
+        self._notify(record_key)
+
+    async def _wait_for_change(self, record_key: str, deadline: float):
+        timeout = max(0.0, deadline - time.monotonic())
+        if record_key in self._memory:
+            # Requisição original neste processo: acordar assim que ela terminar
+            event = self._changed.setdefault(record_key, asyncio.Event())
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            return
+        await asyncio.sleep(min(self.poll_interval, timeout))
+
+    def _notify(self, record_key: str):
+        event = self._changed.pop(record_key, None)
+        if event:
+            event.set()
+
+    def _prune(self):
+        now = time.monotonic()
+        for record_key in [k for k, (expires_at, _) in self._memory.items() if expires_at < now]:
+            del self._memory[record_key]
+
+    def _memory_get(self, record_key: str) -> Optional[Dict[str, Any]]:
+        entry = self._memory.get(record_key)
+        if entry is None:
+            return None
+        expires_at, record = entry
+        if expires_at < time.monotonic():
+            del self._memory[record_key]
+            return None
+        return record
@@ -0,0 +1,330 @@
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Callable
+from sqlalchemy import or_, and_
+from sqlalchemy.orm import Session
+from ..database.connection import SessionLocal
+from ..database.models import Job
+from ..models.transcription import TranscriptionStatus
+from .trigger_client import TriggerClient, TriggerUnavailableError
+from .result_cache import invalidate
+from ..utils.helpers import with_timestamp, ProcessLock
+from ..utils.tracing import job_span
+
+logger = logging.getLogger(__name__)
+
+# Status de runs do Trigger.dev
+TRIGGER_ACTIVE_STATUSES = {
+    "PENDING_VERSION", "DELAYED", "QUEUED", "EXECUTING", "REATTEMPTING", "FROZEN", "WAITING_FOR_DEPLOY"
+}
+TRIGGER_FAILED_STATUSES = {
+    "FAILED", "CRASHED", "CANCELED", "INTERRUPTED", "SYSTEM_FAILURE", "EXPIRED", "TIMED_OUT"
+}
+
+POLICY_REDISPATCH = "redispatch"
+POLICY_FAIL = "fail"
+
+
+class JobReconciler:
+    """Encontra jobs parados (webhook perdido) e os repara consultando o Trigger.dev"""
+
+    def __init__(
+            self,
+            trigger_client: TriggerClient,
+            session_factory: Callable[[], Session] = SessionLocal,
+            redis_client=None
+    ):
+        self.trigger_client = trigger_client
+        self.session_factory = session_factory
+        # Resultados em cache de jobs alterados pela varredura são removidos
+        self.redis_client = redis_client
+
+        self.interval = float(os.getenv("RECONCILER_INTERVAL", 300))
+        self.pending_stale_after = timedelta(seconds=int(os.getenv("RECONCILER_PENDING_STALE_AFTER", 900)))
+        # O worker GPU tem timeout=1800 e retries=3; só consideramos órfão depois disso
+        self.processing_stale_after = timedelta(seconds=int(os.getenv("RECONCILER_PROCESSING_STALE_AFTER", 7200)))
+        self.batch_size = int(os.getenv("RECONCILER_BATCH_SIZE", 200))
+        self.max_concurrency = int(os.getenv("RECONCILER_CONCURRENCY", 10))
+        self.policy = os.getenv("RECONCILER_ORPHAN_POLICY", POLICY_REDISPATCH)
+        self.max_redispatch = int(os.getenv("RECONCILER_MAX_REDISPATCH", 2))
+        # Outbox: jobs aceitos com o Trigger.dev fora do ar (sem trigger_job_id)
+        self.outbox_interval = float(os.getenv("RECONCILER_OUTBOX_INTERVAL", 30))
+        self.outbox_delay = timedelta(seconds=int(os.getenv("RECONCILER_OUTBOX_DELAY", 60)))
+
+        # Com vários workers (gunicorn) só o processo que segura o lock executa as varreduras
+        self.lock_file = os.getenv("RECONCILER_LOCK_FILE")
+        self._lock = ProcessLock(self.lock_file)
+
+        self.last_report: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Inicia o loop periódico em background"""
+        if self.interval <= 0:
+            logger.info("Reconciliador desativado (RECONCILER_INTERVAL=0)")
+            return
+        self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self):
+        """Interrompe o loop periódico"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._lock.release()
+
+    def _is_leader(self) -> bool:
+        """Só o processo que segura RECONCILER_LOCK_FILE executa as varreduras"""
+        if self._lock.held:
+            return True
+        if not self._lock.acquire():
+            return False
+        if self.lock_file:
+            logger.info(f"Reconciliador: processo {os.getpid()} é o líder")
+        return True
+
+    async def _run_forever(self):
+        tick = min(self.interval, self.outbox_interval) if self.outbox_interval > 0 else self.interval
+        last_sweep = time.monotonic()
+        while True:
+            await asyncio.sleep(tick)
+            if not self._is_leader():
+                continue
+            try:
+                if self.outbox_interval > 0:
+                    await self.flush_outbox()
+                if time.monotonic() - last_sweep >= self.interval:
+                    last_sweep = time.monotonic()
+                    await self.sweep()
+            except Exception as e:
+                logger.error(f"Erro na varredura do reconciliador: {e}", exc_info=True)
+
+    async def flush_outbox(self) -> int:
+        """Despacha jobs que ficaram sem trigger_job_id porque o Trigger.dev estava indisponível"""
+        if self.trigger_client.circuit_breaker.state == "open":
+            return 0
+
+        db = self.session_factory()
+        dispatched = 0
+        try:
+            jobs = db.query(Job).filter(
+                Job.status == TranscriptionStatus.PENDING,
+                Job.trigger_job_id.is_(None),
+                # Só jobs adiados por indisponibilidade; órfãos sem a marca ficam para a varredura
+                Job.job_data["dispatch_deferred"].as_boolean().is_(True),
+                Job.updated_at < datetime.utcnow() - self.outbox_delay
+            ).order_by(Job.updated_at, Job.id).limit(self.batch_size).all()
+
+            for job in jobs:
+                if (job.job_data or {}).get("fetch") == "pending":
+                    # Áudio ainda sendo extraído da URL pela API
+                    continue
+                try:
+                    # Mesma idempotencyKey do despacho original: se ele chegou ao Trigger, o run é reaproveitado
+                    job.trigger_job_id = await self._dispatch(job, idempotency_key=job.id)
+                except TriggerUnavailableError:
+                    break
+                except Exception as e:
+                    logger.warning(f"[{job.id}] Falha ao despachar job do outbox: {e}")
+                    continue
+                job.updated_at = datetime.utcnow()
+                job_data = {key: value for key, value in job.job_data.items() if key != "dispatch_deferred"}
+                job.job_data = with_timestamp(job_data, "dispatched", job.updated_at)
+                dispatched += 1
+
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        if dispatched:
+            logger.info(f"Reconciliador: {dispatched} jobs do outbox despachados")
+        return dispatched
+
+    async def _dispatch(self, job: Job, idempotency_key: str) -> str:
+        with job_span("reconciler.dispatch", job.id, idempotency_key=idempotency_key):
+            return await self.trigger_client.create_transcription_job(
+                job_id=job.id,
+                file_path=job.file_path,
+                file_url=job.file_url,
+                language=job.language,
+                webhook_url=job.webhook_url,
+                idempotency_key=idempotency_key,
+                diarize=(job.job_data or {}).get("diarize", False),
+                content_hash=(job.job_data or {}).get("content_hash"),
+                worker=(job.job_data or {}).get("worker"),
+                model=(job.job_data or {}).get("model")
+            )
+
+    async def sweep(self) -> Dict[str, Any]:
+        """Executa uma varredura completa e retorna o relatório"""
+        started = time.monotonic()
+        report = {
+            "checked": 0,
+            "repaired": 0,
+            "redispatched": 0,
+            "failed": 0,
+            "still_running": 0,
+            "errors": 0
+        }
+
+        db = self.session_factory()
+        try:
+            cursor: Optional[tuple] = None
+            while True:
+                jobs = self._find_stale_jobs(db, after=cursor)
+                if not jobs:
+                    break
+
+                # Guardar o cursor antes de alterar updated_at dos jobs reparados
+                cursor = (jobs[-1].updated_at, jobs[-1].id)
+
+                repaired = await self._reconcile_batch(db, jobs, report)
+                db.commit()
+                for job_id in repaired:
+                    await invalidate(self.redis_client, job_id)
+
+                if len(jobs) < self.batch_size:
+                    break
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        report["duration"] = round(time.monotonic() - started, 3)
+        report["finished_at"] = datetime.utcnow().isoformat()
+        self.last_report = report
+
+        logger.info(
+            f"Reconciliador: {report['repaired']} jobs reparados de {report['checked']} verificados "
+            f"(redespachados={report['redispatched']}, falhados={report['failed']}, "
+            f"em execução={report['still_running']}, erros={report['errors']})"
+        )
+        return report
+
+    def _find_stale_jobs(self, db: Session, after: Optional[tuple] = None) -> List[Job]:
+        """Busca um lote de jobs PENDING/PROCESSING sem atualização recente (usa ix_jobs_status_updated_at)"""
+        now = datetime.utcnow()
+        query = db.query(Job).filter(or_(
+            and_(Job.status == TranscriptionStatus.PENDING, Job.updated_at < now - self.pending_stale_after),
+            and_(Job.status == TranscriptionStatus.PROCESSING, Job.updated_at < now - self.processing_stale_after)
+        ))
+        if after is not None:
+            # Paginação por cursor (updated_at, id) para não repetir jobs ainda em execução
+            after_updated_at, after_id = after
+            query = query.filter(or_(
+                Job.updated_at > after_updated_at,
+                and_(Job.updated_at == after_updated_at, Job.id > after_id)
+            ))
+
+        return query.order_by(Job.updated_at, Job.id).limit(self.batch_size).all()
+
+    async def _reconcile_batch(self, db: Session, jobs: List[Job], report: Dict[str, Any]) -> List[str]:
+        """Consulta o Trigger.dev em paralelo (limitado), aplica as correções no lote e retorna os jobs alterados"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def fetch(job: Job) -> Optional[Dict[str, Any]]:
+            if not job.trigger_job_id:
+                return None
+            async with semaphore:
+                return await self.trigger_client.get_job_status(job.trigger_job_id)
+
+        results = await asyncio.gather(*(fetch(job) for job in jobs), return_exceptions=True)
+        repaired = []
+
+        for job, run in zip(jobs, results):
+            report["checked"] += 1
+
+            if isinstance(run, Exception):
+                logger.warning(f"[{job.id}] Não foi possível consultar run {job.trigger_job_id}: {run}")
+                report["errors"] += 1
+                continue
+
+            action = self._decide(job, run)
+            if action == "running":
+                report["still_running"] += 1
+                continue
+
+            if action == "failed_in_trigger":
+                output = (run or {}).get("output") or {}
+                self._mark_failed(job, output.get("error") or "Falha ao iniciar transcrição no Trigger.dev")
+                outcome = "failed"
+            else:
+                outcome = await self._handle_orphan(job)
+
+            report[outcome] += 1
+            if outcome != "errors":
+                report["repaired"] += 1
+                repaired.append(job.id)
+
+        return repaired
+
+    def _decide(self, job: Job, run: Optional[Dict[str, Any]]) -> str:
+        """Classifica o job a partir do run do Trigger.dev"""
+        if not run:
+            # Nunca despachado (ou run inexistente)
+            return "orphan"
+
+        status = str(run.get("status", "")).upper()
+        if status in TRIGGER_ACTIVE_STATUSES:
+            return "running"
+
+        if status == "COMPLETED":
+            output = run.get("output") or {}
+            if output.get("success") is False:
+                return "failed_in_trigger"
+            # O Modal aceitou o job, mas o webhook final nunca chegou
+            return "orphan"
+
+        if status in TRIGGER_FAILED_STATUSES:
+            return "orphan"
+
+        return "running"
+
+    async def _handle_orphan(self, job: Job) -> str:
+        """Aplica a política configurada a um job órfão"""
+        job_data = job.job_data or {}
+        redispatch_count = job_data.get("redispatch_count", 0)
+
+        if job_data.get("fetch") == "pending":
+            # A extração do áudio na API foi interrompida (ex.: reinício do processo)
+            self._mark_failed(job, "Extração do áudio da URL interrompida")
+            return "failed"
+
+        if self.policy == POLICY_REDISPATCH and redispatch_count < self.max_redispatch:
+            # Nova idempotencyKey para não reaproveitar o run antigo no Trigger.dev
+            idempotency_key = f"{job.id}:r{redispatch_count + 1}" if job.trigger_job_id else job.id
+            try:
+                trigger_job_id = await self._dispatch(job, idempotency_key)
+            except TriggerUnavailableError as e:
+                # Indisponibilidade não é culpa do job: tenta de novo na próxima varredura
+                logger.warning(f"[{job.id}] Trigger.dev indisponível ao redespachar: {e}")
+                return "errors"
+            except Exception as e:
+                logger.warning(f"[{job.id}] Falha ao redespachar job órfão: {e}")
+            else:
+                job.trigger_job_id = trigger_job_id
+                job.status = TranscriptionStatus.PENDING
+                job.updated_at = datetime.utcnow()
+                job.job_data = {**job_data, "redispatch_count": redispatch_count + 1}
+                logger.info(f"[{job.id}] Job órfão redespachado (run {trigger_job_id})")
+                return "redispatched"
+
+        self._mark_failed(job, "Job sem resposta do worker (reconciliado automaticamente)")
+        return "failed"
+
+    def _mark_failed(self, job: Job, error_message: str):
+        job.status = TranscriptionStatus.FAILED
+        job.error_message = error_message
+        job.completed_at = datetime.utcnow()
+        job.updated_at = datetime.utcnow()
+        logger.info(f"[{job.id}] Job marcado como falho pelo reconciliador: {error_message}")
@@ -0,0 +1,114 @@
+import os
+import json
+import asyncio
+import logging
+from typing import Optional, Dict, Any
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Protocolos que o ffprobe pode abrir: URLs só por HTTP(S); arquivos locais só como arquivo, para que
+# playlists (HLS, concat) não façam o ffprobe buscar file://, ftp:// etc. a partir de um endereço do usuário
+URL_PROTOCOLS = "http,https,tcp,tls"
+FILE_PROTOCOLS = "file"
+
+
+class MediaProbe:
+    """Lê metadados de mídia (duração, codec, bitrate) a partir dos cabeçalhos do container"""
+
+    def __init__(self):
+        self.ffprobe_bin = os.getenv("FFPROBE_BIN", "ffprobe")
+        self.timeout = float(os.getenv("MEDIA_PROBE_TIMEOUT", 15))
+
+    async def probe(self, source: str) -> Optional[Dict[str, Any]]:
+        """Executa ffprobe num caminho local ou URL e retorna os metadados principais"""
+        protocols = _allowed_protocols(source)
+        if protocols is None:
+            logger.warning(f"Esquema não permitido para o ffprobe: {urlsplit(source).scheme}")
+            return None
+
+        # ffprobe lê apenas os cabeçalhos/índices do container, sem decodificar o áudio
+        cmd = [
+            self.ffprobe_bin,
+            "-v", "error",
+            "-protocol_whitelist", protocols,
+            "-show_entries", "format=duration,bit_rate,format_name:stream=codec_type,codec_name,sample_rate,channels",
+            "-of", "json",
+            source
+        ]
+
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+        except FileNotFoundError:
+            logger.warning("ffprobe não encontrado; duração da mídia indisponível")
+            return None
+
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            logger.warning(f"Timeout ao inspecionar mídia: {source}")
+            return None
+
+        if process.returncode != 0:
+            logger.warning(f"ffprobe falhou para {source}: {stderr.decode(errors='ignore').strip()}")
+            return None
+
+        return self._parse(stdout)
+
+    def _parse(self, output: bytes) -> Optional[Dict[str, Any]]:
+        """Extrai duração, codec e bitrate da saída JSON do ffprobe"""
+        try:
+            data = json.loads(output or b"{}")
+        except ValueError:
+            return None
+
+        fmt = data.get("format", {})
+        audio_stream = next(
+            (s for s in data.get("streams", []) if s.get("codec_type") == "audio"),
+            None
+        )
+
+        duration = _to_float(fmt.get("duration"))
+        if duration is None or duration <= 0:
+            return None
+
+        return {
+            "duration": duration,
+            "format": fmt.get("format_name"),
+            "bit_rate": _to_int(fmt.get("bit_rate")),
+            "codec": audio_stream.get("codec_name") if audio_stream else None,
+            "sample_rate": _to_int(audio_stream.get("sample_rate")) if audio_stream else None,
+            "channels": audio_stream.get("channels") if audio_stream else None,
+            "has_audio": audio_stream is not None
+        }
+
+
+def _allowed_protocols(source: str) -> Optional[str]:
+    """Whitelist de protocolos do ffprobe para a origem; None para esquemas que não são http(s)"""
+    scheme = urlsplit(source).scheme.lower()
+    if scheme in ("http", "https"):
+        return URL_PROTOCOLS
+    if not scheme and not source.startswith("-"):
+        # Caminho local (uploads/ ou áudio extraído)
+        return FILE_PROTOCOLS
+    return None
+
+
+def _to_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,67 @@
+import logging
+from typing import Optional, Dict, Any
+import orjson
+from ..database.models import Job
+from ..utils.metrics import CACHE_LOOKUPS
+from ..utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Resultados ficam 24 horas no Redis
+CACHE_TTL = 86400
+
+
+def job_result(job: Job) -> Dict[str, Any]:
+    """Resultado do job no formato de TranscriptionResult, sem passar pela validação do Pydantic"""
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "text": job.result_text,
+        "segments": job.segments,
+        "language": job.result_language,
+        "duration": float(job.duration) if job.duration else None,
+        "created_at": job.created_at,
+        "completed_at": job.completed_at,
+        "error_message": job.error_message,
+        "metadata": job.job_data or {}
+    }
+
+
+def encode(data: Any) -> bytes:
+    """Serializa com orjson (datetime, enum e numpy nativos; o resto vira str)"""
+    return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+async def get_cached(redis_client, job_id: str) -> Optional[str]:
+    """JSON do resultado em cache, pronto para ser devolvido sem reprocessar"""
+    try:
+        with span("redis.get", key=f"job:{job_id}"):
+            cached = await redis_client.get(f"job:{job_id}")
+    except Exception as e:
+        CACHE_LOOKUPS.labels("error").inc()
+        logger.warning(f"Erro ao buscar no Redis: {e}")
+        return None
+
+    CACHE_LOOKUPS.labels("hit" if cached else "miss").inc()
+    return cached
+
+
+async def set_cached(redis_client, job_id: str, body: bytes):
+    """Guarda o JSON já serializado do resultado"""
+    try:
+        with span("redis.setex", key=f"job:{job_id}"):
+            await redis_client.setex(f"job:{job_id}", CACHE_TTL, body)
+    except Exception as e:
+        # Não é crítico, então não propagar o erro
+        logger.warning(f"[{job_id}] Erro ao salvar no Redis: {e}")
+
+
+async def invalidate(redis_client, job_id: str):
+    """Remove o resultado em cache (status do job mudou fora do webhook)"""
+    if not redis_client:
+        return
+    try:
+        with span("redis.delete", key=f"job:{job_id}"):
+            await redis_client.delete(f"job:{job_id}")
+    except Exception as e:
+        logger.warning(f"[{job_id}] Erro ao invalidar cache no Redis: {e}")
@@ -0,0 +1,66 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List
+from sqlalchemy.orm import Session
+from ..database.models import Job
+from ..models.transcription import TranscriptionStatus
+from ..utils.helpers import percentile, naive, parse_iso
+
+logger = logging.getLogger(__name__)
+
+
+def stage_report(db: Session, hours: float = 24, limit: int = 5000) -> Dict[str, Any]:
+    """Percentis (p50/p95/p99) de cada etapa dos jobs finalizados na janela de tempo"""
+    since = datetime.utcnow() - timedelta(hours=hours)
+    rows = db.query(Job.job_data, Job.created_at, Job.completed_at).filter(
+        Job.status.in_([TranscriptionStatus.COMPLETED, TranscriptionStatus.FAILED]),
+        Job.completed_at >= since
+    ).order_by(Job.completed_at.desc()).limit(limit).all()
+
+    samples: Dict[str, List[float]] = {}
+    for row in rows:
+        for stage, seconds in job_stages(row.job_data or {}, row.created_at, row.completed_at).items():
+            if seconds is not None and seconds >= 0:
+                samples.setdefault(stage, []).append(seconds)
+
+    stages = {}
+    for stage, values in sorted(samples.items()):
+        values.sort()
+        stages[stage] = {
+            "count": len(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99)
+        }
+
+    return {"window_hours": hours, "jobs": len(rows), "stages": stages}
+
+
+def job_stages(job_data: Dict[str, Any], created_at: Optional[datetime], completed_at: Optional[datetime]) -> Dict[str, Optional[float]]:
+    """Durações de um job: espera na API/Trigger, etapas do worker e tempo total"""
+    timestamps = job_data.get("timestamps") or {}
+    queued = parse_iso(timestamps.get("queued")) or naive(created_at)
+    dispatched = parse_iso(timestamps.get("dispatched"))
+    first_webhook = parse_iso(timestamps.get("first_webhook"))
+
+    stages = {
+        "api.queue_to_dispatch": _seconds(queued, dispatched),
+        "trigger.dispatch_to_first_webhook": _seconds(dispatched, first_webhook),
+        "end_to_end": _seconds(queued, naive(completed_at))
+    }
+
+    timings = job_data.get("timings") or {}
+    if timings.get("total") is not None:
+        stages["worker.total"] = timings["total"]
+    for name, seconds in (timings.get("stages") or {}).items():
+        stages[f"worker.{name}"] = seconds
+    for name, seconds in (timings.get("background") or {}).items():
+        stages[f"worker.background.{name}"] = seconds
+
+    return stages
+
+
+def _seconds(start: Optional[datetime], end: Optional[datetime]) -> Optional[float]:
+    if start is None or end is None:
+        return None
+    return (end - start).total_seconds()
@@ -0,0 +1,276 @@
+import os
+import time
+import hmac
+import base64
+import shutil
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+from typing import Optional, Dict, Any, BinaryIO
+from urllib.parse import urlencode
+import aiofiles
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# Validade das URLs assinadas: leitura pelo worker (o job pode esperar na fila) e envio pelo cliente
+PRESIGN_GET_TTL = int(os.getenv("STORAGE_PRESIGN_GET_TTL", 6 * 3600))
+PRESIGN_PUT_TTL = int(os.getenv("STORAGE_PRESIGN_PUT_TTL", 900))
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+_storage: Optional["StorageBackend"] = None
+
+
+def _signing_key() -> bytes:
+    # Todas as réplicas precisam da mesma chave; sem STORAGE_SIGNING_KEY deriva do segredo do Trigger
+    key = os.getenv("STORAGE_SIGNING_KEY")
+    if key:
+        return key.encode()
+    return hmac.new(os.getenv("TRIGGER_SECRET_KEY", "").encode(), b"echo-storage", hashlib.sha256).digest()
+
+
+def sign(message: str) -> str:
+    """Assinatura HMAC-SHA256 (base64url) usada nas URLs e tokens de upload"""
+    digest = hmac.new(_signing_key(), message.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def verify(message: str, signature: str) -> bool:
+    return hmac.compare_digest(sign(message), signature or "")
+
+
+def make_token(data: Dict[str, Any], ttl: int) -> str:
+    """Token assinado e com validade (dados do upload direto entre o presign e a confirmação)"""
+    body = base64.urlsafe_b64encode(orjson.dumps({**data, "exp": int(time.time()) + ttl})).rstrip(b"=").decode()
+    return f"{body}.{sign(body)}"
+
+
+def read_token(token: str) -> Optional[Dict[str, Any]]:
+    """Dados do token, ou None se a assinatura for inválida ou o token tiver expirado"""
+    body, _, signature = (token or "").partition(".")
+    if not verify(body, signature):
+        return None
+    data = orjson.loads(base64.urlsafe_b64decode(body + "=" * (-len(body) % 4)))
+    if data.get("exp", 0) < time.time():
+        return None
+    return data
+
+
+class StorageBackend:
+    """Onde ficam os arquivos enviados. Referências são strings opacas guardadas em Job.file_path"""
+
+    name = "base"
+
+    def ref(self, key: str) -> str:
+        raise NotImplementedError
+
+    def key(self, ref: str) -> str:
+        raise NotImplementedError
+
+    async def save(self, key: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> str:
+        raise NotImplementedError
+
+    async def save_path(self, source_path: str, key: str) -> str:
+        raise NotImplementedError
+
+    async def delete(self, ref: str) -> bool:
+        raise NotImplementedError
+
+    async def stat(self, ref: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def read_head(self, ref: str, size: int = 1024) -> bytes:
+        raise NotImplementedError
+
+    def presigned_get(self, ref: str, expires_in: int = PRESIGN_GET_TTL) -> str:
+        raise NotImplementedError
+
+    def presigned_put(self, key: str, content_type: Optional[str] = None,
+                      expires_in: int = PRESIGN_PUT_TTL) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class LocalStorage(StorageBackend):
+    """Disco local (UPLOAD_DIR). URLs assinadas apontam para a própria API (/media e /api/v1/upload/direct)"""
+
+    name = "local"
+
+    def __init__(self, upload_dir: Optional[str] = None):
+        self.upload_dir = Path(upload_dir or os.getenv("UPLOAD_DIR", "./uploads"))
+        self.upload_dir.mkdir(exist_ok=True)
+
+    def ref(self, key: str) -> str:
+        return str(self.upload_dir / key)
+
+    def key(self, ref: str) -> str:
+        return Path(ref).name
+
+    def path_for_key(self, key: str) -> Optional[Path]:
+        """Caminho dentro de UPLOAD_DIR (None para chaves que tentam sair do diretório)"""
+        if not key or Path(key).name != key:
+            return None
+        return self.upload_dir / key
+
+    async def save(self, key: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> str:
+        file_path = self.upload_dir / key
+        async with aiofiles.open(file_path, 'wb') as f:
+            while chunk := await asyncio.to_thread(fileobj.read, COPY_CHUNK_SIZE):
+                await f.write(chunk)
+        return str(file_path)
+
+    async def save_path(self, source_path: str, key: str) -> str:
+        file_path = self.upload_dir / key
+        try:
+            os.link(source_path, file_path)
+        except OSError:
+            # Outro sistema de arquivos (ou sem suporte a hardlink): copiar
+            await asyncio.to_thread(shutil.copyfile, source_path, file_path)
+        return str(file_path)
+
+    async def delete(self, ref: str) -> bool:
+        try:
+            if os.path.exists(ref):
+                os.remove(ref)
+                return True
+            return False
+        except Exception:
+            return False
+
+    async def stat(self, ref: str) -> Optional[Dict[str, Any]]:
+        try:
+            stat = os.stat(ref)
+        except OSError:
+            return None
+        return {"size": stat.st_size, "modified": stat.st_mtime}
+
+    async def read_head(self, ref: str, size: int = 1024) -> bytes:
+        async with aiofiles.open(ref, 'rb') as f:
+            return await f.read(size)
+
+    def _app_url(self) -> str:
+        app_url = os.getenv("APP_URL")
+        if not app_url:
+            raise ValueError("APP_URL não está configurada para construir a URL do ficheiro de upload")
+        return app_url
+
+    def _signed_query(self, method: str, key: str, expires_in: int) -> str:
+        expires = int(time.time()) + expires_in
+        return urlencode({"expires": expires, "signature": sign(f"{method}\n{key}\n{expires}")})
+
+    def verify_signed(self, method: str, key: str, expires: int, signature: str) -> bool:
+        """Confere uma URL gerada por presigned_get/presigned_put"""
+        return expires >= time.time() and verify(f"{method}\n{key}\n{expires}", signature)
+
+    def presigned_get(self, ref: str, expires_in: int = PRESIGN_GET_TTL) -> str:
+        key = self.key(ref)
+        return f"{self._app_url()}/media/{key}?{self._signed_query('GET', key, expires_in)}"
+
+    def presigned_put(self, key: str, content_type: Optional[str] = None,
+                      expires_in: int = PRESIGN_PUT_TTL) -> Dict[str, Any]:
+        return {
+            "url": f"{self._app_url()}/api/v1/upload/direct/{key}?{self._signed_query('PUT', key, expires_in)}",
+            "method": "PUT",
+            "headers": {"Content-Type": content_type} if content_type else {},
+        }
+
+
+class S3Storage(StorageBackend):
+    """Object store compatível com S3 (AWS, MinIO, R2). Clientes e worker falam direto com o bucket"""
+
+    name = "s3"
+
+    def __init__(self):
+        import boto3  # import tardio: só necessário com STORAGE_BACKEND=s3
+        from botocore.config import Config
+
+        self.bucket = os.getenv("S3_BUCKET")
+        if not self.bucket:
+            raise ValueError("S3_BUCKET não está configurado")
+        self.prefix = os.getenv("S3_PREFIX", "uploads/")
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=os.getenv("S3_ENDPOINT_URL") or None,
+            region_name=os.getenv("S3_REGION", "us-east-1"),
+            # MinIO e afins normalmente exigem path-style e assinatura v4
+            config=Config(
+                signature_version="s3v4",
+                s3={"addressing_style": os.getenv("S3_ADDRESSING_STYLE", "path")},
+                max_pool_connections=int(os.getenv("S3_MAX_CONNECTIONS", 20)),
+            ),
+        )
+
+    def ref(self, key: str) -> str:
+        return f"s3://{self.bucket}/{self.prefix}{key}"
+
+    def key(self, ref: str) -> str:
+        return ref.split(f"s3://{self.bucket}/", 1)[-1]
+
+    async def save(self, key: str, fileobj: BinaryIO, content_type: Optional[str] = None) -> str:
+        extra = {"ContentType": content_type} if content_type else None
+        await asyncio.to_thread(self.client.upload_fileobj, fileobj, self.bucket, self.prefix + key, ExtraArgs=extra)
+        return self.ref(key)
+
+    async def save_path(self, source_path: str, key: str) -> str:
+        await asyncio.to_thread(self.client.upload_file, source_path, self.bucket, self.prefix + key)
+        return self.ref(key)
+
+    async def delete(self, ref: str) -> bool:
+        try:
+            await asyncio.to_thread(self.client.delete_object, Bucket=self.bucket, Key=self.key(ref))
+            return True
+        except Exception as e:
+            logger.warning(f"Erro ao remover {ref}: {e}")
+            return False
+
+    async def stat(self, ref: str) -> Optional[Dict[str, Any]]:
+        from botocore.exceptions import ClientError
+
+        try:
+            head = await asyncio.to_thread(self.client.head_object, Bucket=self.bucket, Key=self.key(ref))
+        except ClientError:
+            return None
+        return {
+            "size": head["ContentLength"],
+            "modified": head["LastModified"].timestamp(),
+            "content_type": head.get("ContentType"),
+        }
+
+    async def read_head(self, ref: str, size: int = 1024) -> bytes:
+        response = await asyncio.to_thread(
+            self.client.get_object, Bucket=self.bucket, Key=self.key(ref), Range=f"bytes=0-{size - 1}"
+        )
+        return await asyncio.to_thread(response["Body"].read)
+
+    def presigned_get(self, ref: str, expires_in: int = PRESIGN_GET_TTL) -> str:
+        return self.client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": self.key(ref)}, ExpiresIn=expires_in
+        )
+
+    def presigned_put(self, key: str, content_type: Optional[str] = None,
+                      expires_in: int = PRESIGN_PUT_TTL) -> Dict[str, Any]:
+        params = {"Bucket": self.bucket, "Key": self.prefix + key}
+        if content_type:
+            params["ContentType"] = content_type
+        return {
+            "url": self.client.generate_presigned_url("put_object", Params=params, ExpiresIn=expires_in),
+            "method": "PUT",
+            # O Content-Type faz parte da assinatura: o cliente precisa enviar exatamente este valor
+            "headers": {"Content-Type": content_type} if content_type else {},
+        }
+
+
+def get_storage() -> StorageBackend:
+    """Backend configurado em STORAGE_BACKEND (local ou s3), compartilhado pelo processo"""
+    global _storage
+    if _storage is None:
+        backend = os.getenv("STORAGE_BACKEND", "local").lower()
+        if backend == "s3":
+            _storage = S3Storage()
+        elif backend == "local":
+            _storage = LocalStorage()
+        else:
+            raise ValueError(f"STORAGE_BACKEND desconhecido: {backend}")
+        logger.info(f"Armazenamento de uploads: {_storage.name}")
+    return _storage
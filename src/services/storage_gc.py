@@ -0,0 +1,262 @@
+import os
+import time
+import heapq
+import asyncio
+import logging
+from itertools import islice
+from typing import Optional, Dict, Any, List, Callable, Iterator, Tuple
+from sqlalchemy.orm import Session
+from ..database.connection import SessionLocal
+from ..database.models import Job
+from ..models.transcription import TranscriptionStatus
+from ..utils.helpers import ProcessLock
+from ..utils.metrics import STORAGE_GC_DELETED, STORAGE_GC_BYTES
+from .storage import get_storage, LocalStorage
+from .url_downloader import URLDownloader
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = {TranscriptionStatus.PENDING, TranscriptionStatus.PROCESSING}
+
+# Entrada do diretório: (caminho, nome, tamanho, mtime)
+FileEntry = Tuple[str, str, int, float]
+
+
+class StorageSweeper:
+    """Remove arquivos de upload/download sem job ativo e mantém o disco dentro da cota
+
+    Arquivos de uploads/ e do diretório temporário do URLDownloader têm o job_id como prefixo do nome
+    e são comparados com o status do job. O cache de mídia normalizada não pertence a um job: expira
+    por idade e é o primeiro a ser despejado (mais antigo primeiro) quando a cota estoura.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self.session_factory = session_factory
+
+        self.interval = float(os.getenv("STORAGE_GC_INTERVAL", 600))
+        # Uploads recentes podem ainda não ter job (upload direto aguardando confirmação)
+        self.min_age = float(os.getenv("STORAGE_GC_MIN_AGE", 7200))
+        # Jobs pendentes/processando há mais tempo que isso já foram dados como perdidos pelo reconciliador
+        self.active_ttl = float(os.getenv("STORAGE_GC_ACTIVE_TTL", 48 * 3600))
+        self.cache_ttl = float(os.getenv("STORAGE_GC_CACHE_TTL", 7 * 24 * 3600))
+        # Cota total (uploads + temporários + cache) em bytes; 0 desativa
+        self.quota_bytes = int(os.getenv("STORAGE_GC_QUOTA_BYTES", 0))
+        self.batch_size = int(os.getenv("STORAGE_GC_BATCH_SIZE", 500))
+        # Quantos candidatos a despejo ficam em memória por varredura (heap dos mais antigos)
+        self.max_evict_candidates = int(os.getenv("STORAGE_GC_EVICT_CANDIDATES", 10000))
+
+        # O disco é do nó: um processo por máquina varre (lock em arquivo, como o reconciliador)
+        self._lock = ProcessLock(os.getenv("STORAGE_GC_LOCK_FILE"))
+
+        self.last_report: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Inicia o loop periódico em background"""
+        if self.interval <= 0:
+            logger.info("Coletor de arquivos desativado (STORAGE_GC_INTERVAL=0)")
+            return
+        self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self):
+        """Interrompe o loop periódico"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._lock.release()
+
+    async def run_now(self) -> Optional[Dict[str, Any]]:
+        """Varredura manual; None se o lock do coletor está com outro processo"""
+        if not self._lock.acquire():
+            return None
+        return await self.sweep()
+
+    async def _run_forever(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self._lock.acquire():
+                continue
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Erro na varredura do coletor de arquivos: {e}", exc_info=True)
+
+    def _directories(self) -> List[Tuple[str, str]]:
+        """(diretório, tipo) a varrer; com object store os uploads expiram pela regra de lifecycle do bucket"""
+        downloader = URLDownloader()
+        directories = []
+        storage = get_storage()
+        if isinstance(storage, LocalStorage):
+            directories.append((str(storage.upload_dir), "upload"))
+        directories.append((str(downloader.temp_dir), "temp"))
+        directories.append((str(downloader.cache_dir), "cache"))
+        return directories
+
+    async def sweep(self) -> Dict[str, Any]:
+        """Uma varredura completa, em lotes: scandir e consultas ao banco rodam fora do event loop"""
+        started = time.monotonic()
+        now = time.time()
+        report: Dict[str, Any] = {
+            "scanned": 0,
+            "deleted": {},
+            "freed_bytes": 0,
+            "kept_active": 0,
+            "total_bytes": 0,
+        }
+        # Max-heap por idade (mtime negativo): guarda só os N arquivos mais antigos despejáveis
+        candidates: List[Tuple[float, str, int]] = []
+        seen_dirs = set()
+        # (st_dev, st_ino) já contados: uploads/ e o cache de mídia compartilham arquivos por hardlink
+        seen_inodes: set = set()
+
+        for directory, kind in self._directories():
+            real = os.path.realpath(directory)
+            if real in seen_dirs or not os.path.isdir(directory):
+                continue
+            seen_dirs.add(real)
+
+            iterator = os.scandir(directory)
+            try:
+                while True:
+                    batch = await asyncio.to_thread(_read_batch, iterator, self.batch_size, seen_inodes)
+                    if batch is None:
+                        break
+                    if batch:
+                        await self._process_batch(batch, kind, now, report, candidates)
+            finally:
+                iterator.close()
+
+        if self.quota_bytes and report["total_bytes"] > self.quota_bytes:
+            await self._evict(candidates, report)
+
+        report["duration_seconds"] = round(time.monotonic() - started, 3)
+        STORAGE_GC_BYTES.set(report["total_bytes"])
+        self.last_report = report
+        deleted = sum(report["deleted"].values())
+        if deleted:
+            logger.info(
+                f"Coletor de arquivos: {deleted} arquivos removidos ({report['freed_bytes']} bytes), "
+                f"{report['total_bytes']} bytes em disco"
+            )
+        return report
+
+    async def _process_batch(self, batch: List[FileEntry], kind: str, now: float,
+                             report: Dict[str, Any], candidates: List[Tuple[float, str, int]]):
+        report["scanned"] += len(batch)
+
+        statuses: Dict[str, TranscriptionStatus] = {}
+        if kind != "cache":
+            job_ids = {_job_id(name) for _, name, _, _ in batch} - {None}
+            statuses = await asyncio.to_thread(self._job_statuses, job_ids)
+
+        to_delete: List[Tuple[str, int, str]] = []
+        for path, name, size, mtime in batch:
+            age = now - mtime
+            reason = None
+
+            if kind == "cache":
+                if age > self.cache_ttl:
+                    reason = "expired"
+            elif age >= self.min_age:
+                status = statuses.get(_job_id(name))
+                if status is None:
+                    reason = "orphan"
+                elif status not in ACTIVE_STATUSES:
+                    reason = "finished"
+                elif age > self.active_ttl:
+                    reason = "expired"
+
+            if reason:
+                to_delete.append((path, size, reason))
+                continue
+
+            report["total_bytes"] += size
+            if name.endswith(".part"):
+                # Download/normalização em andamento: despejar quebraria o job que está escrevendo
+                continue
+            if kind == "cache" or (kind == "temp" and age >= self.min_age):
+                # Só cache e sobras de download podem ser despejados; uploads de jobs ativos nunca
+                item = (-mtime, path, size)
+                if len(candidates) < self.max_evict_candidates:
+                    heapq.heappush(candidates, item)
+                elif item > candidates[0]:
+                    heapq.heapreplace(candidates, item)
+            elif kind == "upload":
+                report["kept_active"] += 1
+
+        if to_delete:
+            await asyncio.to_thread(self._delete, to_delete, report)
+
+    def _job_statuses(self, job_ids: set) -> Dict[str, TranscriptionStatus]:
+        if not job_ids:
+            return {}
+        db = self.session_factory()
+        try:
+            return dict(db.query(Job.id, Job.status).filter(Job.id.in_(job_ids)).all())
+        finally:
+            db.close()
+
+    def _delete(self, items: List[Tuple[str, int, str]], report: Dict[str, Any]):
+        for path, size, reason in items:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logger.warning(f"Coletor de arquivos: não foi possível remover {path}: {e}")
+                report["total_bytes"] += size
+                continue
+            report["deleted"][reason] = report["deleted"].get(reason, 0) + 1
+            report["freed_bytes"] += size
+            STORAGE_GC_DELETED.labels(reason).inc()
+
+    async def _evict(self, candidates: List[Tuple[float, str, int]], report: Dict[str, Any]):
+        """Remove os arquivos mais antigos até voltar para dentro da cota"""
+        excess = report["total_bytes"] - self.quota_bytes
+        to_delete = []
+        for _, path, size in sorted(candidates, reverse=True):
+            if excess <= 0:
+                break
+            to_delete.append((path, size, "quota"))
+            excess -= size
+
+        report["total_bytes"] -= sum(size for _, size, _ in to_delete)
+        await asyncio.to_thread(self._delete, to_delete, report)
+        if report["total_bytes"] > self.quota_bytes:
+            logger.warning(
+                f"Coletor de arquivos: cota de {self.quota_bytes} bytes excedida "
+                f"({report['total_bytes']} bytes); o restante pertence a jobs ativos ou é recente"
+            )
+
+
+def _read_batch(iterator: Iterator[os.DirEntry], size: int, seen_inodes: set) -> Optional[List[FileEntry]]:
+    """Próximo lote de arquivos do scandir (executa em thread: stat é bloqueante); None no fim do diretório
+
+    Hardlinks de um arquivo já visto entram com tamanho 0: os bytes só contam (e só são liberados) uma vez.
+    """
+    entries = list(islice(iterator, size))
+    if not entries:
+        return None
+    batch = []
+    for entry in entries:
+        try:
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            stat = entry.stat(follow_symlinks=False)
+        except OSError:
+            continue
+        inode = (stat.st_dev, stat.st_ino)
+        size = 0 if inode in seen_inodes else stat.st_size
+        seen_inodes.add(inode)
+        batch.append((entry.path, entry.name, size, stat.st_mtime))
+    return batch
+
+
+def _job_id(name: str) -> Optional[str]:
+    # Uploads ({job_id}.ext) e downloads ({job_id}_direct_download, {job_id}.%(ext)s) começam com o UUID
+    candidate = name[:36]
+    return candidate if len(candidate) == 36 and candidate.count("-") == 4 else None
@@ -0,0 +1,286 @@
+import os
+import time
+import asyncio
+import logging
+from bisect import bisect_left
+from collections import deque
+from typing import Optional, Dict, Any, List, Callable
+import numpy as np
+from ..utils.helpers import percentile
+from ..utils.metrics import STREAM_CAPTION_LATENCY
+from .express_transcriber import ExpressTranscriber
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+# Janela do VAD de energia ao reavaliar o áudio que sobrou no buffer
+VAD_FRAME = SAMPLE_RATE // 50
+ENCODINGS = ("pcm_s16le", "pcm_f32le", "opus")
+
+
+class StreamSession:
+    """Transcrição incremental de um stream de áudio ao vivo sobre o modelo residente da via expressa
+
+    O áudio ainda não finalizado fica num buffer. A cada STREAM_STEP segundos de áudio novo o buffer
+    inteiro é retranscrito: segmentos que terminam antes do fim do buffer menos STREAM_COMMIT_LAG (ou
+    todos, quando o VAD de energia detecta uma pausa) são finalizados e saem do buffer; o restante é
+    enviado como legenda parcial.
+    """
+
+    def __init__(self, express: ExpressTranscriber, language: str = "auto"):
+        self.express = express
+        self.language = language
+
+        self.step_samples = int(float(os.getenv("STREAM_STEP", 1.0)) * SAMPLE_RATE)
+        self.commit_lag = float(os.getenv("STREAM_COMMIT_LAG", 2.0))
+        # Acima disso o buffer é finalizado mesmo sem pausa (fala contínua)
+        self.max_buffer = float(os.getenv("STREAM_MAX_BUFFER", 15.0))
+        # VAD de energia: frames abaixo desse nível (dBFS) contam como silêncio
+        self.silence_db = float(os.getenv("STREAM_SILENCE_DB", -45))
+        self.endpoint_samples = int(float(os.getenv("STREAM_ENDPOINT_SILENCE", 0.6)) * SAMPLE_RATE)
+
+        # Frames recebidos desde o último passo; só são concatenados quando o buffer é lido
+        self._chunks: List[np.ndarray] = []
+        # Posição (em amostras do stream) do início do buffer
+        self.buffer_start = 0
+        self.total_samples = 0
+        self.has_speech = False
+        self.trailing_silence = 0
+        self.new_samples = 0
+
+        # (fim do frame em amostras, instante de chegada) para medir a latência das legendas
+        self._arrivals: deque = deque()
+        self.final_segments: List[Dict[str, Any]] = []
+        self.detected_language: Optional[str] = None
+        self.latencies: Dict[str, List[float]] = {"partial": [], "final": []}
+        self.asr_seconds = 0.0
+        self.started = time.monotonic()
+
+    @property
+    def duration(self) -> float:
+        return self.total_samples / SAMPLE_RATE
+
+    @property
+    def buffer(self) -> np.ndarray:
+        """Áudio ainda não finalizado (uma concatenação por passo, não por frame)"""
+        if len(self._chunks) > 1:
+            self._chunks = [np.concatenate(self._chunks)]
+        return self._chunks[0] if self._chunks else np.zeros(0, dtype=np.float32)
+
+    def feed(self, audio: np.ndarray) -> bool:
+        """Adiciona áudio float32 mono a 16kHz; True quando já há áudio novo suficiente para um passo"""
+        if not len(audio):
+            return False
+        self._chunks.append(audio)
+        self.total_samples += len(audio)
+        self.new_samples += len(audio)
+        self._arrivals.append((self.total_samples, time.monotonic()))
+        self._update_vad(audio)
+        return self.new_samples >= self.step_samples or self._at_endpoint()
+
+    def _update_vad(self, audio: np.ndarray):
+        if _dbfs(audio) < self.silence_db:
+            self.trailing_silence += len(audio)
+        else:
+            self.trailing_silence = 0
+            self.has_speech = True
+
+    def _rescan(self):
+        """Recalcula fala/silêncio a partir do que ficou no buffer (frames chegados durante a transcrição)"""
+        self.has_speech = False
+        self.trailing_silence = 0
+        buffer = self.buffer
+        for start in range(0, len(buffer), VAD_FRAME):
+            self._update_vad(buffer[start:start + VAD_FRAME])
+
+    def _at_endpoint(self) -> bool:
+        # Pausa depois de fala: hora de finalizar tudo o que está no buffer
+        return self.has_speech and self.trailing_silence >= self.endpoint_samples
+
+    async def step(self, final: bool = False) -> List[Dict[str, Any]]:
+        """Retranscreve o buffer e devolve as mensagens (parcial/finalizados) para o cliente"""
+        self.new_samples = 0
+        if not self.has_speech:
+            # Só silêncio: nada para o modelo, descarta mantendo um pouco de contexto
+            self._trim(max(0, len(self.buffer) - SAMPLE_RATE // 2))
+            return []
+
+        # Frames que chegam durante a transcrição ficam fora deste passo (e não desfazem a pausa detectada)
+        audio = self.buffer
+        endpoint = final or self._at_endpoint()
+        started = time.perf_counter()
+        segments, info = await self.express.run(
+            audio, self.detected_language or self.language, initial_prompt=self._prompt()
+        )
+        self.asr_seconds += time.perf_counter() - started
+        if self.detected_language is None and segments:
+            # Fixa o idioma depois da primeira detecção para as janelas seguintes não oscilarem
+            self.detected_language = info.language
+
+        buffer_seconds = len(audio) / SAMPLE_RATE
+        if endpoint:
+            committed = segments
+        else:
+            limit = buffer_seconds - self.commit_lag
+            committed = [segment for segment in segments[:-1] if segment["end"] <= limit]
+            if not committed and buffer_seconds > self.max_buffer:
+                committed = segments[:-1] or segments
+
+        messages = []
+        offset = self.buffer_start / SAMPLE_RATE
+        for segment in committed:
+            segment = _shift(segment, offset)
+            self.final_segments.append(segment)
+            messages.append({"type": "final", "segment": segment, "latency": self._latency("final", segment["end"])})
+
+        if endpoint:
+            self._trim(len(audio))
+            self._rescan()
+        elif committed:
+            self._trim(int(committed[-1]["end"] * SAMPLE_RATE))
+        elif buffer_seconds > self.max_buffer:
+            # Nada a finalizar (ex.: ruído sem segmentos): mantém só os últimos STREAM_COMMIT_LAG segundos
+            self._trim(len(audio) - int(self.commit_lag * SAMPLE_RATE))
+
+        pending = segments[len(committed):]
+        if pending:
+            start, end = offset + pending[0]["start"], offset + pending[-1]["end"]
+            messages.append({
+                "type": "partial",
+                "text": " ".join(segment["text"] for segment in pending),
+                "start": round(start, 3),
+                "end": round(end, 3),
+                "latency": self._latency("partial", end)
+            })
+        return messages
+
+    def _prompt(self) -> Optional[str]:
+        # Últimas palavras finalizadas como contexto para a continuação
+        if not self.final_segments:
+            return None
+        return " ".join(segment["text"] for segment in self.final_segments[-3:])[-200:]
+
+    def _trim(self, samples: int):
+        if samples <= 0:
+            return
+        buffer = self.buffer[samples:]
+        self._chunks = [buffer] if len(buffer) else []
+        self.buffer_start += samples
+        while len(self._arrivals) > 1 and self._arrivals[1][0] <= self.buffer_start:
+            self._arrivals.popleft()
+
+    def _latency(self, kind: str, stream_seconds: float) -> Optional[float]:
+        """Tempo desde a chegada do áudio que termina a legenda até agora"""
+        position = int(stream_seconds * SAMPLE_RATE)
+        ends = [end for end, _ in self._arrivals]
+        index = min(bisect_left(ends, position), len(ends) - 1)
+        if index < 0:
+            return None
+        latency = round(time.monotonic() - self._arrivals[index][1], 3)
+        self.latencies[kind].append(latency)
+        STREAM_CAPTION_LATENCY.labels(kind).observe(latency)
+        return latency
+
+    def result(self) -> Dict[str, Any]:
+        """Resultado consolidado no formato do webhook do worker, para gravar o Job"""
+        elapsed = time.monotonic() - self.started
+        latency = {}
+        for kind, values in self.latencies.items():
+            values = sorted(values)
+            latency[kind] = {"count": len(values), "p50": percentile(values, 50), "p99": percentile(values, 99)}
+        return {
+            "text": " ".join(segment["text"] for segment in self.final_segments),
+            "segments": self.final_segments,
+            "language": self.detected_language or (None if self.language == "auto" else self.language),
+            "duration": round(self.duration, 3),
+            "timings": {"total": round(elapsed, 3), "stages": {"transcription": round(self.asr_seconds, 3)}},
+            "stream": {"caption_latency": latency}
+        }
+
+
+class AudioDecoder:
+    """Converte os frames recebidos em float32 mono a 16kHz (PCM direto; Opus via ffmpeg)"""
+
+    def __init__(self, encoding: str, sample_rate: int, on_audio: Callable[[np.ndarray], None]):
+        self.encoding = encoding
+        self.sample_rate = sample_rate
+        self.on_audio = on_audio
+        self._remainder = b""
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._reader: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self.encoding != "opus":
+            return
+        # Opus chega num container (WebM/Ogg do MediaRecorder); ffmpeg decodifica em streaming
+        self._process = await asyncio.create_subprocess_exec(
+            os.getenv("FFMPEG_BIN", "ffmpeg"), "-loglevel", "error", "-i", "pipe:0",
+            "-f", "f32le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1",
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE
+        )
+        self._reader = asyncio.create_task(self._read_ffmpeg())
+
+    async def write(self, data: bytes):
+        if self._process:
+            self._process.stdin.write(data)
+            await self._process.stdin.drain()
+            return
+
+        data = self._remainder + data
+        width = 2 if self.encoding == "pcm_s16le" else 4
+        usable = len(data) - len(data) % width
+        self._remainder = data[usable:]
+        if self.encoding == "pcm_s16le":
+            audio = np.frombuffer(data[:usable], dtype="<i2").astype(np.float32) / 32768.0
+        else:
+            audio = np.frombuffer(data[:usable], dtype="<f4").astype(np.float32)
+        self.on_audio(_resample(audio, self.sample_rate))
+
+    async def close(self):
+        """Fim do stream: espera o ffmpeg entregar o áudio restante"""
+        if self._process:
+            if not self._process.stdin.is_closing():
+                self._process.stdin.close()
+            try:
+                await asyncio.wait_for(self._reader, timeout=10)
+            except asyncio.TimeoutError:
+                self._process.kill()
+            await self._process.wait()
+
+    async def _read_ffmpeg(self):
+        remainder = b""
+        while True:
+            chunk = await self._process.stdout.read(SAMPLE_RATE * 4 // 10)
+            if not chunk:
+                break
+            chunk = remainder + chunk
+            usable = len(chunk) - len(chunk) % 4
+            remainder = chunk[usable:]
+            self.on_audio(np.frombuffer(chunk[:usable], dtype="<f4").copy())
+
+
+def _resample(audio: np.ndarray, sample_rate: int) -> np.ndarray:
+    # Interpolação linear basta para voz; o Whisper trabalha a 16kHz
+    if sample_rate == SAMPLE_RATE or not len(audio):
+        return audio
+    count = int(round(len(audio) * SAMPLE_RATE / sample_rate))
+    positions = np.arange(count, dtype=np.float64) * (sample_rate / SAMPLE_RATE)
+    return np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+
+
+def _dbfs(audio: np.ndarray) -> float:
+    rms = float(np.sqrt(np.mean(np.square(audio, dtype=np.float64))))
+    return 20 * np.log10(rms) if rms > 0 else -120.0
+
+
+def _shift(segment: Dict[str, Any], offset: float) -> Dict[str, Any]:
+    """Timestamps relativos ao buffer -> relativos ao início do stream"""
+    return {
+        **segment,
+        "start": round(segment["start"] + offset, 3),
+        "end": round(segment["end"] + offset, 3),
+        "words": [
+            {**word, "start": round(word["start"] + offset, 3), "end": round(word["end"] + offset, 3)}
+            for word in segment.get("words") or []
+        ]
+    }
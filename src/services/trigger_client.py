@@ -1,13 +1,77 @@
 import os
+import time
+import random
+import asyncio
 import logging
-from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import httpx
 import json
+from opentelemetry import trace
+from ..utils.metrics import TRIGGER_REQUEST_LATENCY, TRIGGER_RETRIES, TRIGGER_CIRCUIT_OPEN
+from ..utils.tracing import span, inject_traceparent, job_context, job_trace_id
+from .file_handler import FileHandler
 
 logger = logging.getLogger(__name__)
 
 
+class TriggerError(Exception):
+    """Erro retornado pelo Trigger.dev"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class TriggerUnavailableError(TriggerError):
+    """Trigger.dev indisponível (circuit breaker aberto); o job deve ir para o outbox"""
+
+
+class CircuitBreaker:
+    """Circuit breaker simples: abre após falhas consecutivas e libera uma tentativa após o reset_timeout"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow_request(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probe_in_flight:
+            # Apenas uma chamada de teste enquanto meio-aberto
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def release_probe(self):
+        """Libera a chamada de teste sem registrar resultado (cancelada ou interrompida)"""
+        self._probe_in_flight = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"[Trigger.dev] Circuit breaker aberto após {self.failures} falhas consecutivas")
+            self.opened_at = time.monotonic()
+
+
 class TriggerClient:
     def __init__(self):
         self.api_key = os.getenv("TRIGGER_SECRET_KEY")
@@ -20,6 +84,16 @@ class TriggerClient:
 
         self.base_url = "https://api.trigger.dev"
         self.task_id = "transcribe-audio"
+        self.batch_limit = int(os.getenv("TRIGGER_BATCH_LIMIT", 500))
+
+        self.max_retries = int(os.getenv("TRIGGER_MAX_RETRIES", 3))
+        self.retry_base_delay = float(os.getenv("TRIGGER_RETRY_BASE_DELAY", 0.5))
+        self.retry_max_delay = float(os.getenv("TRIGGER_RETRY_MAX_DELAY", 8.0))
+
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv("TRIGGER_BREAKER_THRESHOLD", 5)),
+            reset_timeout=float(os.getenv("TRIGGER_BREAKER_RESET", 30))
+        )
 
         self.client = httpx.AsyncClient(
             headers={
@@ -27,28 +101,93 @@ class TriggerClient:
                 "Content-Type": "application/json",
                 "User-Agent": "Echo-Transcription/1.0"
             },
-            timeout=30.0
+            http2=os.getenv("TRIGGER_HTTP2", "true").lower() == "true",
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("TRIGGER_MAX_CONNECTIONS", 50)),
+                max_keepalive_connections=int(os.getenv("TRIGGER_MAX_KEEPALIVE", 20)),
+                keepalive_expiry=float(os.getenv("TRIGGER_KEEPALIVE_EXPIRY", 60))
+            ),
+            timeout=httpx.Timeout(30.0, connect=5.0)
         )
 
+    async def _request(self, method: str, endpoint: str, url: str, idempotent: bool = True, **kwargs) -> httpx.Response:
+        """Executa a chamada com circuit breaker, retry com jitter (apenas idempotentes) e métrica de latência"""
+        attempts = self.max_retries + 1 if idempotent else 1
+        extra_headers = kwargs.pop("headers", None) or {}
+
+        for attempt in range(1, attempts + 1):
+            probing = self.circuit_breaker.state == "half_open"
+            if not self.circuit_breaker.allow_request():
+                TRIGGER_CIRCUIT_OPEN.labels(endpoint=endpoint).inc()
+                raise TriggerUnavailableError(f"Trigger.dev indisponível (circuit breaker aberto) em {endpoint}")
+
+            started = time.perf_counter()
+            error: Optional[httpx.HTTPError] = None
+            try:
+                with span("http.trigger", endpoint=endpoint, attempt=attempt):
+                    headers = inject_traceparent(dict(extra_headers))
+                    response = await self.client.request(method, url, headers=headers, **kwargs)
+                    response.raise_for_status()
+            except httpx.HTTPError as e:
+                error = e
+            finally:
+                if probing:
+                    # Cancelamento ou exceção fora do httpx não podem deixar o meio-aberto bloqueado;
+                    # nos demais casos o resultado é registrado logo abaixo, sem await no meio
+                    self.circuit_breaker.release_probe()
+
+            if error is not None:
+                transient = _is_transient(error)
+                TRIGGER_REQUEST_LATENCY.labels(endpoint=endpoint, outcome="error").observe(time.perf_counter() - started)
+
+                if transient:
+                    self.circuit_breaker.record_failure()
+                else:
+                    # Erros 4xx não indicam indisponibilidade do Trigger.dev
+                    self.circuit_breaker.record_success()
+
+                if not transient or attempt == attempts:
+                    await self._handle_error(error, endpoint)
+
+                TRIGGER_RETRIES.labels(endpoint=endpoint).inc()
+                # Backoff exponencial com "full jitter"
+                delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempt - 1)))
+                logger.warning(f"[Trigger.dev] Falha transitória em {endpoint} ({error!r}); nova tentativa em {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            TRIGGER_REQUEST_LATENCY.labels(endpoint=endpoint, outcome="ok").observe(time.perf_counter() - started)
+            self.circuit_breaker.record_success()
+            return response
+
     async def _handle_error(self, e: httpx.HTTPError, context: str) -> None:
         """Loga e formata erro HTTP do Trigger.dev"""
-        status_code = getattr(e.response, "status_code", "desconhecido")
+        response = e.response if isinstance(e, httpx.HTTPStatusError) else None
+        status_code = response.status_code if response is not None else None
         try:
-            error_text = e.response.text if e.response else "sem resposta"
+            error_text = response.text if response is not None else repr(e)
         except Exception:
             error_text = "erro ao ler resposta"
 
-        logger.error(f"[Trigger.dev] Erro em {context} | Status: {status_code} | Detalhes: {error_text}")
-        raise Exception(f"Erro Trigger.dev em {context}: Status={status_code}")
+        logger.error(f"[Trigger.dev] Erro em {context} | Status: {status_code or 'desconhecido'} | Detalhes: {error_text}")
 
-    async def create_transcription_job(
+        if status_code is None or status_code >= 500 or status_code == 429:
+            raise TriggerUnavailableError(f"Erro Trigger.dev em {context}: Status={status_code or 'desconhecido'}", status_code)
+        raise TriggerError(f"Erro Trigger.dev em {context}: Status={status_code}", status_code)
+
+    def _build_payload(
             self,
             job_id: str,
             file_path: Optional[str] = None,
             file_url: Optional[str] = None,
             language: str = "auto",
-            webhook_url: Optional[str] = None
-    ) -> str:
+            webhook_url: Optional[str] = None,
+            diarize: bool = False,
+            content_hash: Optional[str] = None,
+            worker: Optional[str] = None,
+            model: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Monta o payload enviado ao worker"""
 
         final_webhook_url = webhook_url or f"{os.getenv('APP_URL')}/webhooks/transcription"
 
@@ -58,72 +197,108 @@ class TriggerClient:
         payload: Dict[str, Any] = {
             "job_id": job_id,
             "language": language,
-            "webhook_url": final_webhook_url
+            "webhook_url": final_webhook_url,
+            "diarize": diarize
         }
 
-        if file_path:
-            app_url = os.getenv("APP_URL")
-            if not app_url:
-                raise ValueError("APP_URL não está configurada para construir a URL do ficheiro de upload")
+        # Contexto de trace do job para o Trigger, o worker e os webhooks de volta
+        current = trace.get_current_span().get_span_context()
+        inject_traceparent(payload, None if current.trace_id == job_trace_id(job_id) else job_context(job_id))
 
-            filename = Path(file_path).name
+        if content_hash:
+            # sha256 do arquivo: o worker reaproveita o áudio já decodificado em reruns sem baixar de novo
+            payload["content_hash"] = content_hash
 
-            public_file_url = f"{app_url}/uploads/{filename}"
-            payload["file_url"] = public_file_url
+        if worker:
+            # Variante escolhida pelo WorkerRouter (cpu, t4, a10g); sem ela o worker usa a T4
+            payload["worker"] = worker
+            payload["model"] = model
+
+        if file_path:
+            # Upload próprio: URL do armazenamento (assinada no object store) para o worker baixar
+            payload["file_url"] = FileHandler().download_url(file_path)
         else:
             payload["file_url"] = file_url
 
+        return payload
+
+    async def create_transcription_job(
+            self,
+            job_id: str,
+            file_path: Optional[str] = None,
+            file_url: Optional[str] = None,
+            language: str = "auto",
+            webhook_url: Optional[str] = None,
+            idempotency_key: Optional[str] = None,
+            diarize: bool = False,
+            content_hash: Optional[str] = None,
+            worker: Optional[str] = None,
+            model: Optional[str] = None
+    ) -> str:
+
+        payload = self._build_payload(
+            job_id, file_path, file_url, language, webhook_url, diarize, content_hash, worker, model
+        )
+
         url = f"{self.base_url}/api/v1/tasks/{self.task_id}/trigger"
 
+        # A idempotencyKey torna o trigger seguro para retry: o Trigger.dev devolve o mesmo run
         body = {
-            "payload": payload
+            "payload": payload,
+            "options": {"idempotencyKey": idempotency_key or job_id}
         }
 
         logger.info(f"Enviando para Trigger.dev. URL: {url}, Payload para o worker: {payload}")
 
-        try:
-            response = await self.client.post(url, json=body)
-            response.raise_for_status()
-            result = response.json()
-            trigger_job_id = result.get("id")
-            if not trigger_job_id:
-                raise Exception("Trigger.dev não retornou um ID de run")
-            return trigger_job_id
-        except httpx.HTTPError as e:
-            status_code = getattr(e.response, "status_code", "desconhecido")
-            error_text = e.response.text if e.response else "sem resposta"
-            logger.error(f"[Trigger.dev] Erro | Status: {status_code} | Detalhes: {error_text}")
-            raise Exception(f"Erro Trigger.dev: Status={status_code}")
+        response = await self._request("POST", "trigger", url, json=body)
+        trigger_job_id = response.json().get("id")
+        if not trigger_job_id:
+            raise TriggerError("Trigger.dev não retornou um ID de run")
+        return trigger_job_id
+
+    async def create_transcription_jobs_batch(self, jobs: List[Dict[str, Any]]) -> List[str]:
+        """Dispara até batch_limit jobs numa única chamada de batch trigger e retorna os IDs dos runs na mesma ordem"""
+
+        if len(jobs) > self.batch_limit:
+            raise ValueError(f"Batch excede o limite de {self.batch_limit} itens do Trigger.dev")
+
+        url = f"{self.base_url}/api/v1/tasks/{self.task_id}/batch"
+        body = {
+            "items": [
+                {"payload": self._build_payload(**job), "options": {"idempotencyKey": job["job_id"]}}
+                for job in jobs
+            ]
+        }
+
+        logger.info(f"Enviando batch para Trigger.dev. URL: {url}, Itens: {len(jobs)}")
+
+        response = await self._request("POST", "batch_trigger", url, json=body)
+        runs = response.json().get("runs") or []
+        if len(runs) != len(jobs):
+            raise TriggerError("Trigger.dev retornou um número inesperado de runs no batch")
+
+        # Versões da API retornam os runs como IDs ou como objetos {"id": ...}
+        return [run["id"] if isinstance(run, dict) else run for run in runs]
 
     async def get_job_status(self, trigger_job_id: str) -> Dict[str, Any]:
         """Consulta status de um job pelo ID do Trigger.dev"""
         url = f"{self.base_url}/api/v1/runs/{trigger_job_id}"
 
-        try:
-            response = await self.client.get(url)
-            response.raise_for_status()
-            return response.json()
-        except httpx.HTTPError as e:
-            await self._handle_error(e, f"get_job_status({trigger_job_id})")
-            return {}
+        response = await self._request("GET", "get_run", url)
+        return response.json()
 
     async def cancel_job(self, trigger_job_id: str) -> bool:
         """Cancela um job em execução"""
         url = f"{self.base_url}/api/v1/runs/{trigger_job_id}/cancel"
 
-        try:
-            response = await self.client.post(url)
-            response.raise_for_status()
-            return True
-        except httpx.HTTPError as e:
-            await self._handle_error(e, f"cancel_job({trigger_job_id})")
-            return False
+        await self._request("POST", "cancel_run", url)
+        return True
 
     async def test_connection(self) -> bool:
         """Testa conexão com Trigger.dev"""
         try:
-            response = await self.client.get(f"{self.base_url}/api/v1/whoami")
-            return response.status_code == 200
+            await self._request("GET", "whoami", f"{self.base_url}/api/v1/whoami")
+            return True
         except Exception as e:
             logger.error(f"Erro ao testar conexão: {e}")
             return False
@@ -132,14 +307,16 @@ class TriggerClient:
         """Lista tasks disponíveis"""
         url = f"{self.base_url}/api/v1/tasks"
 
-        try:
-            response = await self.client.get(url)
-            response.raise_for_status()
-            return response.json()
-        except httpx.HTTPError as e:
-            await self._handle_error(e, "list_tasks")
-            return {}
+        response = await self._request("GET", "list_tasks", url)
+        return response.json()
 
     async def close(self):
         """Fecha o cliente HTTP"""
         await self.client.aclose()
+
+
+def _is_transient(e: httpx.HTTPError) -> bool:
+    """Falhas de rede, 5xx e 429 podem ser repetidas; demais 4xx não"""
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code >= 500 or e.response.status_code == 429
+    return isinstance(e, httpx.TransportError)
@@ -1,18 +1,118 @@
 import os
+import shutil
+import asyncio
+import hashlib
 import tempfile
-import yt_dlp
-import aiohttp
+import aiofiles
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional, Dict, Any
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 import logging
+from .http_session import get_http_session, probe_url, DOWNLOAD_CHUNK_SIZE
 
 logger = logging.getLogger(__name__)
 
+# Pool limitado para yt-dlp (bloqueante); evita que muitos downloads disputem CPU/rede da API
+_fetch_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("MEDIA_FETCH_WORKERS", 2)),
+    thread_name_prefix="media-fetch"
+)
+
 
 class URLDownloader:
     def __init__(self):
         self.temp_dir = Path(tempfile.gettempdir()) / "transcription_downloads"
         self.temp_dir.mkdir(exist_ok=True)
+        self.cache_dir = Path(os.getenv("MEDIA_CACHE_DIR", str(self.temp_dir / "cache")))
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    async def resolve_media(self, url: str) -> Dict[str, Any]:
+        """Identifica a mídia: se é URL direta, a chave canônica para cache e a duração (quando conhecida)"""
+        probe = await probe_url(url)
+        if probe and probe["status"] == 200 and probe["content_type"].startswith(('audio/', 'video/')):
+            validator = probe["etag"] or probe["last_modified"]
+            return {
+                "direct": True,
+                # Sem ETag/Last-Modified não há como saber se o conteúdo mudou: não cachear
+                "media_key": f"url:{canonicalize_url(probe['final_url'])}|{validator}" if validator else None,
+                "duration": None,
+                "title": None
+            }
+
+        info = await self._extract_info(url)
+        return {
+            "direct": False,
+            "media_key": f"{info.get('extractor_key', 'generic').lower()}:{info['id']}" if info.get("id") else None,
+            "duration": info.get("duration"),
+            "title": info.get("title")
+        }
+
+    async def _extract_info(self, url: str) -> Dict[str, Any]:
+        """Metadados do yt-dlp sem baixar a mídia"""
+        ydl_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'noplaylist': True,
+            'skip_download': True
+        }
+
+        def extract():
+            import yt_dlp  # import tardio: só páginas (YouTube etc.) precisam dele
+
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                return ydl.extract_info(url, download=False)
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(_fetch_executor, extract) or {}
+        except Exception as e:
+            raise Exception(f"URL não suportada para extração de áudio: {str(e)}")
+
+    async def fetch_audio(self, url: str, job_id: str, media_key: Optional[str] = None) -> str:
+        """Baixa só o áudio e normaliza para mono 16kHz; reaproveita o cache quando há media_key"""
+        cached_path = self.cache_dir / f"{_key_hash(media_key)}.ogg" if media_key else None
+        if cached_path and cached_path.exists():
+            logger.info(f"[{job_id}] Áudio normalizado encontrado no cache: {cached_path}")
+            return str(cached_path)
+
+        downloaded = await self.download_from_url(url, job_id)
+        try:
+            output_path = cached_path or (self.temp_dir / f"{job_id}_normalized.ogg")
+            return await self.normalize_audio(downloaded, str(output_path), job_id)
+        finally:
+            await self.cleanup_download(downloaded)
+
+    async def normalize_audio(self, input_path: str, output_path: str, job_id: str) -> str:
+        """Converte para Opus mono 16kHz (o que o WhisperX usa), reduzindo o tráfego até o worker"""
+        # Temporário por job: jobs simultâneos da mesma mídia escrevem no mesmo arquivo do cache
+        partial_path = f"{output_path}.{job_id}.part"
+        cmd = [
+            os.getenv("FFMPEG_BIN", "ffmpeg"), "-nostdin", "-y", "-v", "error",
+            "-i", input_path,
+            "-vn", "-ac", "1", "-ar", "16000",
+            "-c:a", "libopus", "-b:a", "32k",
+            "-f", "ogg", partial_path
+        ]
+
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE
+            )
+        except FileNotFoundError:
+            # Sem ffmpeg na API: enviar o áudio original
+            logger.warning("ffmpeg não encontrado; áudio enviado sem normalização")
+            shutil.copyfile(input_path, partial_path)
+        else:
+            _, stderr = await process.communicate()
+            if process.returncode != 0:
+                raise Exception(f"Falha ao normalizar áudio: {stderr.decode(errors='ignore').strip()}")
+
+        # Rename atômico: nunca expor um arquivo incompleto no cache
+        os.replace(partial_path, output_path)
+        return output_path
 
     async def download_from_url(self, url: str, job_id: str) -> str:
         """Download de áudio/vídeo de URL"""
@@ -26,31 +126,29 @@ class URLDownloader:
 
     async def _is_direct_media_url(self, url: str) -> bool:
         """Verifica se é URL direta para arquivo de mídia"""
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.head(url) as response:
-                    content_type = response.headers.get('Content-Type', '')
-                    return content_type.startswith(('audio/', 'video/'))
-        except:
+        probe = await probe_url(url)
+        if not probe or probe["status"] != 200:
             return False
+        return probe["content_type"].startswith(('audio/', 'video/'))
 
     async def _download_direct(self, url: str, job_id: str) -> str:
         """Download direto de arquivo de mídia"""
         try:
             output_path = self.temp_dir / f"{job_id}_direct_download"
 
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    response.raise_for_status()
+            session = await get_http_session()
+            async with session.get(url) as response:
+                response.raise_for_status()
 
-                    # Determinar extensão baseada no Content-Type
-                    content_type = response.headers.get('Content-Type', '')
-                    extension = self._get_extension_from_mime(content_type)
-                    final_path = output_path.with_suffix(extension)
+                # Determinar extensão baseada no Content-Type
+                content_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+                extension = self._get_extension_from_mime(content_type)
+                final_path = output_path.with_suffix(extension)
 
-                    with open(final_path, 'wb') as f:
-                        async for chunk in response.content.iter_chunked(8192):
-                            f.write(chunk)
+                # Escrita em thread (aiofiles) com blocos grandes para não bloquear o event loop
+                async with aiofiles.open(final_path, 'wb', buffering=DOWNLOAD_CHUNK_SIZE) as f:
+                    async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                        await f.write(chunk)
 
             return str(final_path)
 
@@ -67,19 +165,21 @@ class URLDownloader:
                 'format': 'bestaudio/best',
                 'outtmpl': str(output_path),
                 'extract_flat': False,
+                'noplaylist': True,
                 'no_warnings': True,
                 'quiet': True
             }
 
-            # Executar download em thread separada para não bloquear
-            import asyncio
-            loop = asyncio.get_event_loop()
+            # Executar download no pool limitado para não bloquear
+            loop = asyncio.get_running_loop()
 
             def download():
+                import yt_dlp
+
                 with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                     ydl.download([url])
 
-            await loop.run_in_executor(None, download)
+            await loop.run_in_executor(_fetch_executor, download)
 
             # Encontrar arquivo baixado
             for file_path in self.temp_dir.glob(f"{job_id}.*"):
@@ -114,4 +214,15 @@ class URLDownloader:
                 return True
             return False
         except Exception:
-            return False
\ No newline at end of file
+            return False
+
+
+def canonicalize_url(url: str) -> str:
+    """Normaliza a URL (esquema/host em minúsculas, sem fragmento, query ordenada) para uso como chave"""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", query, ""))
+
+
+def _key_hash(media_key: str) -> str:
+    return hashlib.sha256(media_key.encode("utf-8")).hexdigest()
@@ -0,0 +1,193 @@
+import os
+import json
+import time
+import logging
+from typing import Optional, Dict, Any
+from sqlalchemy.orm import Session
+from ..database.models import Job
+from ..models.transcription import TranscriptionStatus
+from ..utils.metrics import ROUTED_JOBS
+from .eta_estimator import ETAEstimator, DEFAULT_MODEL, DEFAULT_WORKER, stats_key
+
+logger = logging.getLogger(__name__)
+
+# Perfis das variantes do worker (src/modal_functions/whisperx_transcriber.py). Custo por hora de container
+# ligado; rtf/overhead são os valores iniciais até o estimador de ETA ter amostras da variante
+VARIANTS: Dict[str, Dict[str, Any]] = {
+    "cpu": {
+        "model": "small", "cost_per_hour": 0.38, "rtf": 0.3, "overhead": 20, "cold_start": 20,
+        "timeout": 1800, "max_duration": 900, "max_containers": 20, "diarize": False
+    },
+    "t4": {
+        "model": DEFAULT_MODEL, "cost_per_hour": 0.59, "rtf": 0.15, "overhead": 60, "cold_start": 60,
+        "timeout": 1800, "max_duration": None, "max_containers": 10, "diarize": True
+    },
+    "a10g": {
+        "model": DEFAULT_MODEL, "cost_per_hour": 1.10, "rtf": 0.07, "overhead": 45, "cold_start": 60,
+        "timeout": 7200, "max_duration": None, "max_containers": 10, "diarize": True
+    },
+}
+
+# Quanto vale, em US$ por hora, reduzir a espera do cliente em cada tier
+LATENCY_VALUE = {"economy": 0.0, "standard": 2.0, "priority": 30.0}
+
+
+def load_variants() -> Dict[str, Dict[str, Any]]:
+    """Variantes habilitadas em WORKER_VARIANTS, com ajustes de WORKER_VARIANT_CONFIG (JSON) e limites de containers"""
+    overrides = json.loads(os.getenv("WORKER_VARIANT_CONFIG") or "{}")
+    variants = {}
+    for name in [n.strip() for n in os.getenv("WORKER_VARIANTS", "cpu,t4,a10g").split(",") if n.strip()]:
+        if name not in VARIANTS:
+            logger.warning(f"Variante de worker desconhecida em WORKER_VARIANTS: {name}")
+            continue
+        variant = {**VARIANTS[name], **overrides.get(name, {})}
+        # Mesmas variáveis lidas no deploy do worker (min_containers/max_containers da função no Modal)
+        variant["min_containers"] = int(os.getenv(f"WORKER_MIN_CONTAINERS_{name.upper()}", 0))
+        variant["max_containers"] = max(1, int(os.getenv(f"WORKER_MAX_CONTAINERS_{name.upper()}", variant["max_containers"])))
+        variants[name] = variant
+
+    return variants or {DEFAULT_WORKER: {**VARIANTS[DEFAULT_WORKER], "min_containers": 0}}
+
+
+class WorkerRouter:
+    """Escolhe a variante do worker (CPU, T4, A10G) pelo custo previsto do job somado ao valor da espera no tier"""
+
+    def __init__(self, eta_estimator: Optional[ETAEstimator] = None, variants: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.eta_estimator = eta_estimator
+        self.variants = variants or load_variants()
+        # Serviço previsto * margem precisa caber no timeout da variante
+        self.timeout_margin = float(os.getenv("ROUTING_TIMEOUT_MARGIN", 1.5))
+        self.latency_value = {
+            tier: float(os.getenv(f"ROUTING_LATENCY_VALUE_{tier.upper()}", value))
+            for tier, value in LATENCY_VALUE.items()
+        }
+        # Container novo também cobra o cold start e a janela ociosa antes de ser desligado
+        self.scaledown_window = float(os.getenv("WORKER_SCALEDOWN_WINDOW", 60))
+        self.depth_ttl = float(os.getenv("ROUTING_QUEUE_TTL", 5))
+        self.default = DEFAULT_WORKER if DEFAULT_WORKER in self.variants else next(iter(self.variants))
+
+        self._depths: Dict[str, int] = {}
+        self._depths_at = 0.0
+
+    def route(
+            self,
+            db: Session,
+            duration: Optional[float],
+            tier: str = "standard",
+            diarize: bool = False,
+            count: int = 1
+    ) -> Dict[str, Any]:
+        """Decisão para `count` novos jobs com a fila atual de cada variante e o RTF aprendido nos jobs concluídos"""
+        depths = self.queue_depths(db)
+        decision = self.choose(duration, tier, diarize, depths, self.learned_stats(db))
+
+        # Jobs roteados antes da próxima leitura do banco também contam na fila
+        self._depths[decision["worker"]] = depths.get(decision["worker"], 0) + count
+        ROUTED_JOBS.labels(decision["worker"], tier, decision["reason"]).inc(count)
+        return decision
+
+    def choose(
+            self,
+            duration: Optional[float],
+            tier: str = "standard",
+            diarize: bool = False,
+            depths: Optional[Dict[str, int]] = None,
+            stats: Optional[Dict[str, Dict[str, float]]] = None
+    ) -> Dict[str, Any]:
+        """Variante de menor custo + valor da espera; sem duração conhecida, a variante padrão"""
+        if not duration:
+            return self._decision(self.default, "unknown_duration")
+
+        depths = depths or {}
+        value = self.latency_value.get(tier, self.latency_value["standard"])
+        options = []
+        for name, variant in self.variants.items():
+            if diarize and not variant["diarize"]:
+                continue
+            if variant.get("max_duration") and duration > variant["max_duration"]:
+                continue
+            profile = (stats or {}).get(name) or self.default_profile(variant)
+            service = profile["overhead"] + profile["rtf"] * duration
+            if service * self.timeout_margin > variant["timeout"]:
+                continue
+
+            depth = depths.get(name, 0)
+            latency = self.queue_wait(variant, depth, profile) + service
+            billed = service
+            if variant["min_containers"] <= depth < variant["max_containers"]:
+                billed += variant["cold_start"] + self.scaledown_window
+            cost = variant["cost_per_hour"] * billed / 3600
+            options.append((cost + value * latency / 3600, latency, name, cost))
+
+        if not options:
+            # Nenhuma variante com folga: a de maior timeout é a que tem mais chance de terminar
+            eligible = [n for n, v in self.variants.items() if v["diarize"] or not diarize] or list(self.variants)
+            return self._decision(max(eligible, key=lambda n: self.variants[n]["timeout"]), "longest_timeout")
+
+        _, latency, name, cost = min(options)
+        reason = "cheapest" if name == min(options, key=lambda o: (o[3], o[1]))[2] else "faster"
+        return self._decision(name, reason, estimated_cost=round(cost, 5), estimated_latency=round(latency, 1))
+
+    def queue_wait(self, variant: Dict[str, Any], depth: int, profile: Dict[str, float]) -> float:
+        """Espera prevista até o job começar, dado quantos jobs a variante já tem em andamento"""
+        if depth < variant["min_containers"]:
+            # Sobra container do pool aquecido
+            return 0.0
+        if depth < variant["max_containers"]:
+            return float(variant["cold_start"])
+        # Todos os containers ocupados: a fila anda max_containers jobs por tempo médio de serviço
+        return (depth - variant["max_containers"] + 1) / variant["max_containers"] * profile["mean_service"]
+
+    def default_profile(self, variant: Dict[str, Any]) -> Dict[str, float]:
+        return {
+            "rtf": variant["rtf"],
+            "overhead": variant["overhead"],
+            "mean_service": variant["overhead"] + variant["rtf"] * 600
+        }
+
+    def learned_stats(self, db: Session) -> Dict[str, Dict[str, float]]:
+        """RTF/overhead ajustados pelo estimador de ETA, para as variantes que já têm amostras suficientes"""
+        if self.eta_estimator is None:
+            return {}
+        stats = {}
+        for name, variant in self.variants.items():
+            model_stats = self.eta_estimator.get_model_stats(db, stats_key(variant["model"], name))
+            if model_stats["samples"]:
+                stats[name] = model_stats
+        return stats
+
+    def queue_depths(self, db: Session) -> Dict[str, int]:
+        """Jobs aguardando ou em processamento por variante, relidos do banco a cada ROUTING_QUEUE_TTL segundos"""
+        if time.monotonic() - self._depths_at > self.depth_ttl:
+            rows = db.query(Job.job_data).filter(
+                Job.status.in_([TranscriptionStatus.PENDING, TranscriptionStatus.PROCESSING])
+            ).all()
+            depths: Dict[str, int] = {}
+            for row in rows:
+                worker = (row.job_data or {}).get("worker") or DEFAULT_WORKER
+                depths[worker] = depths.get(worker, 0) + 1
+            self._depths = depths
+            self._depths_at = time.monotonic()
+        return dict(self._depths)
+
+    def report(self, db: Session) -> Dict[str, Any]:
+        """Variantes habilitadas, fila atual e perfil (aprendido ou inicial) de cada uma"""
+        depths = self.queue_depths(db)
+        stats = self.learned_stats(db)
+        return {
+            "default": self.default,
+            "latency_value": self.latency_value,
+            "variants": {
+                name: {
+                    **variant,
+                    "queue_depth": depths.get(name, 0),
+                    "profile": {k: round(v, 4) for k, v in (stats.get(name) or self.default_profile(variant)).items()},
+                    "learned": name in stats
+                }
+                for name, variant in self.variants.items()
+            }
+        }
+
+    def _decision(self, name: str, reason: str, **estimates) -> Dict[str, Any]:
+        model = self.variants[name]["model"]
+        return {"worker": name, "model": model, "stats_key": stats_key(model, name), "reason": reason, **estimates}
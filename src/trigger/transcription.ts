@@ -6,6 +6,11 @@ interface TranscribePayload {
     file_url?: string;
     language: string;
     webhook_url: string;
+    diarize?: boolean;
+    traceparent?: string;
+    content_hash?: string;
+    worker?: string;
+    model?: string;
 }
 
 interface TranscribeResult {
@@ -27,11 +32,15 @@ export const transcribeAudio = task({
         randomize: false,
     },
     run: async (payload: TranscribePayload): Promise<TranscribeResult> => {
+        // Contexto de trace do job (W3C traceparent) repassado ao Modal e aos webhooks
+        const traceHeaders: Record<string, string> = payload.traceparent ? {traceparent: payload.traceparent} : {};
+
         logger.log("🎵 Iniciando transcrição", {
             job_id: payload.job_id,
             language: payload.language,
             has_file_path: !!payload.file_path,
-            has_file_url: !!payload.file_url
+            has_file_url: !!payload.file_url,
+            worker: payload.worker ?? "t4"
         });
 
         try {
@@ -56,6 +65,7 @@ export const transcribeAudio = task({
                     method: 'POST',
                     headers: {
                         'Content-Type': 'application/json',
+                        ...traceHeaders,
                     },
                     body: JSON.stringify({
                         job_id: payload.job_id,
@@ -75,6 +85,11 @@ export const transcribeAudio = task({
                 file_url: payload.file_url,
                 language: payload.language || "auto",
                 webhook_url: payload.webhook_url,
+                diarize: payload.diarize ?? false,
+                traceparent: payload.traceparent,
+                content_hash: payload.content_hash,
+                worker: payload.worker,
+                model: payload.model,
             };
 
             logger.log("🚀 Preparando chamada para Modal", {
@@ -90,6 +105,7 @@ export const transcribeAudio = task({
 
             const headers: Record<string, string> = {
                 'Content-Type': 'application/json',
+                ...traceHeaders,
             };
 
             if (process.env.MODAL_TOKEN_SECRET) {
@@ -136,6 +152,7 @@ export const transcribeAudio = task({
                     method: 'POST',
                     headers: {
                         'Content-Type': 'application/json',
+                        ...traceHeaders,
                     },
                     body: JSON.stringify({
                         job_id: payload.job_id,
@@ -2,8 +2,9 @@
 # CRIAR ESTE ARQUIVO - ele não existe ainda
 import uuid
 import os
+import fcntl
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List
 import hashlib
 
 
@@ -61,4 +62,71 @@ def format_file_size(size_bytes: int) -> str:
         if size_bytes < 1024.0:
             return f"{size_bytes:.1f} {unit}"
         size_bytes /= 1024.0
-    return f"{size_bytes:.1f} TB"
\ No newline at end of file
+    return f"{size_bytes:.1f} TB"
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Percentil (vizinho mais próximo) de uma lista já ordenada"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 2)
+
+
+def with_timestamp(job_data: Optional[dict], name: str, when: Optional[datetime] = None) -> dict:
+    """Retorna uma cópia de job_data com o marco de tempo registrado (só na primeira vez)"""
+    job_data = dict(job_data or {})
+    timestamps = dict(job_data.get("timestamps") or {})
+    if name not in timestamps:
+        timestamps[name] = (when or datetime.utcnow()).isoformat()
+    job_data["timestamps"] = timestamps
+    return job_data
+
+
+def naive(value: Optional[datetime]) -> Optional[datetime]:
+    """Datetime sem fuso (o banco guarda UTC ingênuo), para comparar com os marcos de job_data"""
+    if value is None:
+        return None
+    return value.replace(tzinfo=None)
+
+
+def parse_iso(value: Optional[str]) -> Optional[datetime]:
+    """Marco ISO de job_data como datetime sem fuso; None se ausente ou inválido"""
+    if not value:
+        return None
+    try:
+        return naive(datetime.fromisoformat(value))
+    except ValueError:
+        return None
+
+
+class ProcessLock:
+    """Lock exclusivo em arquivo (flock) para eleger um único processo entre os workers do gunicorn"""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    def acquire(self) -> bool:
+        """Tenta obter o lock sem bloquear; sem caminho configurado todo processo é líder"""
+        if not self.path or self._fd is not None:
+            return True
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+
+        # O lock é liberado pelo kernel se o processo morrer; outro worker assume no próximo tick
+        self._fd = fd
+        return True
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def release(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,130 @@
+import os
+from prometheus_client import (
+    Histogram, Counter, Gauge, CollectorRegistry, REGISTRY, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+)
+
+# Latência das chamadas ao Trigger.dev por endpoint
+TRIGGER_REQUEST_LATENCY = Histogram(
+    "echo_trigger_request_seconds",
+    "Latência das chamadas HTTP ao Trigger.dev",
+    ["endpoint", "outcome"],
+    buckets=(0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+TRIGGER_RETRIES = Counter(
+    "echo_trigger_retries_total",
+    "Novas tentativas de chamadas ao Trigger.dev",
+    ["endpoint"]
+)
+
+TRIGGER_CIRCUIT_OPEN = Counter(
+    "echo_trigger_circuit_rejections_total",
+    "Chamadas rejeitadas com o circuit breaker do Trigger.dev aberto",
+    ["endpoint"]
+)
+
+# Requisições HTTP (middleware); com PROMETHEUS_MULTIPROC_DIR os valores ficam em arquivos mmap por worker
+HTTP_REQUEST_LATENCY = Histogram(
+    "echo_http_request_seconds",
+    "Latência das requisições HTTP por rota",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+HTTP_IN_FLIGHT = Gauge(
+    "echo_http_requests_in_flight",
+    "Requisições HTTP em andamento",
+    multiprocess_mode="livesum"
+)
+
+UPLOAD_BYTES = Counter(
+    "echo_upload_bytes_total",
+    "Bytes recebidos nas rotas de upload",
+    ["route"]
+)
+
+WEBHOOKS_RECEIVED = Counter(
+    "echo_webhooks_received_total",
+    "Webhooks de status recebidos do worker",
+    ["status"]
+)
+
+CACHE_LOOKUPS = Counter(
+    "echo_cache_lookups_total",
+    "Consultas ao cache Redis de resultados (hit, miss, error)",
+    ["result"]
+)
+
+DB_SESSION_WAIT = Histogram(
+    "echo_db_session_wait_seconds",
+    "Tempo para obter uma conexão do pool ao abrir a sessão do banco",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0, 5.0)
+)
+
+IDEMPOTENT_REQUESTS = Counter(
+    "echo_idempotent_requests_total",
+    "Requisições com Idempotency-Key (new, replayed, waited, conflict, in_progress)",
+    ["route", "outcome"]
+)
+
+DUPLICATE_JOBS_AVOIDED = Counter(
+    "echo_duplicate_jobs_avoided_total",
+    "Jobs (execuções na GPU) não criados porque a requisição era repetição de uma Idempotency-Key",
+    ["route"]
+)
+
+STORAGE_GC_DELETED = Counter(
+    "echo_storage_gc_deleted_files_total",
+    "Arquivos removidos pelo coletor (orphan, finished, expired, quota)",
+    ["reason"]
+)
+
+STORAGE_GC_BYTES = Gauge(
+    "echo_storage_gc_disk_bytes",
+    "Bytes em uploads, downloads temporários e cache após a última varredura",
+    multiprocess_mode="max"
+)
+
+# Via expressa (transcrição síncrona de clipes curtos no processo da API)
+EXPRESS_REQUESTS = Counter(
+    "echo_express_requests_total",
+    "Requisições da via expressa por desfecho (served ou o motivo do desvio para o fluxo assíncrono)",
+    ["outcome"]
+)
+
+EXPRESS_LATENCY = Histogram(
+    "echo_express_latency_seconds",
+    "Latência total das requisições atendidas pela via expressa (upload até a resposta)",
+    buckets=(0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 7.5, 10.0, 20.0, 30.0)
+)
+
+# Streaming via WebSocket: latência entre a chegada do áudio e a legenda correspondente
+STREAM_CAPTION_LATENCY = Histogram(
+    "echo_stream_caption_latency_seconds",
+    "Tempo entre a chegada do áudio e o envio da legenda (partial, final)",
+    ["kind"],
+    buckets=(0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+)
+
+STREAM_SESSIONS = Gauge(
+    "echo_stream_sessions",
+    "Streams de transcrição em tempo real abertos",
+    multiprocess_mode="livesum"
+)
+
+# Roteamento entre as variantes do worker (cpu, t4, a10g)
+ROUTED_JOBS = Counter(
+    "echo_routed_jobs_total",
+    "Jobs despachados por variante do worker, tier e motivo da escolha",
+    ["worker", "tier", "reason"]
+)
+
+
+def render_metrics() -> tuple:
+    """Serializa as métricas no formato texto do Prometheus (agrega os workers em modo multiprocesso)"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
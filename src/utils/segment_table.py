@@ -0,0 +1,296 @@
+import struct
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+import orjson
+
+# Formato binário: MAGIC | u32 tamanho do cabeçalho | cabeçalho JSON | arrays (alinhados em 8 bytes)
+MAGIC = b"ECSG"
+FORMAT_VERSION = 1
+
+SEGMENT_KEYS = {"start", "end", "text", "words", "speaker"}
+WORD_KEYS = {"word", "start", "end", "score", "speaker"}
+
+# Ordem fixa das colunas no arquivo binário
+_COLUMNS = (
+    ("start", np.float64), ("end", np.float64), ("text_offsets", np.int64), ("speaker", np.int32),
+    ("word_offsets", np.int64), ("word_start", np.float64), ("word_end", np.float64),
+    ("word_score", np.float64), ("word_text_offsets", np.int64), ("word_speaker", np.int32),
+    ("has_words", np.bool_),
+)
+
+
+class SegmentTable:
+    """Segmentos em colunas: tempos em arrays float64, textos em offsets + blob UTF-8 e palavras achatadas
+
+    Valores ausentes são NaN (tempos/score) ou -1 (falante). Chaves fora do formato do WhisperX e
+    chaves presentes com valor None ficam em `extras` para que a conversão de/para a lista de dicts
+    seja sem perdas.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], text_blob: bytes, word_blob: bytes,
+                 speakers: List[str], extras: Optional[Dict[int, Dict[str, Any]]] = None,
+                 word_extras: Optional[Dict[int, Dict[str, Any]]] = None):
+        self.start = columns["start"]
+        self.end = columns["end"]
+        self.text_offsets = columns["text_offsets"]
+        self.speaker = columns["speaker"]
+        self.word_offsets = columns["word_offsets"]
+        self.word_start = columns["word_start"]
+        self.word_end = columns["word_end"]
+        self.word_score = columns["word_score"]
+        self.word_text_offsets = columns["word_text_offsets"]
+        self.word_speaker = columns["word_speaker"]
+        self.has_words = columns["has_words"]
+        self.text_blob = text_blob
+        self.word_blob = word_blob
+        self.speakers = speakers
+        self.extras = extras or {}
+        self.word_extras = word_extras or {}
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    @property
+    def nbytes(self) -> int:
+        """Memória ocupada pelos arrays e blobs"""
+        return sum(getattr(self, name).nbytes for name, _ in _COLUMNS) + len(self.text_blob) + len(self.word_blob)
+
+    @classmethod
+    def from_segments(cls, segments: Optional[List[Dict[str, Any]]]) -> "SegmentTable":
+        """Converte a lista de dicts do WhisperX para colunas"""
+        segments = segments or []
+        n = len(segments)
+        start = np.full(n, np.nan)
+        end = np.full(n, np.nan)
+        speaker = np.full(n, -1, dtype=np.int32)
+        has_words = np.zeros(n, dtype=np.bool_)
+        word_offsets = np.zeros(n + 1, dtype=np.int64)
+        texts: List[bytes] = []
+        word_rows: List[Tuple] = []
+        speakers: Dict[str, int] = {}
+        extras: Dict[int, Dict[str, Any]] = {}
+        word_extras: Dict[int, Dict[str, Any]] = {}
+
+        def speaker_code(value) -> int:
+            if value is None:
+                return -1
+            return speakers.setdefault(value, len(speakers))
+
+        for i, segment in enumerate(segments):
+            start[i] = _float(segment.get("start"))
+            end[i] = _float(segment.get("end"))
+            texts.append((segment.get("text") or "").encode("utf-8"))
+            speaker[i] = speaker_code(segment.get("speaker"))
+
+            # None explícito não cabe nas colunas (NaN/-1 significam chave ausente): vai para extras
+            unknown = {key: value for key, value in segment.items() if key not in SEGMENT_KEYS or value is None}
+            if "text" not in segment:
+                unknown["__no_text__"] = True
+            if unknown:
+                extras[i] = unknown
+
+            words = segment.get("words")
+            if words is not None:
+                has_words[i] = True
+                for word in words:
+                    word_unknown = {key: value for key, value in word.items() if key not in WORD_KEYS or value is None}
+                    if "word" not in word:
+                        word_unknown["__no_word__"] = True
+                    if word_unknown:
+                        word_extras[len(word_rows)] = word_unknown
+                    word_rows.append((
+                        _float(word.get("start")), _float(word.get("end")), _float(word.get("score")),
+                        (word.get("word") or "").encode("utf-8"), speaker_code(word.get("speaker"))
+                    ))
+            word_offsets[i + 1] = len(word_rows)
+
+        text_offsets, text_blob = _pack_strings(texts)
+        if word_rows:
+            word_start, word_end, word_score, word_texts, word_speaker = zip(*word_rows)
+        else:
+            word_start = word_end = word_score = word_texts = word_speaker = ()
+        word_text_offsets, word_blob = _pack_strings(list(word_texts))
+
+        columns = {
+            "start": start, "end": end, "text_offsets": text_offsets, "speaker": speaker,
+            "word_offsets": word_offsets,
+            "word_start": np.array(word_start, dtype=np.float64),
+            "word_end": np.array(word_end, dtype=np.float64),
+            "word_score": np.array(word_score, dtype=np.float64),
+            "word_text_offsets": word_text_offsets,
+            "word_speaker": np.array(word_speaker, dtype=np.int32),
+            "has_words": has_words,
+        }
+        return cls(columns, text_blob, word_blob, list(speakers), extras, word_extras)
+
+    def texts(self) -> List[str]:
+        return _unpack_strings(self.text_offsets, self.text_blob)
+
+    def to_segments(self) -> List[Dict[str, Any]]:
+        """Reconstrói a lista de dicts (formato da API e do webhook)"""
+        texts = self.texts()
+        word_texts = _unpack_strings(self.word_text_offsets, self.word_blob)
+        start, end = self.start.tolist(), self.end.tolist()
+        word_start, word_end, word_score = self.word_start.tolist(), self.word_end.tolist(), self.word_score.tolist()
+        speaker, word_speaker = self.speaker.tolist(), self.word_speaker.tolist()
+        word_offsets = self.word_offsets.tolist()
+        has_words = self.has_words.tolist()
+
+        segments = []
+        for i in range(len(texts)):
+            segment: Dict[str, Any] = {}
+            _put(segment, "start", start[i])
+            _put(segment, "end", end[i])
+            segment["text"] = texts[i]
+
+            if has_words[i]:
+                words = []
+                for j in range(word_offsets[i], word_offsets[i + 1]):
+                    word: Dict[str, Any] = {"word": word_texts[j]}
+                    _put(word, "start", word_start[j])
+                    _put(word, "end", word_end[j])
+                    _put(word, "score", word_score[j])
+                    if word_speaker[j] >= 0:
+                        word["speaker"] = self.speakers[word_speaker[j]]
+                    if j in self.word_extras:
+                        extra = dict(self.word_extras[j])
+                        if extra.pop("__no_word__", False):
+                            del word["word"]
+                        word.update(extra)
+                    words.append(word)
+                segment["words"] = words
+
+            if speaker[i] >= 0:
+                segment["speaker"] = self.speakers[speaker[i]]
+            if i in self.extras:
+                extra = dict(self.extras[i])
+                if extra.pop("__no_text__", False):
+                    del segment["text"]
+                segment.update(extra)
+            segments.append(segment)
+        return segments
+
+    def to_bytes(self) -> bytes:
+        """Serializa no formato binário compacto (colunas little-endian)"""
+        header = {
+            "version": FORMAT_VERSION,
+            "segments": len(self),
+            "words": len(self.word_start),
+            "speakers": self.speakers,
+            "extras": {str(k): v for k, v in self.extras.items()},
+            "word_extras": {str(k): v for k, v in self.word_extras.items()},
+            "text_bytes": len(self.text_blob),
+            "word_bytes": len(self.word_blob),
+        }
+        header_bytes = orjson.dumps(header)
+        parts = [MAGIC, struct.pack("<I", len(header_bytes)), header_bytes]
+        size = 8 + len(header_bytes)
+        for name, dtype in _COLUMNS:
+            data = np.ascontiguousarray(getattr(self, name), dtype=np.dtype(dtype).newbyteorder("<")).tobytes()
+            padding = -size % 8
+            parts.append(b"\0" * padding)
+            parts.append(data)
+            size += padding + len(data)
+        parts.extend([self.text_blob, self.word_blob])
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SegmentTable":
+        """Lê o formato binário; os arrays são views sobre o buffer (sem cópia)"""
+        if data[:4] != MAGIC:
+            raise ValueError("Formato de segmentos desconhecido")
+        (header_len,) = struct.unpack_from("<I", data, 4)
+        header = orjson.loads(data[8:8 + header_len])
+        if header["version"] != FORMAT_VERSION:
+            raise ValueError(f"Versão de segmentos não suportada: {header['version']}")
+
+        n, n_words = header["segments"], header["words"]
+        lengths = {
+            "start": n, "end": n, "text_offsets": n + 1, "speaker": n, "word_offsets": n + 1,
+            "word_start": n_words, "word_end": n_words, "word_score": n_words,
+            "word_text_offsets": n_words + 1, "word_speaker": n_words, "has_words": n,
+        }
+        position = 8 + header_len
+        columns = {}
+        for name, dtype in _COLUMNS:
+            dtype = np.dtype(dtype).newbyteorder("<")
+            position += -position % 8
+            columns[name] = np.frombuffer(data, dtype=dtype, count=lengths[name], offset=position)
+            position += lengths[name] * dtype.itemsize
+
+        text_blob = data[position:position + header["text_bytes"]]
+        position += header["text_bytes"]
+        word_blob = data[position:position + header["word_bytes"]]
+
+        return cls(
+            columns, text_blob, word_blob, header["speakers"],
+            {int(k): v for k, v in header["extras"].items()},
+            {int(k): v for k, v in header["word_extras"].items()},
+        )
+
+    def to_srt(self) -> str:
+        """SRT com os tempos formatados de forma vetorizada"""
+        starts = format_timestamps(self.start, ",")
+        ends = format_timestamps(self.end, ",")
+        blocks = [
+            f"{i}\n{start} --> {end}\n{text.strip()}\n"
+            for i, (start, end, text) in enumerate(zip(starts, ends, self.texts()), 1)
+        ]
+        return "\n".join(blocks)
+
+    def to_vtt(self) -> str:
+        """WebVTT com os tempos formatados de forma vetorizada"""
+        starts = format_timestamps(self.start, ".")
+        ends = format_timestamps(self.end, ".")
+        blocks = [f"{start} --> {end}\n{text.strip()}\n" for start, end, text in zip(starts, ends, self.texts())]
+        return "\n".join(["WEBVTT\n"] + blocks)
+
+
+def format_timestamps(seconds: np.ndarray, separator: str) -> List[str]:
+    """Formata HH:MM:SS<sep>mmm para todo o array de uma vez (dígitos montados numa matriz de bytes)"""
+    ms = np.round(np.nan_to_num(np.asarray(seconds, dtype=np.float64), nan=0.0).clip(min=0) * 1000).astype(np.int64)
+    if len(ms) == 0:
+        return []
+
+    hours, rest = np.divmod(ms, 3_600_000)
+    minutes, rest = np.divmod(rest, 60_000)
+    secs, millis = np.divmod(rest, 1000)
+
+    hour_width = max(2, len(str(int(hours.max()))))
+    fields = [(hours, hour_width), (b":", 0), (minutes, 2), (b":", 0), (secs, 2), (separator.encode(), 0), (millis, 3)]
+    width = hour_width + 10
+    out = np.empty((len(ms), width), dtype=np.uint8)
+
+    column = 0
+    for value, digits in fields:
+        if digits == 0:
+            out[:, column] = value[0]
+            column += 1
+            continue
+        for position in range(digits):
+            out[:, column + position] = ord("0") + (value // 10 ** (digits - 1 - position)) % 10
+        column += digits
+
+    return out.view(f"S{width}").ravel().astype(str).tolist()
+
+
+def _pack_strings(values: List[bytes]) -> Tuple[np.ndarray, bytes]:
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    if values:
+        np.cumsum([len(value) for value in values], out=offsets[1:])
+    return offsets, b"".join(values)
+
+
+def _unpack_strings(offsets: np.ndarray, blob: bytes) -> List[str]:
+    bounds = offsets.tolist()
+    return [blob[bounds[i]:bounds[i + 1]].decode("utf-8") for i in range(len(bounds) - 1)]
+
+
+def _float(value) -> float:
+    return np.nan if value is None else float(value)
+
+
+def _put(target: Dict[str, Any], key: str, value: float):
+    # NaN representa chave ausente no dict original
+    if value == value:
+        target[key] = value
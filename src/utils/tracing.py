@@ -0,0 +1,150 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Optional, Dict, Any
+from opentelemetry import trace
+from opentelemetry.context import Context
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SpanExporter, SpanExportResult
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.trace import SpanContext, TraceFlags, NonRecordingSpan
+from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATIO = float(os.getenv("TRACING_SAMPLE_RATIO", 0.05))
+
+_propagator = TraceContextTextMapPropagator()
+tracer = trace.get_tracer("echo")
+
+
+class JsonFileSpanExporter(SpanExporter):
+    """Grava cada span como uma linha JSON num arquivo local (inspeção sem coletor externo)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans) -> SpanExportResult:
+        lines = [json.dumps(json.loads(span.to_json()), ensure_ascii=False) for span in spans]
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+
+def setup_tracing(service_name: str = "echo-api"):
+    """Configura o provider com amostragem por trace_id e o exportador local (TRACING_EXPORTER)"""
+    exporter_name = os.getenv("TRACING_EXPORTER", "none").lower()
+    if exporter_name == "none":
+        return
+
+    if exporter_name == "file":
+        exporter = JsonFileSpanExporter(os.getenv("TRACING_FILE", "traces.jsonl"))
+    else:
+        exporter = ConsoleSpanExporter()
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": service_name, "service.pid": os.getpid()}),
+        sampler=ParentBased(TraceIdRatioBased(SAMPLE_RATIO))
+    )
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    logger.info(f"Tracing ativo ({exporter_name}, amostragem {SAMPLE_RATIO})")
+
+
+def shutdown_tracing():
+    provider = trace.get_tracer_provider()
+    if hasattr(provider, "shutdown"):
+        provider.shutdown()
+
+
+def job_trace_id(job_id: str) -> Optional[int]:
+    """trace_id derivado do job_id: qualquer serviço chega ao mesmo trace só com o job_id
+
+    Usa os 16 primeiros bytes do sha256 e não o UUID em si: num UUID4 os 64 bits baixos começam sempre
+    pelos bits de variante `10` (>= 2^63), e a amostragem por razão abaixo de 0.5 não pegaria nenhum job.
+    """
+    if not job_id or not isinstance(job_id, str):
+        return None
+    return int.from_bytes(hashlib.sha256(job_id.encode()).digest()[:16], "big") or None
+
+
+def job_context(job_id: str, carrier: Optional[Dict[str, str]] = None) -> Context:
+    """Contexto pai do job: traceparent recebido ou, na falta dele, um pai sintético derivado do job_id"""
+    if carrier and carrier.get("traceparent"):
+        return _propagator.extract(carrier)
+
+    trace_id = job_trace_id(job_id)
+    if not trace_id:
+        return Context()
+
+    # Mesma regra do TraceIdRatioBased: a decisão de amostragem é igual em todos os saltos
+    sampled = (trace_id & 0xFFFFFFFFFFFFFFFF) < round(SAMPLE_RATIO * (1 << 64))
+    parent = SpanContext(
+        trace_id=trace_id,
+        span_id=trace_id & 0xFFFFFFFFFFFFFFFF or 1,
+        is_remote=True,
+        trace_flags=TraceFlags(TraceFlags.SAMPLED if sampled else TraceFlags.DEFAULT)
+    )
+    return trace.set_span_in_context(NonRecordingSpan(parent))
+
+
+@contextmanager
+def job_span(name: str, job_id: str, carrier: Optional[Dict[str, str]] = None, **attributes):
+    """Span raiz de uma etapa do job, ligado ao trace do job_id"""
+    with tracer.start_as_current_span(name, context=job_context(job_id, carrier)) as span:
+        if span.is_recording():
+            span.set_attribute("job.id", job_id)
+            for key, value in attributes.items():
+                if value is not None:
+                    span.set_attribute(key, value)
+        yield span
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Span filho do contexto atual (sem custo quando não há trace amostrado)"""
+    if not trace.get_current_span().is_recording():
+        yield None
+        return
+    with tracer.start_as_current_span(name, attributes={k: v for k, v in attributes.items() if v is not None}) as current:
+        yield current
+
+
+def inject_traceparent(carrier: Dict[str, Any], context: Optional[Context] = None) -> Dict[str, Any]:
+    """Adiciona traceparent (W3C) do span atual (ou do contexto dado) ao dicionário de headers/payload"""
+    _propagator.inject(carrier, context=context)
+    return carrier
+
+
+def instrument_engine(engine):
+    """Spans para as queries SQL quando há um trace amostrado em andamento"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if trace.get_current_span().is_recording():
+            context._otel_span = tracer.start_span(
+                "db.query", attributes={"db.system": engine.dialect.name, "db.statement": statement[:200]}
+            )
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        db_span = getattr(context, "_otel_span", None)
+        if db_span is not None:
+            db_span.end()
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        db_span = getattr(exception_context.execution_context, "_otel_span", None)
+        if db_span is not None:
+            db_span.record_exception(exception_context.original_exception)
+            db_span.set_status(trace.Status(trace.StatusCode.ERROR))
+            db_span.end()
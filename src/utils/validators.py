@@ -1,10 +1,10 @@
 # ARQUIVO: src/utils/validators.py
 # CRIAR ESTE ARQUIVO - ele não existe ainda
-import aiohttp
 from fastapi import UploadFile
-from typing import Dict, List
-import magic
+from pathlib import Path
+from typing import Dict, Optional
 import os
+import hashlib
 
 # Formatos de áudio/vídeo suportados
 SUPPORTED_AUDIO_FORMATS = {
@@ -21,17 +21,41 @@ SUPPORTED_VIDEO_FORMATS = {
 
 SUPPORTED_FORMATS = SUPPORTED_AUDIO_FORMATS | SUPPORTED_VIDEO_FORMATS
 
+# Extensões aceitas no nome do objeto salvo (o formato real é validado pelo conteúdo)
+SUPPORTED_EXTENSIONS = {
+    '.mp3', '.wav', '.ogg', '.oga', '.opus', '.flac', '.aac', '.m4a', '.webm',
+    '.mp4', '.mpeg', '.mpg', '.mov', '.avi', '.ogv', '.flv', '.3gp'
+}
+
+
+def safe_extension(filename: Optional[str]) -> str:
+    """Extensão do nome enviado pelo cliente, só se estiver na lista; senão, nenhuma"""
+    extension = Path(filename or "").suffix.lower()
+    return extension if extension in SUPPORTED_EXTENSIONS else ""
+
 
 async def validate_file(file: UploadFile) -> Dict[str, any]:
     """Valida arquivo de upload"""
 
     # Verificar tamanho
-    max_size = int(os.getenv("MAX_FILE_SIZE", 500 * 1024 * 1024))  # 500MB
     file_size = 0
     content = await file.read()
     file_size = len(content)
     await file.seek(0)  # Reset file pointer
 
+    # Verificar tipo MIME pelos primeiros 1024 bytes
+    result = validate_content(content[:1024], file_size)
+    if result["valid"]:
+        # Hash do conteúdo (já está em memória): chave do cache de áudio decodificado no worker
+        result["sha256"] = hashlib.sha256(content).hexdigest()
+    return result
+
+
+def validate_content(file_content: bytes, file_size: int) -> Dict[str, any]:
+    """Valida tamanho e tipo MIME a partir do início do arquivo (upload pela API ou direto no armazenamento)"""
+
+    max_size = int(os.getenv("MAX_FILE_SIZE", 500 * 1024 * 1024))  # 500MB
+
     if file_size > max_size:
         return {
             "valid": False,
@@ -46,8 +70,7 @@ async def validate_file(file: UploadFile) -> Dict[str, any]:
 
     # Verificar tipo MIME
     try:
-        file_content = await file.read(1024)  # Lê apenas os primeiros 1024 bytes
-        await file.seek(0)  # Reset file pointer
+        import magic  # import tardio: carrega a libmagic só no primeiro upload
 
         mime_type = magic.from_buffer(file_content, mime=True)
 
@@ -73,12 +96,11 @@ async def validate_file(file: UploadFile) -> Dict[str, any]:
 
 async def validate_url(url: str) -> bool:
     """Valida se URL é acessível"""
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.head(url, timeout=10) as response:
-                return response.status == 200
-    except Exception:
-        return False
+    # Import tardio: src.services importa database.models, que importa src.utils (ciclo na importação)
+    from ..services.http_session import probe_url
+
+    probe = await probe_url(url)
+    return probe is not None and probe["status"] == 200
 
 
 def validate_language_code(language: str) -> bool:
@@ -0,0 +1,21 @@
+import pytest
+from sqlalchemy.exc import TimeoutError
+
+from src.database import connection
+
+
+def test_get_db_closes_session_when_checkout_fails(monkeypatch):
+    closed = []
+
+    class Session:
+        def connection(self):
+            raise TimeoutError("QueuePool limit reached")
+
+        def close(self):
+            closed.append(True)
+
+    monkeypatch.setattr(connection, "SessionLocal", Session)
+
+    with pytest.raises(TimeoutError):
+        next(connection.get_db())
+    assert closed == [True]
@@ -0,0 +1,111 @@
+import io
+import wave
+from urllib.parse import urlsplit
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.api.routes import upload
+from src.database.connection import Base, get_db
+from src.database.models import Job
+from src.models.transcription import TranscriptionStatus
+from src.services import storage
+from src.services.eta_estimator import ETAEstimator
+from src.services.media_probe import MediaProbe
+from src.services.worker_router import WorkerRouter
+
+
+def _wav() -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(16000)
+        f.writeframes(b"\0\0" * 16000)
+    return buffer.getvalue()
+
+
+def _setup(tmp_path, monkeypatch):
+    monkeypatch.setenv("APP_URL", "http://testserver")
+    monkeypatch.setenv("TRIGGER_SECRET_KEY", "tr_test")
+    monkeypatch.setattr(storage, "_storage", storage.LocalStorage(str(tmp_path)))
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    app = FastAPI()
+    app.include_router(upload.router, prefix="/api/v1")
+    app.state.worker_router = WorkerRouter()
+    app.state.eta_estimator = ETAEstimator()
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    return TestClient(app), Session
+
+
+def _put(client, upload_url: str, content: bytes = b""):
+    url = urlsplit(upload_url)
+    return client.put(f"{url.path}?{url.query}", content=content or _wav())
+
+
+def test_concurrent_complete_returns_existing_job(tmp_path, monkeypatch):
+    client, Session = _setup(tmp_path, monkeypatch)
+    presigned = client.post("/api/v1/upload/presign", json={"filename": "a.wav"}).json()
+    assert _put(client, presigned["upload_url"]).status_code == 200
+
+    async def concurrent_confirm(self, source):
+        # Outra confirmação do mesmo upload grava o job entre a consulta e o insert desta
+        db = Session()
+        db.add(Job(id=presigned["job_id"], status=TranscriptionStatus.PROCESSING, language="auto"))
+        db.commit()
+        db.close()
+        return None
+
+    monkeypatch.setattr(MediaProbe, "probe", concurrent_confirm)
+
+    response = client.post("/api/v1/upload/complete", json={"upload_token": presigned["upload_token"]})
+
+    assert response.status_code == 200
+    assert response.json()["job_id"] == presigned["job_id"]
+    assert response.json()["status"] == "processing"
+    assert response.json()["message"] == "Upload já confirmado"
+
+
+def test_put_after_completion_is_rejected(tmp_path, monkeypatch):
+    client, Session = _setup(tmp_path, monkeypatch)
+    presigned = client.post("/api/v1/upload/presign", json={"filename": "a.wav"}).json()
+    assert _put(client, presigned["upload_url"]).status_code == 200
+
+    db = Session()
+    db.add(Job(id=presigned["job_id"], status=TranscriptionStatus.PENDING, language="auto"))
+    db.commit()
+    db.close()
+    original = (tmp_path / f"{presigned['job_id']}.wav").read_bytes()
+
+    response = _put(client, presigned["upload_url"], b"outro arquivo")
+
+    assert response.status_code == 409
+    assert (tmp_path / f"{presigned['job_id']}.wav").read_bytes() == original
+
+
+def test_presign_key_keeps_only_known_extensions(tmp_path, monkeypatch):
+    client, _ = _setup(tmp_path, monkeypatch)
+
+    presigned = client.post("/api/v1/upload/presign", json={"filename": "audio.mp3#x?y=1"}).json()
+    # Extensão fora da lista: a chave fica só com o id do job e a URL assinada continua válida
+    assert _put(client, presigned["upload_url"]).status_code == 200
+    assert (tmp_path / presigned["job_id"]).exists()
+
+    presigned = client.post("/api/v1/upload/presign", json={"filename": "Gravação.WAV"}).json()
+    assert _put(client, presigned["upload_url"]).status_code == 200
+    assert (tmp_path / f"{presigned['job_id']}.wav").exists()
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from src.services import media_probe
+from src.services.media_probe import MediaProbe
+
+OUTPUT = b'{"format": {"duration": "12.5", "format_name": "mp3"}, "streams": [{"codec_type": "audio"}]}'
+
+
+@pytest.fixture
+def commands(monkeypatch):
+    """ffprobe falso: registra a linha de comando e devolve metadados fixos"""
+    recorded = []
+
+    async def fake_exec(*cmd, **kwargs):
+        recorded.append(list(cmd))
+
+        class Process:
+            returncode = 0
+
+            async def communicate(self):
+                return OUTPUT, b""
+
+        return Process()
+
+    monkeypatch.setattr(media_probe.asyncio, "create_subprocess_exec", fake_exec)
+    return recorded
+
+
+@pytest.mark.parametrize("source, protocols", [
+    ("https://example.com/a.mp3?sig=1", "http,https,tcp,tls"),
+    ("http://example.com/a.mp3", "http,https,tcp,tls"),
+    ("uploads/job.mp3", "file"),
+    ("/tmp/transcription_downloads/job_normalized.ogg", "file"),
+])
+def test_protocol_whitelist(commands, source, protocols):
+    info = asyncio.run(MediaProbe().probe(source))
+
+    assert info["duration"] == 12.5
+    cmd = commands[0]
+    assert cmd[cmd.index("-protocol_whitelist") + 1] == protocols
+    assert cmd[-1] == source
+
+
+@pytest.mark.parametrize("source", [
+    "file:///etc/passwd",
+    "ftp://example.com/a.mp3",
+    "concat:/etc/passwd|/etc/hosts",
+    "data:audio/mp3;base64,AAAA",
+    "-i",
+])
+def test_rejects_other_schemes(commands, source):
+    assert asyncio.run(MediaProbe().probe(source)) is None
+    assert commands == []
@@ -0,0 +1,95 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import textwrap
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Schema gerado pelo create_all do modelo original, antes de batch_id/media_key/result_segments_bin
+BASELINE_SCHEMA = """
+CREATE TABLE jobs (
+    id VARCHAR NOT NULL,
+    trigger_job_id VARCHAR,
+    status VARCHAR(10) NOT NULL,
+    created_at DATETIME DEFAULT (CURRENT_TIMESTAMP) NOT NULL,
+    updated_at DATETIME DEFAULT (CURRENT_TIMESTAMP) NOT NULL,
+    completed_at DATETIME,
+    file_path VARCHAR,
+    file_url VARCHAR,
+    language VARCHAR NOT NULL,
+    webhook_url VARCHAR,
+    result_text TEXT,
+    result_segments JSON,
+    result_language VARCHAR,
+    duration VARCHAR,
+    error_message TEXT,
+    metadata JSON,
+    PRIMARY KEY (id)
+);
+CREATE INDEX ix_jobs_trigger_job_id ON jobs (trigger_job_id);
+INSERT INTO jobs (id, status, language, result_text, result_segments, metadata)
+VALUES ('old-job', 'COMPLETED', 'pt', 'olá', '[{"start": 0.0, "end": 1.0, "text": "olá"}]', '{}');
+"""
+
+# Inicialização da aplicação seguida de uma leitura pelo ORM (interpretador limpo: o engine lê DATABASE_URL)
+STARTUP = textwrap.dedent("""
+    from src.database.connection import create_db_and_tables, SessionLocal
+    from src.database.models import Job
+    create_db_and_tables()
+    create_db_and_tables()
+    db = SessionLocal()
+    job = db.query(Job).filter(Job.id == "old-job").first()
+    print(job.batch_id, job.media_key, job.segments if job else None)
+    print(db.query(Job).filter(Job.batch_id == "x").count())
+""")
+
+
+def _start(db_path) -> str:
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}"}
+    result = subprocess.run([sys.executable, "-c", STARTUP], cwd=ROOT, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def _columns(db_path) -> set:
+    with sqlite3.connect(db_path) as conn:
+        return {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+
+
+def test_baseline_database_is_migrated(tmp_path):
+    db_path = tmp_path / "baseline.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.executescript(BASELINE_SCHEMA)
+
+    output = _start(db_path)
+
+    assert output.splitlines()[0] == "None None [{'start': 0.0, 'end': 1.0, 'text': 'olá'}]"
+    assert {"batch_id", "media_key", "result_segments_bin"} <= _columns(db_path)
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT version_num FROM alembic_version").fetchone() == ("0004_jobs_result_segments_bin",)
+        indexes = {row[1] for row in conn.execute("PRAGMA index_list(jobs)")}
+    assert {"ix_jobs_batch_id", "ix_jobs_media_key", "ix_jobs_status_updated_at"} <= indexes
+
+
+def test_partially_migrated_database_without_version_table(tmp_path):
+    """Banco criado por create_all depois do batch_id, mas antes das migrações existirem"""
+    db_path = tmp_path / "partial.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.executescript(BASELINE_SCHEMA)
+        conn.execute("ALTER TABLE jobs ADD COLUMN batch_id VARCHAR")
+        conn.execute("CREATE INDEX ix_jobs_batch_id ON jobs (batch_id)")
+
+    _start(db_path)
+
+    assert {"batch_id", "media_key", "result_segments_bin"} <= _columns(db_path)
+
+
+def test_fresh_database(tmp_path):
+    db_path = tmp_path / "fresh.db"
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}"}
+    script = "from src.database.connection import create_db_and_tables; create_db_and_tables()"
+    result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=env, capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
+    assert {"batch_id", "media_key", "result_segments_bin"} <= _columns(db_path)
@@ -0,0 +1,107 @@
+import asyncio
+import types
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.api.routes import transcription, webhooks
+from src.database.connection import Base, get_db
+from src.database.models import Job
+from src.models.transcription import TranscriptionStatus
+from src.services.job_reconciler import JobReconciler, POLICY_FAIL
+
+HEADERS = {"Authorization": "Bearer x"}
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+
+class FakeTrigger:
+    circuit_breaker = types.SimpleNamespace(state="closed")
+
+    async def cancel_job(self, trigger_job_id):
+        return True
+
+    async def get_job_status(self, trigger_job_id):
+        return {"status": "COMPLETED", "output": {"success": False, "error": "boom"}}
+
+
+def _setup():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    app = FastAPI()
+    app.include_router(transcription.router, prefix="/api/v1")
+    app.include_router(webhooks.router, prefix="/webhooks")
+    app.state.redis_client = FakeRedis()
+    app.state.trigger_client = FakeTrigger()
+
+    def override_get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+
+    db = Session()
+    db.add(Job(id="job-1", trigger_job_id="run-1", status=TranscriptionStatus.PENDING, language="pt"))
+    db.commit()
+    db.close()
+    return app, Session
+
+
+def test_webhook_only_caches_final_results():
+    app, _ = _setup()
+    client = TestClient(app)
+    redis = app.state.redis_client
+    # Entrada antiga (ex.: gravada antes do deploy) com o job ainda pendente
+    redis.data["job:job-1"] = b'{"status": "pending"}'
+
+    client.post("/webhooks/transcription", json={"job_id": "job-1", "status": "processing"})
+    assert "job:job-1" not in redis.data
+    assert client.get("/api/v1/transcription/job-1", headers=HEADERS).json()["status"] == "processing"
+    assert "job:job-1" not in redis.data
+
+    client.post("/webhooks/transcription", json={"job_id": "job-1", "status": "completed", "text": "olá"})
+    assert b"completed" in redis.data["job:job-1"]
+
+
+def test_cancel_invalidates_cache():
+    app, _ = _setup()
+    client = TestClient(app)
+    app.state.redis_client.data["job:job-1"] = b'{"status": "pending"}'
+
+    assert client.delete("/api/v1/transcription/job-1", headers=HEADERS).status_code == 200
+    assert "job:job-1" not in app.state.redis_client.data
+    assert client.get("/api/v1/transcription/job-1", headers=HEADERS).json()["status"] == "failed"
+
+
+def test_reconciler_invalidates_repaired_jobs(monkeypatch):
+    monkeypatch.setenv("RECONCILER_PENDING_STALE_AFTER", "-60")
+    app, Session = _setup()
+    redis = app.state.redis_client
+    redis.data["job:job-1"] = b'{"status": "pending"}'
+
+    reconciler = JobReconciler(FakeTrigger(), session_factory=Session, redis_client=redis)
+    reconciler.policy = POLICY_FAIL
+    report = asyncio.run(reconciler.sweep())
+
+    assert report["failed"] == 1
+    assert "job:job-1" not in redis.data
@@ -0,0 +1,30 @@
+from src.utils.segment_table import SegmentTable
+
+
+SEGMENTS = [
+    {
+        "start": 0.0, "end": 1.5, "text": " olá mundo", "speaker": "SPEAKER_00",
+        "words": [
+            {"word": "olá", "start": 0.0, "end": 0.5, "score": 0.9, "speaker": "SPEAKER_00"},
+            {"word": "mundo", "start": None, "end": None, "score": None, "speaker": None},
+        ],
+    },
+    {"start": 1.5, "end": 2.0, "text": None, "speaker": None, "words": None},
+    {"start": None, "end": 3.0, "avg_logprob": -0.2},
+    {"start": 3.0, "end": 4.0, "text": "sem palavra", "words": [{"start": 3.0, "end": 3.5}, {"word": None}]},
+    {"start": 4.0, "end": 5.0, "text": "", "words": []},
+]
+
+
+def test_round_trip_is_lossless():
+    table = SegmentTable.from_segments(SEGMENTS)
+
+    assert table.to_segments() == SEGMENTS
+    assert SegmentTable.from_bytes(table.to_bytes()).to_segments() == SEGMENTS
+
+
+def test_none_text_renders_as_empty_caption():
+    table = SegmentTable.from_segments([{"start": 0.0, "end": 1.0, "text": None}])
+
+    assert table.texts() == [""]
+    assert table.to_srt() == "1\n00:00:00,000 --> 00:00:01,000\n\n"
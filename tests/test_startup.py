@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_gunicorn_on_starting_creates_schema(tmp_path):
+    """on_starting roda num interpretador limpo (ordem de importação do master do gunicorn)"""
+    script = textwrap.dedent("""
+        import runpy, types
+        config = runpy.run_path("gunicorn.conf.py")
+        server = types.SimpleNamespace(
+            log=types.SimpleNamespace(info=print),
+            cfg=types.SimpleNamespace(workers=1)
+        )
+        config["on_starting"](server)
+    """)
+    env = {
+        **os.environ,
+        "ECHO_RUN_DIR": str(tmp_path / "run"),
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'startup.db'}",
+        "PROMETHEUS_MULTIPROC_DIR": str(tmp_path / "run" / "metrics")
+    }
+    result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=env, capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
+    assert "Schema do banco pronto" in result.stdout
+    assert (tmp_path / "startup.db").exists()
@@ -0,0 +1,103 @@
+import asyncio
+import os
+import time
+import uuid
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.api.routes import stats
+from src.database.connection import Base
+from src.database.models import Job
+from src.models.transcription import TranscriptionStatus
+from src.services.storage_gc import StorageSweeper
+
+HEADERS = {"Authorization": "Bearer x"}
+
+
+def _sweeper(tmp_path, monkeypatch, **env) -> StorageSweeper:
+    for name, value in env.items():
+        monkeypatch.setenv(name, str(value))
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    sweeper = StorageSweeper(session_factory=sessionmaker(bind=engine))
+    directories = []
+    for kind in ("upload", "temp", "cache"):
+        (tmp_path / kind).mkdir()
+        directories.append((str(tmp_path / kind), kind))
+    sweeper._directories = lambda: directories
+    return sweeper
+
+
+def _write(path, size: int, age: float = 0):
+    path.write_bytes(b"\0" * size)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+
+
+def test_hardlinks_are_counted_once(tmp_path, monkeypatch):
+    sweeper = _sweeper(tmp_path, monkeypatch)
+    job_id = str(uuid.uuid4())
+    db = sweeper.session_factory()
+    db.add(Job(id=job_id, status=TranscriptionStatus.PROCESSING, language="pt"))
+    db.commit()
+    db.close()
+
+    _write(tmp_path / "cache" / "abc.ogg", 1000)
+    os.link(tmp_path / "cache" / "abc.ogg", tmp_path / "upload" / f"{job_id}.ogg")
+
+    report = asyncio.run(sweeper.sweep())
+
+    assert report["scanned"] == 2
+    assert report["total_bytes"] == 1000
+
+
+def test_partial_files_are_not_evicted(tmp_path, monkeypatch):
+    sweeper = _sweeper(tmp_path, monkeypatch, STORAGE_GC_QUOTA_BYTES=100)
+    _write(tmp_path / "cache" / "old.ogg.part", 1000, age=3600)
+    _write(tmp_path / "cache" / "new.ogg", 1000)
+
+    report = asyncio.run(sweeper.sweep())
+
+    assert (tmp_path / "cache" / "old.ogg.part").exists()
+    assert not (tmp_path / "cache" / "new.ogg").exists()
+    assert report["deleted"] == {"quota": 1}
+
+
+def _client(sweeper) -> TestClient:
+    app = FastAPI()
+    app.include_router(stats.router, prefix="/api/v1")
+    app.state.storage_sweeper = sweeper
+    return TestClient(app)
+
+
+def test_manual_sweep_requires_auth(tmp_path, monkeypatch):
+    monkeypatch.delenv("JWT_SECRET", raising=False)
+    client = _client(_sweeper(tmp_path, monkeypatch))
+
+    assert client.get("/api/v1/stats/storage?run=true").status_code == 403
+    assert client.get("/api/v1/stats/storage?run=true", headers=HEADERS).status_code == 403
+    assert client.get("/api/v1/stats/storage", headers=HEADERS).status_code == 200
+
+
+def test_manual_sweep_takes_the_process_lock(tmp_path, monkeypatch):
+    import jwt
+
+    lock_file = tmp_path / "storage_gc.lock"
+    sweeper = _sweeper(tmp_path, monkeypatch, JWT_SECRET="segredo", STORAGE_GC_LOCK_FILE=lock_file)
+    other = StorageSweeper(session_factory=sweeper.session_factory)
+    client = _client(sweeper)
+    headers = {"Authorization": f"Bearer {jwt.encode({'user': 'admin'}, 'segredo', algorithm='HS256')}"}
+
+    # Outro processo segura o lock: a varredura manual não roda em paralelo com a dele
+    assert other._lock.acquire()
+    assert client.get("/api/v1/stats/storage?run=true", headers=headers).status_code == 409
+
+    other._lock.release()
+    response = client.get("/api/v1/stats/storage?run=true", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["scanned"] == 0
+    sweeper._lock.release()
@@ -0,0 +1,123 @@
+import asyncio
+import types
+
+import numpy as np
+
+from src.services.stream_transcriber import StreamSession, SAMPLE_RATE
+
+
+class FakeExpress:
+    """Modelo que não devolve segmentos (ex.: ruído contínuo) e registra o áudio recebido"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def run(self, audio, language=None, initial_prompt=None):
+        self.calls.append(len(audio))
+        return [], types.SimpleNamespace(language="pt")
+
+
+class SegmentExpress:
+    """Modelo que devolve um segmento por segundo completo do buffer (timestamps relativos ao buffer)"""
+
+    def __init__(self, during_run=None):
+        self.calls = []
+        self.during_run = during_run
+
+    async def run(self, audio, language=None, initial_prompt=None):
+        self.calls.append(len(audio))
+        if self.during_run:
+            self.during_run()
+        seconds = len(audio) // SAMPLE_RATE
+        segments = [{"start": float(i), "end": float(i + 1), "text": f"s{i}"} for i in range(seconds)]
+        return segments, types.SimpleNamespace(language="pt")
+
+
+def _noise(seconds: float) -> np.ndarray:
+    return (np.random.default_rng(0).standard_normal(int(seconds * SAMPLE_RATE)) * 0.1).astype(np.float32)
+
+
+def _silence(seconds: float) -> np.ndarray:
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+
+def _run(session: StreamSession, frames) -> list:
+    messages = []
+    for frame in frames:
+        if session.feed(frame):
+            messages.extend(asyncio.run(session.step()))
+    return messages
+
+
+def test_buffer_is_bounded_without_segments(monkeypatch):
+    monkeypatch.setenv("STREAM_MAX_BUFFER", "5")
+    monkeypatch.setenv("STREAM_COMMIT_LAG", "2")
+    session = StreamSession(FakeExpress())
+
+    for _ in range(30):
+        if session.feed(_noise(1.0)):
+            asyncio.run(session.step())
+
+    assert len(session.buffer) <= 5 * SAMPLE_RATE
+    assert session.buffer_start + len(session.buffer) == session.total_samples
+
+
+def test_feed_does_not_concatenate_per_frame():
+    session = StreamSession(FakeExpress())
+    for _ in range(50):
+        session.feed(_noise(0.02))
+
+    assert len(session._chunks) == 50
+    assert len(session.buffer) == 50 * int(0.02 * SAMPLE_RATE)
+    assert len(session._chunks) == 1
+
+
+def test_commits_segments_behind_the_lag(monkeypatch):
+    monkeypatch.setenv("STREAM_STEP", "1")
+    monkeypatch.setenv("STREAM_COMMIT_LAG", "2")
+    session = StreamSession(SegmentExpress())
+
+    messages = _run(session, [_noise(1.0) for _ in range(4)])
+
+    # Passos com 1s e 2s de buffer: só parciais; com 3s o primeiro segundo sai do buffer
+    assert [message["type"] for message in messages] == ["partial", "partial", "final", "partial", "final", "partial"]
+    finals = [message["segment"] for message in messages if message["type"] == "final"]
+    # Timestamps relativos ao stream, mesmo depois de o buffer ser aparado
+    assert [(segment["start"], segment["end"]) for segment in finals] == [(0.0, 1.0), (1.0, 2.0)]
+    assert session.final_segments == finals
+    assert session.buffer_start == 2 * SAMPLE_RATE
+    assert (messages[-1]["start"], messages[-1]["end"]) == (2.0, 4.0)
+    assert messages[-1]["text"] == "s1 s2"
+
+
+def test_endpoint_finalizes_the_whole_buffer(monkeypatch):
+    monkeypatch.setenv("STREAM_STEP", "10")
+    monkeypatch.setenv("STREAM_ENDPOINT_SILENCE", "0.6")
+    session = StreamSession(SegmentExpress())
+
+    messages = _run(session, [_noise(0.5)] * 4 + [_silence(0.2)] * 3)
+
+    assert [message["type"] for message in messages] == ["final", "final"]
+    assert [message["segment"]["text"] for message in messages] == ["s0", "s1"]
+    assert len(session.buffer) == 0
+    assert not session.has_speech
+
+
+def test_speech_arriving_during_transcription_survives_the_endpoint(monkeypatch):
+    monkeypatch.setenv("STREAM_STEP", "10")
+    monkeypatch.setenv("STREAM_ENDPOINT_SILENCE", "0.6")
+    express = SegmentExpress()
+    session = StreamSession(express)
+    # Fala nova chega enquanto o modelo transcreve o trecho anterior
+    express.during_run = lambda: session.feed(_noise(0.5)) if len(express.calls) == 1 else None
+
+    _run(session, [_noise(0.5)] * 4 + [_silence(0.2)] * 3)
+
+    assert len(session.buffer) == int(0.5 * SAMPLE_RATE)
+    assert session.has_speech
+    assert session.trailing_silence == 0
+
+    messages = _run(session, [_silence(0.2)] * 3)
+
+    assert [message["type"] for message in messages] == ["final"]
+    assert (messages[0]["segment"]["start"], messages[0]["segment"]["end"]) == (2.6, 3.6)
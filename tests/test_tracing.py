@@ -0,0 +1,34 @@
+import uuid
+
+from opentelemetry import trace
+from opentelemetry.sdk.trace.sampling import TraceIdRatioBased, Decision
+
+from src.utils import tracing
+
+
+def test_job_trace_id_is_stable_and_not_the_uuid():
+    job_id = str(uuid.uuid4())
+
+    assert tracing.job_trace_id(job_id) == tracing.job_trace_id(job_id)
+    assert tracing.job_trace_id(job_id) != uuid.UUID(job_id).int
+    assert tracing.job_trace_id("") is None
+
+
+def test_sampling_ratio_applies_to_uuid4_job_ids(monkeypatch):
+    monkeypatch.setattr(tracing, "SAMPLE_RATIO", 0.05)
+    sampler = TraceIdRatioBased(0.05)
+    job_ids = [str(uuid.uuid4()) for _ in range(20000)]
+
+    by_context = sum(
+        trace.get_current_span(tracing.job_context(job_id)).get_span_context().trace_flags.sampled
+        for job_id in job_ids
+    )
+    by_sdk = sum(
+        sampler.should_sample(None, tracing.job_trace_id(job_id), "job").decision == Decision.RECORD_AND_SAMPLE
+        for job_id in job_ids
+    )
+
+    # 5% de 20000 = 1000; a margem cobre a variação aleatória dos UUIDs
+    assert 800 < by_context < 1200
+    # A decisão local é a mesma regra do SDK: os dois lados concordam em todos os saltos
+    assert by_context == by_sdk
@@ -0,0 +1,249 @@
+import asyncio
+import json
+import types
+
+import httpx
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.api.routes import upload
+from src.database.connection import Base
+from src.database.models import Job
+from src.models.transcription import TranscriptionStatus
+from src.services import trigger_client as trigger_module
+from src.services.eta_estimator import ETAEstimator
+from src.services.job_reconciler import JobReconciler
+from src.services.media_probe import MediaProbe
+from src.services.trigger_client import TriggerClient, TriggerError, TriggerUnavailableError
+from src.services.worker_router import WorkerRouter
+
+
+class Trigger:
+    """Trigger.dev falso: responde com os status da fila `statuses` (depois, 200) e guarda as requisições"""
+
+    def __init__(self, *statuses):
+        self.statuses = list(statuses)
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        status = self.statuses.pop(0) if self.statuses else 200
+        if status != 200:
+            return httpx.Response(status, json={"error": "falha"})
+        return httpx.Response(200, json={"id": f"run_{len(self.requests)}"})
+
+
+@pytest.fixture
+def delays(monkeypatch):
+    """Backoff sem dormir de verdade: registra os atrasos pedidos"""
+    recorded = []
+
+    async def fake_sleep(delay):
+        recorded.append(delay)
+
+    monkeypatch.setattr(trigger_module.asyncio, "sleep", fake_sleep)
+    return recorded
+
+
+def _client(monkeypatch, trigger: Trigger, **env) -> TriggerClient:
+    monkeypatch.setenv("TRIGGER_SECRET_KEY", "tr_test")
+    monkeypatch.setenv("TRIGGER_PROJECT_ID", "proj_test")
+    monkeypatch.setenv("TRIGGER_HTTP2", "false")
+    monkeypatch.setenv("APP_URL", "http://testserver")
+    for name, value in env.items():
+        monkeypatch.setenv(name, str(value))
+    client = TriggerClient()
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(trigger))
+    return client
+
+
+@pytest.mark.parametrize("status", [500, 503, 429])
+def test_retries_transient_errors_with_jitter(monkeypatch, delays, status):
+    trigger = Trigger(status, status)
+    client = _client(monkeypatch, trigger, TRIGGER_RETRY_BASE_DELAY=0.5)
+
+    run_id = asyncio.run(client.create_transcription_job("job-1", file_url="https://example.com/a.mp3"))
+
+    assert run_id == "run_3"
+    assert len(trigger.requests) == 3
+    # Full jitter: cada espera é sorteada entre 0 e o teto exponencial da tentativa
+    assert len(delays) == 2
+    assert 0 <= delays[0] <= 0.5 and 0 <= delays[1] <= 1.0
+
+
+def test_retry_delays_are_randomized(monkeypatch, delays):
+    for _ in range(5):
+        client = _client(monkeypatch, Trigger(503), TRIGGER_RETRY_BASE_DELAY=0.5)
+        asyncio.run(client.get_job_status("run_1"))
+
+    assert len(set(delays)) > 1
+
+
+def test_gives_up_after_max_retries(monkeypatch, delays):
+    trigger = Trigger(503, 503, 503, 503)
+    client = _client(monkeypatch, trigger, TRIGGER_MAX_RETRIES=3)
+
+    with pytest.raises(TriggerUnavailableError):
+        asyncio.run(client.get_job_status("run_1"))
+    assert len(trigger.requests) == 4
+
+
+@pytest.mark.parametrize("status", [400, 401, 404, 422])
+def test_does_not_retry_client_errors(monkeypatch, delays, status):
+    trigger = Trigger(status)
+    client = _client(monkeypatch, trigger)
+
+    with pytest.raises(TriggerError) as error:
+        asyncio.run(client.create_transcription_job("job-1", file_url="https://example.com/a.mp3"))
+
+    assert not isinstance(error.value, TriggerUnavailableError)
+    assert error.value.status_code == status
+    assert len(trigger.requests) == 1
+    assert delays == []
+    assert client.circuit_breaker.state == "closed"
+
+
+def test_circuit_breaker_opens_and_half_opens(monkeypatch, delays):
+    trigger = Trigger(*[503] * 4)
+    client = _client(monkeypatch, trigger, TRIGGER_MAX_RETRIES=1, TRIGGER_BREAKER_THRESHOLD=4)
+    breaker = client.circuit_breaker
+
+    for _ in range(2):
+        with pytest.raises(TriggerUnavailableError):
+            asyncio.run(client.get_job_status("run_1"))
+    assert breaker.state == "open"
+
+    # Aberto: falha sem chamar o Trigger.dev
+    with pytest.raises(TriggerUnavailableError):
+        asyncio.run(client.get_job_status("run_1"))
+    assert len(trigger.requests) == 4
+
+    # Passado o reset_timeout, uma única chamada de teste é liberada
+    breaker.opened_at -= breaker.reset_timeout
+    assert breaker.state == "half_open"
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker._probe_in_flight = False
+
+    asyncio.run(client.get_job_status("run_1"))
+    assert breaker.state == "closed"
+    assert len(trigger.requests) == 5
+
+
+def test_failed_probe_reopens_breaker(monkeypatch, delays):
+    trigger = Trigger(503, 503)
+    client = _client(monkeypatch, trigger, TRIGGER_MAX_RETRIES=0, TRIGGER_BREAKER_THRESHOLD=1)
+    breaker = client.circuit_breaker
+
+    with pytest.raises(TriggerUnavailableError):
+        asyncio.run(client.get_job_status("run_1"))
+    breaker.opened_at -= breaker.reset_timeout
+
+    with pytest.raises(TriggerUnavailableError):
+        asyncio.run(client.get_job_status("run_1"))
+    assert breaker.state == "open"
+    assert len(trigger.requests) == 2
+
+
+@pytest.mark.parametrize("exception", [asyncio.CancelledError, RuntimeError])
+def test_interrupted_probe_releases_half_open(monkeypatch, delays, exception):
+    def interrupted(request):
+        raise exception("interrompido")
+
+    client = _client(monkeypatch, interrupted, TRIGGER_BREAKER_THRESHOLD=1)
+    breaker = client.circuit_breaker
+    breaker.record_failure()
+    breaker.opened_at -= breaker.reset_timeout
+
+    with pytest.raises(exception):
+        asyncio.run(client.get_job_status("run_1"))
+
+    # A chamada de teste não terminou: o próximo pedido pode testar o Trigger.dev de novo
+    assert breaker.state == "half_open"
+    assert breaker.allow_request()
+
+
+def test_idempotency_key_is_sent(monkeypatch, delays):
+    trigger = Trigger(503)
+    client = _client(monkeypatch, trigger)
+
+    asyncio.run(client.create_transcription_job("job-1", file_url="https://example.com/a.mp3"))
+    asyncio.run(client.create_transcription_job("job-2", file_url="https://example.com/b.mp3", idempotency_key="job-2:r1"))
+
+    keys = [json.loads(request.content)["options"]["idempotencyKey"] for request in trigger.requests]
+    # O retry reenvia a mesma chave; o redespacho usa a chave informada
+    assert keys == ["job-1", "job-1", "job-2:r1"]
+
+
+def _register_setup(monkeypatch, client: TriggerClient):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+
+    async def no_probe(self, source):
+        return None
+
+    monkeypatch.setattr(MediaProbe, "probe", no_probe)
+    request = types.SimpleNamespace(app=types.SimpleNamespace(state=types.SimpleNamespace(
+        trigger_client=client,
+        worker_router=WorkerRouter(),
+        eta_estimator=ETAEstimator()
+    )))
+    return request, sessionmaker(bind=engine)
+
+
+def test_unavailable_trigger_sends_job_to_outbox(monkeypatch, delays):
+    monkeypatch.setenv("RECONCILER_OUTBOX_DELAY", "-60")
+    trigger = Trigger(*[503] * 4)
+    client = _client(monkeypatch, trigger, TRIGGER_MAX_RETRIES=3)
+    request, Session = _register_setup(monkeypatch, client)
+
+    db = Session()
+    # Sem a marca do outbox: fica para a varredura de jobs parados, não para o outbox
+    db.add(Job(id="job-0", status=TranscriptionStatus.PENDING, file_url="https://example.com/a.mp3", language="pt"))
+    db.commit()
+    response = asyncio.run(upload._register_upload(
+        request, db, "job-1", "uploads/job-1.mp3", "a.mp3", 1024, "audio/mpeg", "pt", None, False
+    ))
+    db.close()
+
+    db = Session()
+    job = db.query(Job).filter(Job.id == "job-1").first()
+    assert response.status.value == "pending"
+    assert job.trigger_job_id is None
+    assert job.job_data["dispatch_deferred"] is True
+    db.close()
+
+    # Trigger.dev de volta: o reconciliador despacha o job do outbox com a mesma idempotencyKey
+    reconciler = JobReconciler(client, session_factory=Session)
+    assert asyncio.run(reconciler.flush_outbox()) == 1
+
+    db = Session()
+    job = db.query(Job).filter(Job.id == "job-1").first()
+    assert job.trigger_job_id == "run_5"
+    assert "dispatch_deferred" not in job.job_data
+    assert db.query(Job).filter(Job.id == "job-0").first().trigger_job_id is None
+    db.close()
+    assert json.loads(trigger.requests[-1].content)["options"]["idempotencyKey"] == "job-1"
+    assert asyncio.run(reconciler.flush_outbox()) == 0
+
+
+def test_rejected_dispatch_fails_the_job(monkeypatch, delays):
+    trigger = Trigger(400)
+    request, Session = _register_setup(monkeypatch, _client(monkeypatch, trigger))
+
+    db = Session()
+    with pytest.raises(TriggerError):
+        asyncio.run(upload._register_upload(
+            request, db, "job-1", "uploads/job-1.mp3", "a.mp3", 1024, "audio/mpeg", "pt", None, False
+        ))
+    db.close()
+
+    # Erro não transitório: o job gravado não fica PENDING à espera de um despacho que não virá
+    db = Session()
+    job = db.query(Job).filter(Job.id == "job-1").first()
+    assert job.status == TranscriptionStatus.FAILED
+    assert "Trigger.dev" in job.error_message
+    assert job.completed_at is not None
+    db.close()
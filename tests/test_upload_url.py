@@ -0,0 +1,66 @@
+import asyncio
+import json
+import types
+from datetime import datetime
+
+import httpx
+from fastapi import BackgroundTasks
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.api.routes import upload
+from src.database.connection import Base
+from src.database.models import Job
+from src.models.transcription import TranscriptionRequest, TranscriptionStatus
+from src.services.url_downloader import URLDownloader
+
+
+def test_cloned_job_notifies_webhook(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    source = Job(
+        id="source-job", status=TranscriptionStatus.COMPLETED, language="pt", media_key="youtube:abc",
+        result_text="olá mundo", result_language="pt", duration="2.5", completed_at=datetime.utcnow()
+    )
+    source.set_segments([{"start": 0.0, "end": 2.5, "text": "olá mundo"}])
+    db.add(source)
+    db.commit()
+
+    async def valid(url):
+        return True
+
+    async def resolve_media(self, url):
+        return {"direct": False, "media_key": "youtube:abc", "duration": 2.5, "title": None}
+
+    monkeypatch.setattr(upload, "validate_url", valid)
+    monkeypatch.setattr(URLDownloader, "resolve_media", resolve_media)
+
+    posted = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        posted.append((str(request.url), json.loads(request.content)))
+        return httpx.Response(200)
+
+    client_class = httpx.AsyncClient
+    monkeypatch.setattr(
+        upload.httpx, "AsyncClient", lambda **kwargs: client_class(transport=httpx.MockTransport(handler), **kwargs)
+    )
+
+    background_tasks = BackgroundTasks()
+    request = TranscriptionRequest(
+        url="https://youtube.com/watch?v=abc", language="pt", webhook_url="https://client.example.com/hook"
+    )
+    response = asyncio.run(upload._upload_from_url(types.SimpleNamespace(), request, background_tasks, db))
+    asyncio.run(background_tasks())
+
+    assert response.status == TranscriptionStatus.COMPLETED
+    assert len(posted) == 1
+    url, payload = posted[0]
+    assert url == "https://client.example.com/hook"
+    assert payload["job_id"] == response.job_id
+    assert payload["status"] == "completed"
+    assert payload["text"] == "olá mundo"
+    assert payload["segments"] == [{"start": 0.0, "end": 2.5, "text": "olá mundo"}]
+    assert payload["cached_from"] == "source-job"
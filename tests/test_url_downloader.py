@@ -0,0 +1,54 @@
+import asyncio
+
+from src.services import url_downloader
+from src.services.url_downloader import URLDownloader
+
+
+class SlowFFmpeg:
+    """ffmpeg falso: escreve a saída e demora a terminar, para os jobs se intercalarem"""
+
+    def __init__(self):
+        self.outputs = []
+
+    async def __call__(self, *cmd, **kwargs):
+        output = cmd[-1]
+        self.outputs.append(output)
+        with open(output, "wb") as f:
+            f.write(b"OggS" + output.encode())
+
+        class Process:
+            returncode = 0
+
+            async def communicate(self):
+                await asyncio.sleep(0.05)
+                return b"", b""
+
+        return Process()
+
+
+def test_concurrent_jobs_for_the_same_media(tmp_path, monkeypatch):
+    monkeypatch.setenv("MEDIA_CACHE_DIR", str(tmp_path / "cache"))
+    ffmpeg = SlowFFmpeg()
+    monkeypatch.setattr(url_downloader.asyncio, "create_subprocess_exec", ffmpeg)
+
+    async def download_from_url(self, url, job_id):
+        path = tmp_path / f"{job_id}_direct_download.mp3"
+        path.write_bytes(b"mp3")
+        return str(path)
+
+    monkeypatch.setattr(URLDownloader, "download_from_url", download_from_url)
+
+    async def fetch_both():
+        downloader = URLDownloader()
+        return await asyncio.gather(
+            downloader.fetch_audio("https://example.com/a", "job-a", "youtube:abc"),
+            downloader.fetch_audio("https://example.com/a", "job-b", "youtube:abc")
+        )
+
+    paths = asyncio.run(fetch_both())
+
+    # Cada job escreve no seu temporário; os dois terminam com o arquivo do cache
+    assert len(set(ffmpeg.outputs)) == 2
+    assert paths[0] == paths[1]
+    assert open(paths[0], "rb").read().startswith(b"OggS")
+    assert not list((tmp_path / "cache").glob("*.part"))